@@ -0,0 +1,59 @@
+"""
+Скорость и точность перевода количеств токенов: utils/amount.py против прежнего пути
+через Web3.to_wei / Web3.from_wei (Decimal с подбором имени юнита) и через float.
+Проверяется, что разбор и форматирование возвращают исходную строку без потери wei.
+Запуск из корня репозитория: python -m benchmarks.bench_amount [--count N]
+"""
+from web3 import Web3
+from utils.amount import Amount
+import argparse
+import random
+import time
+
+UNITS = {6: "mwei", 18: "ether"}
+
+
+def random_amounts(count: int, decimals: int, seed: int) -> list[str]:
+    """Случайные количества со всеми значащими знаками, как в балансах и котировках."""
+    rng = random.Random(seed)
+    return [str(Amount(rng.randrange(1, 10 ** (decimals + 6)), decimals)) for _ in range(count)]
+
+
+def timed(func, *args) -> tuple[float, list]:
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for decimals, unit in UNITS.items():
+        values = random_amounts(args.count, decimals, args.seed)
+
+        amount_parse, wei = timed(Amount.parse_many, values, decimals)
+        web3_parse, web3_wei = timed(lambda: [Web3.to_wei(v, unit) for v in values])
+        float_parse, float_wei = timed(lambda: [int(float(v) * 10 ** decimals) for v in values])
+
+        amount_format, formatted = timed(Amount.format_many, wei, decimals)
+        web3_format, _ = timed(lambda: [str(Web3.from_wei(w, unit)) for w in wei])
+
+        assert wei == web3_wei and formatted == values, "потеря точности в Amount"
+        float_errors = sum(a != b for a, b in zip(wei, float_wei))
+
+        print(f"decimals {decimals}, {args.count} количеств:")
+        print(f"  разбор: Amount {amount_parse / args.count * 1e9:.0f} нс, Web3.to_wei "
+              f"{web3_parse / args.count * 1e9:.0f} нс (в {web3_parse / amount_parse:.1f} раза медленнее), "
+              f"float {float_parse / args.count * 1e9:.0f} нс с ошибкой в {float_errors / args.count:.1%} значений")
+        print(f"  форматирование: Amount {amount_format / args.count * 1e9:.0f} нс, Web3.from_wei "
+              f"{web3_format / args.count * 1e9:.0f} нс (в {web3_format / amount_format:.1f} раза медленнее)")
+
+    # Прежний путь поддерживал только 6, 9 и 18 знаков
+    print(f"decimals 8: {Amount.parse('0.00000001', 8).wei} минимальная единица, Web3 — нет имени юнита")
+
+
+if __name__ == "__main__":
+    main()
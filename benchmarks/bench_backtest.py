@@ -0,0 +1,68 @@
+"""
+Скорость бэктеста проскальзывания (uniswap/backtest.py) на синтетической истории резервов:
+случайное блуждание цены пары с постоянным произведением резервов, события Sync не в каждом блоке.
+Сравнивается с прямым циклом Python на небольшой выборке, чтобы показать выигрыш векторизации.
+Запуск из корня репозитория: python -m benchmarks.bench_backtest [--blocks N]
+"""
+from uniswap.backtest import np, dense_reserves, backtest_reserves, DEFAULT_TOLERANCES_BPS, DEFAULT_DELAYS
+from uniswap.quoter import get_amount_out_v2
+import argparse
+import time
+
+SIZES = [10 ** 15, 10 ** 16, 10 ** 17, 10 ** 18, 10 ** 19, 10 ** 20]
+# Синтетическая пара WETH/USDC: 10 000 WETH по цене 3000
+RESERVE_IN = 10_000 * 10 ** 18
+PRICE = 3_000 * 10 ** 6 / 10 ** 18
+
+
+def synthetic_history(blocks: int, volatility: float, sync_share: float, seed: int):
+    rng = np.random.default_rng(seed)
+    price = PRICE * np.exp(np.cumsum(rng.normal(0.0, volatility, blocks)))
+    k = RESERVE_IN * RESERVE_IN * PRICE
+    reserve_in, reserve_out = np.sqrt(k / price), np.sqrt(k * price)
+    events = np.nonzero(rng.random(blocks) < sync_share)[0]
+    return dense_reserves(events, reserve_in[events], reserve_out[events], 0, blocks - 1)
+
+
+def python_loop(reserve_in, reserve_out, samples: int) -> float:
+    """Тот же расчёт для одной задержки и одного допуска циклом по блокам и размерам."""
+    started = time.perf_counter()
+    reverts = 0
+    for b in range(samples):
+        for size in SIZES:
+            quoted = get_amount_out_v2(size, int(reserve_in[b]), int(reserve_out[b]))
+            executed = get_amount_out_v2(size, int(reserve_in[b + 1]), int(reserve_out[b + 1]))
+            reverts += executed * 10_000 < quoted * (10_000 - 100)
+    return (time.perf_counter() - started) / (samples * len(SIZES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=1_000_000)
+    parser.add_argument("--volatility", type=float, default=0.0005, help="ст. отклонение лог-цены за блок")
+    parser.add_argument("--sync-share", type=float, default=0.3, help="доля блоков с событием Sync")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("Для бэктеста нужен numpy: pip install numpy")
+
+    _, reserve_in, reserve_out = synthetic_history(args.blocks, args.volatility, args.sync_share, args.seed)
+
+    started = time.perf_counter()
+    result = backtest_reserves(reserve_in, reserve_out, SIZES, DEFAULT_TOLERANCES_BPS, DEFAULT_DELAYS)
+    elapsed = time.perf_counter() - started
+    per_combination = elapsed / result["combinations"]
+    loop = python_loop(reserve_in, reserve_out, min(20_000, len(reserve_in) - 1))
+
+    print(f"блоков {result['samples']}, комбинаций {result['combinations']:,} за {elapsed:.2f} с "
+          f"({result['combinations'] / elapsed / 1e6:.1f} млн/с)")
+    print(f"цикл Python: {loop * 1e9:.0f} нс на комбинацию, векторизовано: {per_combination * 1e9:.1f} нс "
+          f"(в {loop / per_combination:.0f} раз быстрее)")
+    for i, delay in enumerate(result["delays"]):
+        rates = ", ".join(f"{t:.0f}: {r:.1%}" for t, r in zip(result["tolerances_bps"], result["revert_rate"][i, 3]))
+        print(f"задержка {delay:2} бл., 1 WETH — доля откатов по допуску (б.п.) {rates}")
+
+
+if __name__ == "__main__":
+    main()
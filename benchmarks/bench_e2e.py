@@ -0,0 +1,168 @@
+"""
+Сквозной бенчмарк свапа на локальной заглушке JSON-RPC (benchmarks/mock_chain.py):
+задержка полного цикла, число RPC-вызовов по этапам и пропускная способность пакетного режима.
+Результаты пишутся в JSON для сравнения между версиями.
+Запуск из корня репозитория: python -m benchmarks.bench_e2e [--wallets N] [--latency сек] [--error-rate доля]
+"""
+from eth_account import Account
+from benchmarks.mock_chain import MockChain
+from client.client import Client
+from client.provider_registry import ProviderRegistry
+from uniswap.quoter import compute_pair_address
+from uniswap.route_finder import find_swap_route
+from uniswap.swapper import swap_eth_to_usdc
+from uniswap.runner import run_swap_flow, run_batch
+from utils.resources import load_networks
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+NETWORK = "ARBITRUM"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+AMOUNT = "0.001"
+
+
+def build_client(chain: MockChain, net: dict) -> Client:
+    return Client(
+        from_address=net["wrapped_token"],
+        to_address=USDC,
+        chain_id=net["chain_id"],
+        rpc_url=chain.urls,
+        private_key=Account.create().key.hex(),
+        amount=AMOUNT,
+        router_address=net["router_address"],
+        explorer_url=net["explorer_url"]
+    )
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p90": ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)],
+        "max": ordered[-1]
+    }
+
+
+async def measure_stages(chain: MockChain, net: dict) -> dict:
+    """Повторяет этапы run_swap_flow по отдельности и считает RPC-вызовы каждого этапа."""
+    client = build_client(chain, net)
+    amount_in_wei = client.amount.wei
+    stages = {}
+
+    async def stage(name, coro):
+        chain.reset_counters()
+        started = time.perf_counter()
+        result = await coro
+        stages[name] = {
+            "seconds": time.perf_counter() - started,
+            "http_requests": chain.http_requests,
+            "rpc_calls": sum(chain.calls.values()),
+            "methods": dict(chain.calls)
+        }
+        return result
+
+    async def wrap():
+        await client.get_erc20_balance()
+        await client.get_native_balance()
+        await client.get_tx_fee()
+        await client.wait_tx(await client.wrap_native(), client.explorer_url)
+
+    await stage("wrap", wrap())
+    path, quote = await stage("quote", find_swap_route(client, amount_in_wei))
+
+    async def swap():
+        tx_hash = await swap_eth_to_usdc(client, path, quote)
+        await client.w3.eth.get_transaction_receipt(tx_hash)
+
+    await stage("swap", swap())
+    return stages
+
+
+async def measure_latency(chain: MockChain, net: dict, runs: int, pipelined: bool = False) -> dict:
+    """Полный цикл run_swap_flow на новых кошельках, по одному за раз."""
+    totals, failures = [], 0
+    for _ in range(runs):
+        record = await run_swap_flow(build_client(chain, net), pipelined=pipelined)
+        if record["success"]:
+            totals.append(record["timings"]["total"])
+        else:
+            failures += 1
+    return {"failures": failures, **(summarize(totals) if totals else {"count": 0})}
+
+
+async def measure_throughput(chain: MockChain, net: dict, wallets: int, max_concurrency: int) -> dict:
+    clients = [build_client(chain, net) for _ in range(wallets)]
+    chain.reset_counters()
+    started = time.perf_counter()
+    records = await run_batch(clients, max_concurrency)
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in records if r["success"])
+    return {
+        "wallets": wallets,
+        "max_concurrency": max_concurrency,
+        "succeeded": succeeded,
+        "seconds": elapsed,
+        "wallets_per_second": succeeded / elapsed,
+        "http_requests": chain.http_requests,
+        "rpc_calls": sum(chain.calls.values())
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="повторов полного цикла для замера задержки")
+    parser.add_argument("--wallets", type=int, default=20, help="кошельков в пакетном прогоне")
+    parser.add_argument("--max-concurrency", type=int, default=5)
+    parser.add_argument("--endpoints", type=int, default=2, help="эндпоинтов заглушки (фейловер RpcPool)")
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа заглушки, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля запросов с HTTP 503")
+    parser.add_argument("--block-time", type=float, default=0.25)
+    parser.add_argument("--output", default="bench_e2e.json")
+    args = parser.parse_args()
+
+    # Логи этапов свапа только мешают читать результат
+    logging.disable(logging.INFO)
+
+    net = load_networks()[NETWORK]
+    pair = compute_pair_address(net["factory_address"], net["wrapped_token"], USDC, net["init_code_hash"])
+    chain = MockChain(net["chain_id"], net["wrapped_token"], USDC, net["router_address"],
+                      block_time=args.block_time, latency=args.latency, error_rate=args.error_rate, seed=1,
+                      pair_address=pair)
+    await chain.start(args.endpoints)
+    try:
+        results = {
+            "config": vars(args),
+            "stages": await measure_stages(chain, net),
+            "latency": await measure_latency(chain, net, args.runs),
+            "latency_pipelined": await measure_latency(chain, net, args.runs, pipelined=True),
+            "throughput": await measure_throughput(chain, net, args.wallets, args.max_concurrency)
+        }
+    finally:
+        await ProviderRegistry.close()
+        await chain.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for name, data in results["stages"].items():
+        print(f"{name:<8} {data['seconds'] * 1000:8.1f} мс  {data['http_requests']:3} HTTP  {data['rpc_calls']:3} RPC")
+    for name, title in (("latency", "полный цикл"), ("latency_pipelined", "конвейер")):
+        latency = results[name]
+        if latency["count"]:
+            print(f"{title}: p50 {latency['p50']:.2f} с, p90 {latency['p90']:.2f} с, ошибок {latency['failures']}")
+        else:
+            print(f"{title}: ни одного успешного прогона, ошибок {latency['failures']}")
+    throughput = results["throughput"]
+    print(f"пакет: {throughput['succeeded']}/{throughput['wallets']} кошельков за {throughput['seconds']:.2f} с "
+          f"({throughput['wallets_per_second']:.1f}/с)")
+    print(f"результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
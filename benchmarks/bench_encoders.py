@@ -0,0 +1,52 @@
+"""
+Сравнение стоимости сборки calldata: web3 encodeABI против предкомпилированных энкодеров.
+Запуск из корня репозитория: python -m benchmarks.bench_encoders
+"""
+from web3 import AsyncWeb3
+from utils.encoders import encode_swap_exact_eth_for_tokens, encode_approve
+from utils.resources import load_abi
+import time
+
+ITERATIONS = 5_000
+ROUTER = "0x1b02dA8Cb0d097eB8D57A175b88c7D8b47997506"
+WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+WALLET = "0x000000000000000000000000000000000000dEaD"
+
+
+def measure(name: str, func) -> float:
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    per_call = (time.perf_counter() - started) / ITERATIONS * 1e6
+    print(f"{name:<40} {per_call:10.2f} мкс")
+    return per_call
+
+
+def main():
+    w3 = AsyncWeb3()
+    path = [WETH, USDC]
+
+    def web3_swap():
+        contract = w3.eth.contract(address=ROUTER, abi=load_abi("uniswap_router_v2"))
+        return contract.encodeABI(fn_name="swapExactETHForTokens", args=[10 ** 6, path, WALLET, 1_700_000_000])
+
+    def web3_approve():
+        contract = w3.eth.contract(address=USDC, abi=load_abi("erc20_abi"))
+        return contract.encodeABI(fn_name="approve", args=[ROUTER, 2 ** 256 - 1])
+
+    assert web3_swap() == encode_swap_exact_eth_for_tokens(10 ** 6, path, WALLET, 1_700_000_000)
+    assert web3_approve() == encode_approve(ROUTER, 2 ** 256 - 1)
+
+    before = measure("swapExactETHForTokens: web3", web3_swap)
+    after = measure("swapExactETHForTokens: энкодер", lambda: encode_swap_exact_eth_for_tokens(
+        10 ** 6, path, WALLET, 1_700_000_000))
+    print(f"Ускорение: x{before / after:.1f}\n")
+
+    before = measure("approve: web3", web3_approve)
+    after = measure("approve: энкодер", lambda: encode_approve(ROUTER, 2 ** 256 - 1))
+    print(f"Ускорение: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
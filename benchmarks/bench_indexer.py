@@ -0,0 +1,96 @@
+"""
+Бенчмарк индексатора истории пар (uniswap/indexer.py) на локальной заглушке JSON-RPC:
+скорость догрузки истории в блоках в секунду при разной параллельности, число запросов
+и ошибок «слишком много логов», а также проверка продолжения с контрольной точки.
+Запуск из корня репозитория: python -m benchmarks.bench_indexer [--blocks N] [--pairs N] [--max-logs N]
+"""
+from eth_utils import keccak
+from benchmarks.mock_chain import MockChain
+from client.provider_registry import ProviderRegistry
+from uniswap.history_store import HistoryStore
+from uniswap.indexer import PairIndexer
+from utils.resources import load_networks
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+
+NETWORK = "ARBITRUM"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+
+
+def fake_pairs(count: int) -> list[str]:
+    return ["0x" + keccak(text=f"pair-{i}")[-20:].hex() for i in range(count)]
+
+
+async def measure(chain: MockChain, chain_id: int, pairs: list[str], args, concurrency: int) -> dict:
+    """Полная догрузка в новую базу, затем повторный запуск, который должен продолжить с контрольной точки."""
+    with tempfile.TemporaryDirectory() as directory:
+        store = await HistoryStore(os.path.join(directory, "history.db")).open()
+        try:
+            indexer = PairIndexer(chain_id, chain.urls, pairs, store, concurrency=concurrency,
+                                  initial_range=args.initial_range, confirmations=0)
+            chain.reset_counters()
+            start = chain.block_number - args.blocks + 1
+            await indexer.sync(start)
+            http_requests = chain.http_requests
+
+            resumed = PairIndexer(chain_id, chain.urls, pairs, store, concurrency=concurrency, confirmations=0)
+            resume_from = await resumed.resume_block(start)
+        finally:
+            await store.close()
+    return {
+        "concurrency": concurrency,
+        "blocks": indexer.stats["blocks"],
+        "logs": indexer.stats["logs"],
+        "seconds": indexer.stats["seconds"],
+        "blocks_per_second": indexer.blocks_per_second,
+        "http_requests": http_requests,
+        "range_errors": indexer.stats["range_errors"],
+        "final_range": indexer.range,
+        "resume_from": resume_from
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=50_000, help="блоков истории для догрузки")
+    parser.add_argument("--pairs", type=int, default=4, help="пар в индексе")
+    parser.add_argument("--swaps-per-block", type=int, default=1)
+    parser.add_argument("--max-logs", type=int, default=10_000, help="лимит логов в ответе заглушки")
+    parser.add_argument("--initial-range", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа заглушки, сек")
+    parser.add_argument("--output", default="bench_indexer.json")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    net = load_networks()[NETWORK]
+    pairs = fake_pairs(args.pairs)
+    # Блоки не производятся во время замера: голова фиксирована
+    chain = MockChain(net["chain_id"], net["wrapped_token"], USDC, net["router_address"],
+                      block_time=3600, latency=args.latency, seed=1, history_pairs=pairs,
+                      swaps_per_block=args.swaps_per_block, max_logs=args.max_logs)
+    chain.block_number = args.blocks + 1
+    await chain.start()
+    try:
+        runs = [await measure(chain, net["chain_id"], pairs, args, c) for c in args.concurrency]
+    finally:
+        await ProviderRegistry.close()
+        await chain.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"config": vars(args), "runs": runs}, f, indent=2, ensure_ascii=False)
+
+    for run in runs:
+        print(f"параллельность {run['concurrency']:2}: {run['blocks_per_second']:10.0f} блоков/с, "
+              f"{run['logs']} логов, {run['http_requests']} HTTP, {run['range_errors']} сужений диапазона, "
+              f"итоговый диапазон {run['final_range']}, продолжение с блока {run['resume_from']}")
+    print(f"результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
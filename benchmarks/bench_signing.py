@@ -0,0 +1,62 @@
+"""
+Пропускная способность подписи транзакций: в текущем потоке и в SigningService с разным числом воркеров.
+Запуск из корня репозитория: python -m benchmarks.bench_signing [кол-во транзакций]
+"""
+from eth_account import Account
+from client.signer import SigningService, raw_transaction
+import asyncio
+import os
+import sys
+import time
+
+ROUTER = "0x1b02dA8Cb0d097eB8D57A175b88c7D8b47997506"
+
+
+def build_transactions(count: int) -> tuple[list[str], list[tuple[int, dict]]]:
+    keys = [Account.create().key.hex() for _ in range(min(count, 32))]
+    items = []
+    for i in range(count):
+        items.append((i % len(keys), {
+            "chainId": 42161,
+            "nonce": i,
+            "to": ROUTER,
+            "value": 10 ** 15,
+            "data": "0x7ff36ab5" + "00" * 160,
+            "gas": 200_000,
+            "maxFeePerGas": 10 ** 8,
+            "maxPriorityFeePerGas": 0,
+            "type": 2
+        }))
+    return keys, items
+
+
+async def measure_service(keys: list[str], items: list[tuple[int, dict]], workers: int, use_threads: bool) -> float:
+    service = SigningService(keys, workers, use_threads)
+    try:
+        await service.sign_batch(items[:workers])  # прогрев воркеров
+        started = time.perf_counter()
+        await service.sign_batch(items)
+        return len(items) / (time.perf_counter() - started)
+    finally:
+        service.shutdown()
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    keys, items = build_transactions(count)
+    started = time.perf_counter()
+    for key_index, tx in items:
+        raw_transaction(Account.sign_transaction(tx, keys[key_index]))
+    print(f"{'в текущем потоке':<24} {count / (time.perf_counter() - started):10.0f} подписей/с")
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        for use_threads in (False, True):
+            rate = await measure_service(keys, items, workers, use_threads)
+            kind = "потоки" if use_threads else "процессы"
+            print(f"{kind + ', воркеров ' + str(workers):<24} {rate:10.0f} подписей/с")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
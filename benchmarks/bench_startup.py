@@ -0,0 +1,55 @@
+"""
+Замер холодного старта: время импорта main и самые тяжёлые модули по данным -X importtime.
+Запуск из любой директории: python benchmarks/bench_startup.py [модуль] [повторы]
+"""
+from pathlib import Path
+import subprocess
+import statistics
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_import(module: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    args += ["-c", f"import {module}"]
+    return subprocess.run(args, cwd=ROOT_DIR, capture_output=True, text=True)
+
+
+def top_modules(stderr: str, limit: int = 15) -> list[tuple[int, str]]:
+    """Разбирает вывод -X importtime: (суммарное время в мкс, модуль)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "main"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run_import(module)
+        timings.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            print(result.stderr)
+            sys.exit(result.returncode)
+
+    print(f"import {module}: медиана {statistics.median(timings) * 1000:.1f} мс, "
+          f"минимум {min(timings) * 1000:.1f} мс ({repeats} запусков, включая старт интерпретатора)\n")
+
+    print("Самые тяжёлые импорты (суммарно, мс):")
+    for cumulative, name in top_modules(run_import(module, importtime=True).stderr):
+        print(f"{cumulative / 1000:10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
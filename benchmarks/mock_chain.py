@@ -0,0 +1,412 @@
+"""
+Локальная заглушка JSON-RPC ноды для бенчмарков: состояние в памяти, настраиваемая задержка,
+инъекция ошибок и производство блоков по таймеру. Реализует методы, которые использует скрипт:
+балансы, nonce, комиссии, estimateGas, eth_call (getAmountsOut, balanceOf, decimals, symbol),
+sendRawTransaction (с заменой транзакции того же nonce по большей комиссии) и receipt-ы,
+а также eth_getLogs по синтетической истории пар.
+"""
+from aiohttp import web
+from collections import Counter
+from eth_abi import decode, encode
+from typing import Optional
+from eth_account import Account
+from eth_utils import keccak
+from client.multicall import MULTICALL3_ADDRESS
+from uniswap.quoter import get_amount_out_v2, sort_tokens
+from utils.encoders import (SWAP_EXACT_ETH_FOR_TOKENS, GET_AMOUNTS_OUT, GET_RESERVES, GET_ETH_BALANCE, BALANCE_OF,
+                            DECIMALS, SYMBOL, DEPOSIT, WITHDRAW)
+import asyncio
+import random
+import rlp
+import time
+
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+SYNC_TOPIC = "0x" + keccak(text="Sync(uint112,uint112)").hex()
+SWAP_TOPIC = "0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex()
+AGGREGATE3 = keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+DEFAULT_NATIVE_BALANCE = 10 * 10 ** 18
+BASE_FEE = 10 ** 7
+GAS_USED = 120_000
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def _words(data: bytes) -> list[int]:
+    return [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+
+
+class RpcError(Exception):
+    """Ошибка JSON-RPC с собственным кодом, как у публичных нод."""
+
+    def __init__(self, code: int, message: str):
+        self.code = code
+        super().__init__(message)
+
+
+class MockChain:
+    """
+    Состояние цепочки: нативные и ERC20 балансы, одна V2-пара wrapped/стейбл, мемпул и блоки.
+    Если передан адрес пары, её getReserves доступен через Multicall3.aggregate3.
+    """
+
+    def __init__(self, chain_id: int, wrapped_token: str, stable_token: str, router: str,
+                 reserves: tuple[int, int] = (1_000 * 10 ** 18, 3_000_000 * 10 ** 6),
+                 block_time: float = 0.25, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, pair_address: Optional[str] = None,
+                 history_pairs: Optional[list[str]] = None, swaps_per_block: int = 1, max_logs: int = 10_000,
+                 max_multicall: Optional[int] = None, stable_decimals: int = 6):
+        self.chain_id = chain_id
+        self.wrapped_token = wrapped_token.lower()
+        self.stable_token = stable_token.lower()
+        self.router = router.lower()
+        self.pair_address = pair_address.lower() if pair_address else None
+        self.reserves = {self.wrapped_token: reserves[0], self.stable_token: reserves[1]}
+        self.block_time = block_time
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        # Каждая пара истории даёт в каждом блоке swaps_per_block пар событий Swap + Sync
+        self.history_pairs = {pair.lower() for pair in history_pairs or []}
+        self.swaps_per_block = swaps_per_block
+        self.max_logs = max_logs
+        # Больше вложенных вызовов в aggregate3 — откат «out of gas», как у ноды с лимитом газа eth_call
+        self.max_multicall = max_multicall
+
+        self.block_number = 1
+        self.timestamp = int(time.time())
+        self.native: dict[str, int] = {}
+        self.tokens: dict[str, dict[str, int]] = {self.wrapped_token: {}, self.stable_token: {}}
+        # decimals и symbol токенов для MulticallReader.get_token_metadata
+        self.metadata = {self.wrapped_token: (18, "WETH"), self.stable_token: (stable_decimals, "USDC")}
+        self.nonces: dict[str, int] = {}
+        self.mempool: list[dict] = []
+        self.receipts: dict[str, dict] = {}
+        # Селекторы, вызовы которых откатываются при исполнении (например, DEPOSIT — откат wrap)
+        self.reverting: set[bytes] = set()
+        # Сколько транзакций мемпула заменено транзакциями с тем же nonce и большей комиссией
+        self.replaced = 0
+
+        self.calls: Counter = Counter()
+        self.http_requests = 0
+        self.runner: Optional[web.AppRunner] = None
+        self.producer: Optional[asyncio.Task] = None
+        self.urls: list[str] = []
+
+    # --- запуск и остановка -------------------------------------------------
+
+    async def start(self, endpoints: int = 1, host: str = "127.0.0.1") -> list[str]:
+        """
+        Поднимает endpoints HTTP-эндпоинтов над общим состоянием (для проверки фейловера RpcPool)
+        и запускает производство блоков. Возвращает список адресов для rpc_url.
+        """
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        for _ in range(endpoints):
+            site = web.TCPSite(self.runner, host, 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            self.urls.append(f"http://{host}:{port}/")
+        self.producer = asyncio.create_task(self._produce_blocks())
+        return self.urls
+
+    async def stop(self) -> None:
+        if self.producer:
+            self.producer.cancel()
+        if self.runner:
+            await self.runner.cleanup()
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.http_requests = 0
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.http_requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.Response(status=503, text="injected failure")
+
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self._dispatch(item) for item in payload])
+        return web.json_response(self._dispatch(payload))
+
+    def _dispatch(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params") or []
+        self.calls[method] += 1
+        handler = getattr(self, "rpc_" + method, None)
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        if handler is None:
+            response["error"] = {"code": -32601, "message": f"method {method} not found"}
+            return response
+        try:
+            response["result"] = handler(*params)
+        except Exception as e:
+            response["error"] = {"code": getattr(e, "code", -32000), "message": str(e)}
+        return response
+
+    # --- состояние ----------------------------------------------------------
+
+    def native_balance(self, address: str) -> int:
+        return self.native.setdefault(address.lower(), DEFAULT_NATIVE_BALANCE)
+
+    def quote(self, amount_in: int, path: list[str]) -> list[int]:
+        amounts = [amount_in]
+        for token_in, token_out in zip(path, path[1:]):
+            amounts.append(get_amount_out_v2(amounts[-1], self.reserves[token_in], self.reserves[token_out]))
+        return amounts
+
+    @staticmethod
+    def _decode_path(data: bytes, offset: int) -> list[str]:
+        length = int.from_bytes(data[offset:offset + 32], "big")
+        start = offset + 32
+        return ["0x" + data[start + 32 * i + 12:start + 32 * (i + 1)].hex() for i in range(length)]
+
+    def _execute(self, tx: dict) -> list[dict]:
+        """Применяет транзакцию к состоянию и возвращает логи."""
+        sender, to, value, data = tx["from"], tx["to"], tx["value"], tx["data"]
+        self.native[sender] = self.native_balance(sender) - value - GAS_USED * BASE_FEE
+        logs = []
+        if data[:4] in self.reverting:
+            raise ValueError("execution reverted")
+        if to == self.wrapped_token and data[:4] == DEPOSIT:
+            balances = self.tokens[self.wrapped_token]
+            balances[sender] = balances.get(sender, 0) + value
+        elif to == self.wrapped_token and data[:4] == WITHDRAW:
+            amount = int.from_bytes(data[4:36], "big")
+            balances = self.tokens[self.wrapped_token]
+            if balances.get(sender, 0) < amount:
+                raise ValueError("insufficient balance")
+            balances[sender] -= amount
+            self.native[sender] += amount
+        elif to == self.router and data[:4] == SWAP_EXACT_ETH_FOR_TOKENS:
+            amount_out_min, _, recipient, deadline = _words(data[4:132])
+            path = self._decode_path(data[4:], 0x80)
+            amounts = self.quote(value, path)
+            if amounts[-1] < amount_out_min or deadline < self.timestamp:
+                raise ValueError("UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT")
+            self.reserves[path[0]] += value
+            self.reserves[path[-1]] -= amounts[-1]
+            recipient = "0x" + hex(recipient)[2:].rjust(40, "0")
+            balances = self.tokens[path[-1]]
+            balances[recipient] = balances.get(recipient, 0) + amounts[-1]
+            logs.append({
+                "address": path[-1],
+                "topics": [TRANSFER_TOPIC, _topic(self.router), _topic(recipient)],
+                "data": "0x" + amounts[-1].to_bytes(32, "big").hex()
+            })
+        return logs
+
+    def mine_block(self, max_txs: Optional[int] = None) -> None:
+        """Добывает блок из первых max_txs транзакций мемпула (по умолчанию — из всех)."""
+        self.block_number += 1
+        self.timestamp += max(int(self.block_time), 1)
+        block_hash = "0x" + keccak(self.block_number.to_bytes(32, "big")).hex()
+        count = len(self.mempool) if max_txs is None else max_txs
+        included, self.mempool = self.mempool[:count], self.mempool[count:]
+        for index, tx in enumerate(included):
+            try:
+                logs, status = self._execute(tx), 1
+            except Exception:
+                logs, status = [], 0
+            for log_index, log in enumerate(logs):
+                log.update({
+                    "logIndex": _hex(log_index), "blockNumber": _hex(self.block_number), "blockHash": block_hash,
+                    "transactionHash": tx["hash"], "transactionIndex": _hex(index), "removed": False
+                })
+            self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"], "transactionIndex": _hex(index),
+                "blockHash": block_hash, "blockNumber": _hex(self.block_number),
+                "from": tx["from"], "to": tx["to"], "contractAddress": None,
+                "gasUsed": _hex(GAS_USED), "cumulativeGasUsed": _hex(GAS_USED * (index + 1)),
+                "effectiveGasPrice": _hex(BASE_FEE), "status": _hex(status), "type": "0x2",
+                "logs": logs, "logsBloom": "0x" + "00" * 256
+            }
+
+    async def _produce_blocks(self) -> None:
+        while True:
+            await asyncio.sleep(self.block_time)
+            self.mine_block()
+
+    # --- методы JSON-RPC ----------------------------------------------------
+
+    def rpc_eth_chainId(self):
+        return _hex(self.chain_id)
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_web3_clientVersion(self):
+        return "mock-chain/1.0"
+
+    def rpc_eth_blockNumber(self):
+        return _hex(self.block_number)
+
+    def rpc_eth_getBalance(self, address, block="latest"):
+        return _hex(self.native_balance(address))
+
+    def rpc_eth_getTransactionCount(self, address, block="latest"):
+        # nonces учитывает и транзакции в мемпуле, для "latest" их нужно вычесть
+        address = address.lower()
+        nonce = self.nonces.get(address, 0)
+        if block != "pending":
+            nonce -= sum(1 for tx in self.mempool if tx["from"] == address)
+        return _hex(nonce)
+
+    def rpc_eth_gasPrice(self):
+        return _hex(BASE_FEE)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return _hex(0)
+
+    def rpc_eth_feeHistory(self, block_count, newest="latest", percentiles=None):
+        count = int(block_count, 16) if isinstance(block_count, str) else block_count
+        return {
+            "oldestBlock": _hex(max(self.block_number - count + 1, 0)),
+            "baseFeePerGas": [_hex(BASE_FEE)] * (count + 1),
+            "gasUsedRatio": [0.5] * count,
+            "reward": [[_hex(0) for _ in (percentiles or [])] for _ in range(count)]
+        }
+
+    def rpc_eth_getBlockByNumber(self, block="latest", full=False):
+        return {
+            "number": _hex(self.block_number),
+            "hash": "0x" + keccak(self.block_number.to_bytes(32, "big")).hex(),
+            "timestamp": _hex(self.timestamp),
+            "baseFeePerGas": _hex(BASE_FEE),
+            "transactions": []
+        }
+
+    def rpc_eth_getCode(self, address, block="latest"):
+        # Код есть только у роутера: достаточно для сверки кэша метаданных
+        return "0x6080604052" if address.lower() == self.router else "0x"
+
+    def rpc_eth_estimateGas(self, tx, block="latest"):
+        return _hex(GAS_USED)
+
+    def _get_reserves(self) -> bytes:
+        token0, token1 = (t.lower() for t in sort_tokens(self.wrapped_token, self.stable_token))
+        return encode(["uint112", "uint112", "uint32"],
+                      [self.reserves[token0], self.reserves[token1], self.timestamp % 2 ** 32])
+
+    def _aggregate3(self, data: bytes) -> str:
+        results = []
+        calls = decode(["(address,bool,bytes)[]"], data[4:])[0]
+        if self.max_multicall is not None and len(calls) > self.max_multicall:
+            raise RpcError(-32000, "execution reverted: out of gas")
+        for target, _, call_data in calls:
+            try:
+                results.append((True, self._call(target.lower(), call_data)))
+            except ValueError:
+                # Вызов адреса без кода успешен и возвращает пустой ответ
+                results.append((True, b""))
+        return "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+
+    def _call(self, to: str, data: bytes) -> bytes:
+        """Ответ view-вызова контракта; неизвестный вызов откатывается."""
+        selector = data[:4]
+        if selector == GET_RESERVES and to == self.pair_address:
+            return self._get_reserves()
+        if selector == BALANCE_OF and to in self.tokens:
+            owner = "0x" + data[16:36].hex()
+            return self.tokens[to].get(owner, 0).to_bytes(32, "big")
+        if selector == DECIMALS and to in self.metadata:
+            return encode(["uint8"], [self.metadata[to][0]])
+        if selector == SYMBOL and to in self.metadata:
+            return encode(["string"], [self.metadata[to][1]])
+        if selector == GET_ETH_BALANCE and to == MULTICALL3_ADDRESS.lower():
+            return self.native_balance("0x" + data[16:36].hex()).to_bytes(32, "big")
+        if selector == GET_AMOUNTS_OUT and to == self.router:
+            amount_in = int.from_bytes(data[4:36], "big")
+            amounts = self.quote(amount_in, self._decode_path(data[4:], 0x40))
+            encoded = (32).to_bytes(32, "big") + len(amounts).to_bytes(32, "big")
+            return encoded + b"".join(a.to_bytes(32, "big") for a in amounts)
+        raise ValueError("execution reverted")
+
+    def rpc_eth_call(self, tx, block="latest"):
+        to = tx["to"].lower()
+        data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+        if data[:4] == AGGREGATE3 and to == MULTICALL3_ADDRESS.lower():
+            return self._aggregate3(data)
+        return "0x" + self._call(to, data).hex()
+
+    def _history_logs(self, pair: str, block: int) -> list[dict]:
+        block_hash = "0x" + keccak(block.to_bytes(32, "big")).hex()
+        seed = int(pair[-8:], 16) ^ block
+        logs = []
+        for i in range(self.swaps_per_block):
+            amount_in = 10 ** 15 * (1 + (seed + i) % 1_000)
+            amount_out = amount_in * 3_000 // 10 ** 12
+            reserve0 = 10 ** 21 + (seed * 7 + i) % 10 ** 18
+            reserve1 = 3 * 10 ** 12 + (seed * 13 + i) % 10 ** 9
+            tx_hash = "0x" + keccak(block_hash.encode() + pair.encode() + bytes([i % 256])).hex()
+            common = {"address": pair, "blockNumber": _hex(block), "blockHash": block_hash,
+                      "transactionHash": tx_hash, "transactionIndex": _hex(i), "removed": False}
+            logs.append({**common, "logIndex": _hex(2 * i),
+                         "topics": [SWAP_TOPIC, _topic(self.router), _topic(self.router)],
+                         "data": "0x" + encode(["uint256"] * 4, [amount_in, 0, 0, amount_out]).hex()})
+            logs.append({**common, "logIndex": _hex(2 * i + 1), "topics": [SYNC_TOPIC],
+                         "data": "0x" + encode(["uint112", "uint112"], [reserve0, reserve1]).hex()})
+        return logs
+
+    def rpc_eth_getLogs(self, query):
+        from_block = int(query.get("fromBlock", "0x0"), 16)
+        to_block = min(int(query.get("toBlock", _hex(self.block_number)), 16), self.block_number)
+        addresses = query.get("address") or sorted(self.history_pairs)
+        addresses = [a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses)]
+        pairs = [pair for pair in addresses if pair in self.history_pairs]
+        topics = (query.get("topics") or [None])[0]
+        topics = {topics} if isinstance(topics, str) else set(topics or [SYNC_TOPIC, SWAP_TOPIC])
+
+        # Лимит проверяется до генерации, как у нод, которые отказывают по размеру ответа
+        per_block = len(pairs) * self.swaps_per_block * len(topics & {SYNC_TOPIC, SWAP_TOPIC})
+        if per_block * max(to_block - from_block + 1, 0) > self.max_logs:
+            raise RpcError(-32005, f"query returned more than {self.max_logs} results")
+        return [log for block in range(from_block, to_block + 1) for pair in pairs
+                for log in self._history_logs(pair, block) if log["topics"][0] in topics]
+
+    def rpc_eth_sendRawTransaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        tx_hash = "0x" + keccak(raw).hex()
+        if tx_hash in self.receipts or any(tx["hash"] == tx_hash for tx in self.mempool):
+            return tx_hash
+        sender = Account.recover_transaction(raw).lower()
+        if raw[0] == 2:
+            fields = rlp.decode(raw[1:])
+            nonce, fee, to, value, data = fields[1], fields[3], fields[5], fields[6], fields[7]
+        else:
+            fields = rlp.decode(raw)
+            nonce, fee, to, value, data = fields[0], fields[1], fields[3], fields[4], fields[5]
+        tx = {
+            "hash": tx_hash, "from": sender, "to": "0x" + to.hex(), "nonce": int.from_bytes(nonce, "big"),
+            "fee": int.from_bytes(fee, "big"), "value": int.from_bytes(value, "big"), "data": data
+        }
+        expected = self.nonces.get(sender, 0)
+        if tx["nonce"] < expected:
+            # Транзакция с тем же nonce ещё в мемпуле: замена, если комиссия выше
+            for index, pending in enumerate(self.mempool):
+                if pending["from"] == sender and pending["nonce"] == tx["nonce"]:
+                    if tx["fee"] <= pending["fee"]:
+                        raise ValueError("replacement transaction underpriced")
+                    self.mempool[index] = tx
+                    self.replaced += 1
+                    return tx_hash
+            raise ValueError("nonce too low")
+        if tx["nonce"] > expected:
+            raise ValueError("nonce too high")
+        self.nonces[sender] = expected + 1
+        self.mempool.append(tx)
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(tx_hash.lower())
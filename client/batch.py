@@ -0,0 +1,61 @@
+from typing import Any, Optional, Union
+from client.rpc_pool import RpcPool
+import itertools
+
+_request_ids = itertools.count(1)
+
+
+class JsonRpcError(Exception):
+    """Ошибка, которую вернул RPC для отдельного запроса в пакете."""
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("code")
+        self.message = error.get("message", "")
+        super().__init__(f"{method}: {self.message} (код {self.code})")
+
+
+class JsonRpcBatch:
+    """
+    Собирает независимые JSON-RPC запросы и отправляет их одним HTTP POST
+    через пул эндпоинтов сети (rpc_url — адрес или список адресов).
+    Результаты возвращаются в порядке добавления; ошибки отдельных запросов
+    возвращаются как JsonRpcError вместо значения.
+    """
+
+    def __init__(self, rpc_url: Union[str, list, tuple], proxy: Optional[str] = None):
+        self.rpc_url = rpc_url
+        self.proxy = proxy
+        self.calls: list[dict] = []
+
+    def add(self, method: str, params: Optional[list] = None) -> int:
+        """Добавляет запрос в пакет и возвращает его индекс в результатах."""
+        self.calls.append({
+            "jsonrpc": "2.0",
+            "id": next(_request_ids),
+            "method": method,
+            "params": params or []
+        })
+        return len(self.calls) - 1
+
+    async def execute(self) -> list[Any]:
+        if not self.calls:
+            return []
+
+        payload = await RpcPool.get(self.rpc_url, self.proxy).post(self.calls)
+
+        # Некоторые ноды отвечают на пакет одиночной ошибкой
+        if isinstance(payload, dict):
+            raise JsonRpcError("batch", payload.get("error") or {"message": str(payload)})
+
+        by_id = {item.get("id"): item for item in payload}
+        results = []
+        for call in self.calls:
+            item = by_id.get(call["id"])
+            if item is None:
+                results.append(JsonRpcError(call["method"], {"message": "нет ответа в пакете"}))
+            elif "error" in item:
+                results.append(JsonRpcError(call["method"], item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results
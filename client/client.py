@@ -1,22 +1,35 @@
 from functools import wraps
 from aiohttp import ClientHttpProxyError
-from web3.middleware.geth_poa import async_geth_poa_middleware
-from web3.exceptions import TransactionNotFound
-from web3 import AsyncWeb3, AsyncHTTPProvider
 from web3.contract import AsyncContract
 from typing import Optional, Union
 from web3.types import TxParams
 from hexbytes import HexBytes
+from eth_account import Account
 from client.networks import Network
+from utils.amount import Amount
+from utils.resources import load_abi
+from utils.encoders import get_cached_contract, encode_approve, encode_balance_of, decode_uint
+from client.provider_registry import ProviderRegistry
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.nonce_manager import NonceManager
+from client.receipt_tracker import ReceiptTracker
+from client.fee_oracle import FeeOracle, FEE_HISTORY_BLOCKS, PRIORITY_PERCENTILES
+from client.signer import SigningService, raw_transaction
+from client.rpc_metrics import instrument
+from client.rpc_pool import ProxyError
+from client.proxy_pool import ProxyPool, ROTATING
+from client.gas_cache import GasCache, GasKey, gas_key
+from client.metadata_cache import MetadataCache
+from client.multicall import MulticallReader
 import asyncio
 import logging
-import json
+import math
 
-with open("abi/erc20_abi.json", "r", encoding="utf-8") as file:
-    ERC20_ABI = json.load(file)
-
-with open("abi/uniswap_router_v2.json", "r", encoding="utf-8") as f:
-    UNISWAP_ROUTER_ABI = json.load(f)
+# Расход газа для оценки комиссии, пока по транзакции нет статистики receipt-ов
+DEFAULT_GAS_LIMIT = 70_000
+TRANSFER_GAS = 21_000
+# Нода принимает замену транзакции, только если обе комиссии выросли хотя бы на 10%
+REPLACEMENT_FEE_BUMP = 1.125
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -37,18 +50,23 @@ def retry_on_proxy_error(max_attempts: int = 3, fallback_no_proxy: bool = True):
             while attempts < max_attempts:
                 try:
                     return await func(self, *args, **kwargs)
-                except ClientHttpProxyError as e:
+                except (ClientHttpProxyError, ProxyError) as e:
                     attempts += 1
                     last_error = e
                     logger.warning(f"Ошибка прокси (попытка {attempts}/{max_attempts}): {e}")
                     if attempts == max_attempts and fallback_no_proxy:
                         logger.info("Отключаем прокси для последней попытки")
-                        self._disable_proxy()
+                        self._switch_proxy(disable=True)
                         try:
                             return await func(self, *args, **kwargs)
-                        except ClientHttpProxyError as e:
+                        except (ClientHttpProxyError, ProxyError) as e:
                             last_error = e
-                    await asyncio.sleep(1)
+                    elif attempts < max_attempts:
+                        previous = self.proxy
+                        self._switch_proxy()
+                        # Пауза нужна, только если переключиться было не на что
+                        if self.proxy == previous:
+                            await asyncio.sleep(1)
             raise ValueError(f"Не удалось выполнить запрос после {max_attempts} попыток: {last_error}")
 
         return wrapper
@@ -57,19 +75,26 @@ def retry_on_proxy_error(max_attempts: int = 3, fallback_no_proxy: bool = True):
 
 
 class Client:
-    def __init__(self, from_address: str, to_address: str, chain_id: int, rpc_url: str, private_key: str,
-                 amount: float, router_address: str, explorer_url: str, proxy: Optional[str] = None):
-        request_kwargs = {"proxy": f"http://{proxy}"} if proxy else {}
-        self.uniswap_router_abi = UNISWAP_ROUTER_ABI
-        self.router_address = router_address
-        self.from_address = from_address
+    def __init__(self, from_address: str, to_address: str, chain_id: int, rpc_url: Union[str, list],
+                 private_key: Optional[str], amount: Union[Amount, str, float], router_address: str, explorer_url: str,
+                 proxy: Optional[str] = None, signer: Optional[SigningService] = None, key_index: Optional[int] = None):
+        """
+        Кошелёк либо со своим private_key, либо с ключом в пуле подписи: тогда передаются signer
+        и key_index, а сам ключ в клиенте не хранится.
+        """
+        self.uniswap_router_abi = load_abi("uniswap_router_v2")
+        # Checksum-адреса из постоянного кэша: в методах адреса уже не пересчитываются
+        self.metadata = MetadataCache.get()
+        self.router_address, self.from_address, self.to_address = self.metadata.checksum_many(
+            [router_address, from_address, to_address])
         self.explorer_url = explorer_url
-        self.private_key = private_key
-        self.to_address = to_address
+        self.private_key = None if signer is not None else private_key
+        if signer is None and private_key is None:
+            raise ValueError("Нужен private_key или пул подписи с индексом ключа")
         self.chain_id = chain_id
-        self.amount = amount
+        # Количество для свапа в wrapped-токене: точное целое в wei, без float
+        self.amount = Amount.parse(amount, 18)
         self.rpc_url = rpc_url
-        self.proxy = proxy
 
         # Определяем сеть
         if isinstance(chain_id, str):
@@ -79,35 +104,79 @@ class Client:
 
         self.chain_id = self.network.chain_id
 
-        # Инициализация AsyncWeb3
-        self.w3 = AsyncWeb3(AsyncHTTPProvider(rpc_url, request_kwargs=request_kwargs))
-        # Применяем middleware для PoA-сетей
-        if self.network.is_poa:
-            self.w3.middleware_onion.clear()
-            self.w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
-
         self.eip_1559 = True
-        self.address = self.w3.to_checksum_address(
-            self.w3.eth.account.from_key(self.private_key).address)
+        # Пул подписи отдаёт только адрес ключа
+        self.signer = signer
+        self.key_index = key_index
+        self.address = signer.addresses[key_index] if signer is not None else Account.from_key(private_key).address
+
+        # Без явного прокси кошелёк получает его из пула (если пул настроен)
+        self.proxy_pool = ProxyPool.current()
+        if proxy is None and self.proxy_pool is not None:
+            proxy = self.proxy_pool.client_proxy(self.address)
+        self.proxy = proxy
+        self._bind_rpc()
+
+        # Компоненты, общие для сети, ходят через ротацию пула, а не через прокси одного кошелька
+        self.shared_proxy = ROTATING if self.proxy_pool is not None else proxy
+        self.nonce_manager = NonceManager.get(self.chain_id, self.address)
+        self.receipt_tracker = ReceiptTracker.get(self.chain_id, self.rpc_url, self.shared_proxy)
+        self.fee_oracle = FeeOracle.get(self.chain_id, self.rpc_url, self.shared_proxy)
+        self.gas_cache = GasCache.get(self.chain_id)
+        # Отправленные транзакции, gasUsed которых ещё не учтён: хэш → (ключ кэша, лимит газа)
+        self.sent_gas: dict[bytes, tuple[GasKey, int]] = {}
+
+    def _bind_rpc(self) -> None:
+        # Общий для всех кошельков AsyncWeb3 на эндпоинт и прокси
+        self.w3 = ProviderRegistry.get_web3(self.rpc_url, self.proxy, self.network.is_poa)
+        instrument(self.w3, self.network.name)
+
+    def _switch_proxy(self, disable: bool = False) -> None:
+        """Переводит кошелёк на другой прокси из пула (или отключает прокси) и перепривязывает RPC."""
+        if disable or self.proxy_pool is None:
+            self.proxy = None
+        elif self.proxy != ROTATING:
+            self.proxy = self.proxy_pool.fail_over(self.address, self.proxy)
+        self._bind_rpc()
 
     # Получение баланса нативного токена
+    @retry_on_proxy_error()
     async def get_native_balance(self) -> float:
         """Получает баланс нативного токена в ETH/BNB/MATIC и т.д."""
         balance_wei = await self.w3.eth.get_balance(self.address)
         return balance_wei
 
+    # Транзакция врапа нативного токена
+    async def build_wrap_tx(self, amount_wei: int = None) -> TxParams:
+        """Готовая к подписи транзакция deposit() со следующим nonce кошелька."""
+        from utils.wrappers import wrap_native_token, wrap_call
+        if amount_wei is None:
+            amount_wei = self.amount.wei
+
+        nonce = await self.nonce_manager.get_nonce(self.w3)
+        try:
+            # Симуляция (если лимита нет в кэше) идёт параллельно с получением комиссий
+            fee_fields, gas = await asyncio.gather(
+                self.fee_oracle.tx_fields(self.eip_1559),
+                self.estimate_gas_limit(wrap_call(self.network.name, amount_wei, self.address)))
+            return await wrap_native_token(self.w3, self.network.name, amount_wei, self.address, nonce, fee_fields,
+                                           gas=gas, chain_id=await self.get_chain_id())
+        except Exception:
+            await self.nonce_manager.release(nonce)
+            raise
+
     # Врап нативного токена
     async def wrap_native(self, amount_wei: int = None) -> str:
         """
         Оборачивает нативный токен (ETH/BNB/MATIC) в WETH/WBNB/WMATIC.
         """
-        from utils.wrappers import wrap_native_token
-        if amount_wei is None:
-            amount_wei = self.to_wei_main(self.amount, 18)
-
-        tx = await wrap_native_token(self.w3, self.network.name, amount_wei, self.address)
-        signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        tx = await self.build_wrap_tx(amount_wei)
+        try:
+            tx_hash = await self.w3.eth.send_raw_transaction(await self.sign_tx(tx))
+        except Exception:
+            await self.nonce_manager.release(tx["nonce"])
+            raise
+        self.sent_gas[bytes(tx_hash)] = (gas_key(tx["to"], tx["data"]), tx["gas"])
         logger.info(f"Отправлен wrap-тx: {tx_hash.hex()}")
         return tx_hash.hex()
 
@@ -117,102 +186,155 @@ class Client:
         Разворачивает WETH/WBNB/... обратно в нативный токен.
         """
         from utils.wrappers import unwrap_native_token
-        tx = await unwrap_native_token(self.w3, self.network.name, amount_wei, self.address)
-        signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        nonce = await self.nonce_manager.get_nonce(self.w3)
+        try:
+            fee_fields = await self.fee_oracle.tx_fields(self.eip_1559)
+            tx = await unwrap_native_token(self.w3, self.network.name, amount_wei, self.address, nonce, fee_fields,
+                                           chain_id=await self.get_chain_id())
+            tx_hash = await self.w3.eth.send_raw_transaction(await self.sign_tx(tx))
+        except Exception:
+            await self.nonce_manager.release(nonce)
+            raise
         logger.info(f"Отправлен unwrap-тx: {tx_hash.hex()}")
         return tx_hash.hex()
 
     # Получение баланса ERC20
     async def get_erc20_balance(self) -> float | int:
-        # ABI для balanceOf
-        erc20_abi = [
-            {
-                "inputs": [{"name": "_owner", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"name": "balance", "type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"name": "", "type": "uint8"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "symbol",
-                "outputs": [{"name": "", "type": "string"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
-        contract = self.w3.eth.contract(
-            address=self.w3.to_checksum_address(self.from_address), abi=erc20_abi)
         try:
-            balance = await contract.functions.balanceOf(self.address).call()
-            return balance
+            result = await self.w3.eth.call({
+                "to": self.from_address,
+                "data": encode_balance_of(self.address)
+            })
+            return decode_uint(result)
         except Exception as e:
             logger.error(f"Ошибка при получении баланса ERC20: {e}")
             return 0
 
+    # Снимок состояния кошелька одним пакетным запросом
+    @retry_on_proxy_error()
+    async def get_snapshot(self) -> dict:
+        """
+        Получает балансы, nonce, данные о комиссиях и время последнего блока
+        одним JSON-RPC пакетом вместо цепочки отдельных запросов. Chain id берётся из кэша метаданных.
+        """
+        chain_id = await self.get_chain_id()
+        batch = JsonRpcBatch(self.rpc_url, self.proxy)
+        batch.add("eth_getBalance", [self.address, "latest"])
+        batch.add("eth_call", [{"to": self.from_address, "data": encode_balance_of(self.address)}, "latest"])
+        batch.add("eth_getTransactionCount", [self.address, "pending"])
+        batch.add("eth_gasPrice")
+        batch.add("eth_feeHistory", [hex(FEE_HISTORY_BLOCKS), "latest", PRIORITY_PERCENTILES])
+        batch.add("eth_getBlockByNumber", ["latest", False])
+        native_balance, erc20_balance, nonce, gas_price, fee_history, block = await batch.execute()
+
+        # Обязательные поля: ошибка любого из них делает снимок бесполезным
+        for value in (native_balance, nonce, gas_price, block):
+            if isinstance(value, JsonRpcError):
+                raise value
+
+        if isinstance(erc20_balance, JsonRpcError):
+            logger.error(f"Ошибка при получении баланса ERC20: {erc20_balance}")
+            erc20_balance = "0x0"
+
+        # Заодно обновляем общий для сети оракул комиссий
+        fees = self.fee_oracle.ingest(
+            None if isinstance(fee_history, JsonRpcError) else fee_history, int(gas_price, 16))
+
+        return {
+            "chain_id": chain_id,
+            "native_balance": int(native_balance, 16),
+            "erc20_balance": int(erc20_balance, 16) if erc20_balance not in (None, "0x") else 0,
+            "nonce": int(nonce, 16),
+            "gas_price": fees["gas_price"],
+            "base_fee": fees["base_fee"],
+            "max_priority_fee": fees["max_priority_fee_per_gas"],
+            "block_number": int(block["number"], 16),
+            "timestamp": int(block["timestamp"], 16)
+        }
+
+    # Chain id для подписи
+    async def get_chain_id(self) -> int:
+        """
+        Chain id сети без запроса к RPC: соответствие эндпоинтов сети (и код роутера)
+        сверяется кэшем метаданных раз в REVALIDATE_SECONDS одним пакетом.
+        """
+        if not self.metadata.is_verified(self.chain_id, self.rpc_url):
+            await self.metadata.verify(self.chain_id, self.rpc_url, self.shared_proxy, self.router_address)
+        return self.chain_id
+
+    # Decimals и symbol токенов
+    async def load_token_metadata(self, tokens: Optional[list[str]] = None) -> None:
+        """Загружает в кэш метаданные токенов, которых там ещё нет (по умолчанию — токенов свапа)."""
+        tokens = tokens or [self.from_address, self.to_address]
+        missing = [token for token in tokens if self.metadata.token(self.chain_id, token) is None]
+        if not missing:
+            return
+        try:
+            self.metadata.store_tokens(self.chain_id, await MulticallReader(self.w3).get_token_metadata(missing))
+        except Exception as e:
+            # Без метаданных работаем на decimals по умолчанию, попробуем в следующий раз
+            logger.warning(f"Не удалось получить метаданные токенов: {e}")
+
+    async def token_decimals(self, token: str) -> int:
+        """Decimals токена из кэша, при необходимости с загрузкой; без них — ошибка, а не значение по умолчанию."""
+        await self.load_token_metadata([token])
+        info = self.metadata.token(self.chain_id, token)
+        if info is None:
+            raise ValueError(f"Не удалось получить decimals токена {token}")
+        return info["decimals"]
+
+    def decimals(self, token: str, default: int = 18) -> int:
+        """Decimals токена из кэша метаданных (см. load_token_metadata)."""
+        info = self.metadata.token(self.chain_id, token)
+        return info["decimals"] if info is not None else default
+
     # Создание объекта контракт для дальнейшего обращения к нему
     async def get_contract(self, contract_address: str, abi: list) -> AsyncContract:
-        return self.w3.eth.contract(
-            address=self.w3.to_checksum_address(contract_address), abi=abi
-        )
+        return get_cached_contract(self.w3, contract_address, abi)
+
+    # Ожидаемый расход газа вызова по статистике receipt-ов
+    def expected_gas(self, to: str, data: Optional[str], default: int = DEFAULT_GAS_LIMIT) -> int:
+        return self.gas_cache.expected(gas_key(to, data), default)
 
     # Получение суммы газа за транзакцию
-    async def get_tx_fee(self) -> int:
+    async def get_tx_fee(self, gas: int = DEFAULT_GAS_LIMIT) -> int:
         try:
-            fee_history = await self.w3.eth.fee_history(10, "latest", [50])
-            base_fee = fee_history['baseFeePerGas'][-1]
-            max_priority_fee = await self.w3.eth.max_priority_fee
-            estimated_gas = 70_000
-            max_fee_per_gas = (base_fee + max_priority_fee) * estimated_gas
-
-            return max_fee_per_gas
+            return await self.fee_oracle.estimate_cost(gas)
         except Exception as e:
             logger.warning(f"Ошибка при расчёте комиссии, используем fallback: {e}")
             fallback_gas_price = await self.w3.eth.gas_price
-            return fallback_gas_price * 70_000
+            return fallback_gas_price * gas
+
+    # Сумма газа за транзакцию по данным снимка, без дополнительных запросов
+    @staticmethod
+    def get_tx_fee_from_snapshot(snapshot: dict, gas: int = DEFAULT_GAS_LIMIT) -> int:
+        return (snapshot["base_fee"] + snapshot["max_priority_fee"]) * gas
+
+    # Лимит газа: из кэша по receipt-ам или по eth_estimateGas
+    async def estimate_gas_limit(self, call: TxParams) -> int:
+        key = gas_key(call["to"], call.get("data"))
+        limit = self.gas_cache.limit(key)
+        if limit is not None:
+            return limit
+        call = {field: call[field] for field in ("from", "to", "value", "data") if field in call}
+        return self.gas_cache.pad(key, await self.w3.eth.estimate_gas(call))
 
     # Преобразование в веи
-    def to_wei_main(self, number: int | float, decimals: int):
-        unit_name = {
-            6: "mwei",
-            9: "gwei",
-            18: "ether"
-        }.get(decimals)
-
-        if not unit_name:
-            raise RuntimeError(f"Невозможно найти имя юнита с децималами: {decimals}")
-        return self.w3.to_wei(number, unit_name)
+    @staticmethod
+    def to_wei_main(number: Union[Amount, str, int, float], decimals: int) -> int:
+        """Количество в целых токенах → минимальные единицы, точно и для любых decimals."""
+        return Amount.parse(number, decimals).wei
 
     # Преобразование из веи
-    def from_wei_main(self, number: int | float, decimals: int):
-        unit_name = {
-            6: "mwei",
-            9: "gwei",
-            18: "ether"
-        }.get(decimals)
-
-        if not unit_name:
-            raise RuntimeError(f"Невозможно найти имя юнита с децималами: {decimals}")
-        return self.w3.from_wei(number, unit_name)
+    @staticmethod
+    def from_wei_main(number: int, decimals: int) -> Amount:
+        return Amount(number, decimals)
 
     # Метод для построения транзакции на approval
     async def build_approve_tx(self, token_address: str, spender: str, amount: int) -> TxParams:
-        token_address = self.w3.to_checksum_address(token_address)
-        spender = self.w3.to_checksum_address(spender)
-        contract = await self.get_contract(token_address, ERC20_ABI)
+        token_address, spender = self.metadata.checksum_many([token_address, spender])
         try:
-            tx_data = contract.encodeABI(
-                fn_name="approve",
-                args=[spender, amount]
-            )
+            tx_data = encode_approve(spender, amount)
         except Exception as e:
             logger.error(f"Ошибка при формировании approve транзакции: {e}")
             raise
@@ -235,7 +357,7 @@ class Client:
         amount_out_min = int(quote_data['minReceiveAmount'])
 
         # Строим транзакцию для обмена
-        contract = await self.get_contract(contract_address, ERC20_ABI)
+        contract = await self.get_contract(contract_address, load_abi("erc20_abi"))
 
         tx_data = contract.encodeABI(
             fn_name="swap",
@@ -252,74 +374,151 @@ class Client:
         return tx
 
     # Подготовка транзакции
-    async def prepare_tx(self, value: Union[int, float] = 0) -> TxParams:
+    async def prepare_tx(self, value: Union[Amount, int] = 0, snapshot: Optional[dict] = None) -> TxParams:
+        """
+        Подготавливает базовые поля транзакции; value — Amount или целое число wei.
+        Если передан снимок из get_snapshot, данные берутся из него без запросов к RPC.
+        Nonce выдаётся локальным NonceManager, комиссии — общим для сети FeeOracle.
+        """
+        if snapshot:
+            self.nonce_manager.seed(snapshot["nonce"])
+            chain_id = snapshot["chain_id"]
+        else:
+            chain_id = await self.get_chain_id()
+
         transaction: TxParams = {
-            "chainId": await self.w3.eth.chain_id,
-            "nonce": await self.w3.eth.get_transaction_count(self.address),
+            "chainId": chain_id,
+            "nonce": await self.nonce_manager.get_nonce(self.w3),
             "from": self.address,
-            "value": self.w3.to_wei(value, "ether"),
+            "value": int(value),
         }
 
-        if self.eip_1559:
-            base_fee = await self.w3.eth.gas_price
-            max_priority_fee_per_gas = await self.w3.eth.max_priority_fee or base_fee
-            max_fee_per_gas = int(base_fee * 1.25 + max_priority_fee_per_gas)
-
-            transaction.update({
-                "maxPriorityFeePerGas": max_priority_fee_per_gas,
-                "maxFeePerGas": max_fee_per_gas,
-                "type": "0x2",
-            })
-        else:
-            transaction["gasPrice"] = int((await self.w3.eth.gas_price) * 1.25)
+        transaction.update(await self.fee_oracle.tx_fields(self.eip_1559))
 
         return transaction
 
+    # Транзакция вызова контракта с лимитом газа
+    async def build_tx(self, to: str, data: str, value: Union[Amount, int] = 0,
+                       snapshot: Optional[dict] = None) -> TxParams:
+        """
+        Собирает готовую к подписи транзакцию. Симуляция для лимита газа (если лимита нет в кэше)
+        выполняется параллельно с выдачей nonce и получением комиссий.
+        """
+        call = {"from": self.address, "to": to, "value": int(value), "data": data}
+        tx, gas = await asyncio.gather(self.prepare_tx(value, snapshot), self.estimate_gas_limit(call),
+                                       return_exceptions=True)
+        if isinstance(gas, BaseException):
+            if not isinstance(tx, BaseException):
+                await self.nonce_manager.release(tx["nonce"])
+            raise gas
+        if isinstance(tx, BaseException):
+            raise tx
+        tx.update({"to": to, "data": data, "gas": gas})
+        return tx
+
+    # Подпись транзакции
+    async def sign_tx(self, transaction: TxParams) -> bytes:
+        """Подписывает транзакцию в пуле SigningService, если ключ в нём, иначе в текущем потоке."""
+        if self.signer is not None:
+            return await self.signer.sign(self.key_index, transaction)
+        return raw_transaction(self.w3.eth.account.sign_transaction(transaction, self.private_key))
+
     # Подпись и отправка транзакции
-    async def sign_and_send_tx(self, transaction: TxParams, without_gas: bool = False):
+    async def sign_and_send_tx(self, transaction: TxParams, without_gas: bool = False, replacement: bool = False):
+        """
+        Подписывает и отправляет транзакцию; возвращает хэш или None при ошибке.
+        replacement — транзакция заменяет уже отправленную с тем же nonce, и при ошибке
+        nonce не возвращается в счётчик: он занят исходной транзакцией.
+        """
+        sent = False
         try:
-            if not without_gas:
-                transaction["gas"] = int((await self.w3.eth.estimate_gas(transaction)) * 1.5)
+            if not without_gas and "gas" not in transaction:
+                transaction["gas"] = await self.estimate_gas_limit(transaction)
 
-            signed = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            signed_raw_tx = signed.raw_transaction
+            signed_raw_tx = await self.sign_tx(transaction)
             logger.info("Транзакция подписана\n")
 
             tx_hash_bytes = await self.w3.eth.send_raw_transaction(signed_raw_tx)
+            sent = True
             tx_hash_hex = self.w3.to_hex(tx_hash_bytes)
             logger.info("Транзакция отправлена: %s\n", tx_hash_hex)
+            if "gas" in transaction and "to" in transaction:
+                self.sent_gas[bytes(tx_hash_bytes)] = (gas_key(transaction["to"], transaction.get("data")), transaction["gas"])
 
             return tx_hash_hex
         except Exception as e:
             logger.error(f"Ошибка при отправке транзакции: {e}")
+            if not sent and not replacement and "nonce" in transaction:
+                if "nonce" in str(e).lower():
+                    # Локальный счётчик разошёлся с сетью
+                    self.nonce_manager.invalidate()
+                else:
+                    # Транзакция не ушла в сеть — nonce можно выдать повторно
+                    await self.nonce_manager.release(transaction["nonce"])
             return None
 
-    # Ожидание результата транзакции
-    async def wait_tx(self, tx_hash: Union[str, HexBytes], explorer_url: Optional[str] = None) -> bool:
-        total_time = 0
-        timeout = 120
-        poll_latency = 10
+    # Замена отправленной транзакции
+    async def replace_tx(self, transaction: TxParams, cancel: bool = False) -> Optional[str]:
+        """
+        Отправляет замену транзакции с тем же nonce и комиссиями выше на REPLACEMENT_FEE_BUMP
+        (и не ниже текущих). cancel — вместо исходного вызова пустой перевод самому себе.
+        """
+        fresh = await self.fee_oracle.tx_fields(self.eip_1559)
+        replacement = dict(transaction)
+        for field in ("maxFeePerGas", "maxPriorityFeePerGas", "gasPrice"):
+            if field in replacement:
+                replacement[field] = max(math.ceil(replacement[field] * REPLACEMENT_FEE_BUMP), fresh.get(field, 0))
+        if cancel:
+            replacement.update({"to": self.address, "value": 0, "data": "0x", "gas": TRANSFER_GAS})
+        action = "Отмена" if cancel else "Замена"
+        logger.info(f"{action} транзакции с nonce {transaction['nonce']}")
+        return await self.sign_and_send_tx(replacement, replacement=True)
+
+    # Ожидание первой подтвердившейся из нескольких транзакций
+    async def wait_first(self, tx_hashes: list[str], timeout: float = 120) -> tuple[Optional[str], Optional[dict]]:
+        """
+        Ждёт receipt любой из транзакций (например, исходной и её замены с тем же nonce).
+        Возвращает (хэш, receipt) первой подтвердившейся или (None, None) по таймауту.
+        """
+        futures = {self.receipt_tracker.track(tx_hash, timeout): tx_hash for tx_hash in tx_hashes}
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                receipt = future.result()
+                if receipt is not None:
+                    self._learn_gas(futures[future], receipt)
+                    return futures[future], receipt
+        return None, None
+
+    def _learn_gas(self, tx_hash: Union[str, HexBytes], receipt: dict) -> None:
+        sent = self.sent_gas.pop(bytes(HexBytes(tx_hash)), None)
+        if sent is not None and receipt.get("gasUsed"):
+            success = int(receipt.get("status") or "0x0", 16) == 1
+            self.gas_cache.observe(sent[0], int(receipt["gasUsed"], 16), sent[1], success)
 
+    # Ожидание результата транзакции
+    async def wait_tx(self, tx_hash: Union[str, HexBytes], explorer_url: Optional[str] = None,
+                      timeout: float = 120) -> bool:
         tx_hash_bytes = HexBytes(tx_hash)  # Приведение к HexBytes
 
-        while True:
-            try:
-                receipt = await self.w3.eth.get_transaction_receipt(tx_hash_bytes)
-                status = receipt.get("status")
-                if status == 1:
-                    logger.info(f"Транзакция выполнена успешно: {explorer_url}/tx/{tx_hash_bytes.hex()}")
-                    return True
-                elif status is None:
-                    await asyncio.sleep(poll_latency)
-                else:
-                    logger.error(f"Транзакция не выполнена: {explorer_url}/tx/{tx_hash_bytes.hex()}")
-                    return False
-            except TransactionNotFound:
-                if total_time > timeout:
-                    logger.warning(f"Транзакция {tx_hash_bytes.hex()} не подтвердилась за 120 секунд")
-                    return False
-                total_time += poll_latency
-                await asyncio.sleep(poll_latency)
-            except Exception as e:
-                logger.error(f"Ошибка при получении receipt: {e}")
-                return False
+        try:
+            # Receipt проверяется на каждом новом блоке общим для сети трекером
+            receipt = await self.receipt_tracker.wait(tx_hash_bytes, timeout)
+        except Exception as e:
+            logger.error(f"Ошибка при получении receipt: {e}")
+            return False
+
+        if receipt is None:
+            logger.warning(f"Транзакция {tx_hash_bytes.hex()} не подтвердилась за {timeout} секунд")
+            # Транзакция могла выпасть из мемпула — nonce нужно пересинхронизировать
+            self.nonce_manager.invalidate()
+            return False
+
+        self._learn_gas(tx_hash_bytes, receipt)
+        if int(receipt.get("status") or "0x0", 16) == 1:
+            logger.info(f"Транзакция выполнена успешно: {explorer_url}/tx/{tx_hash_bytes.hex()}")
+            return True
+
+        logger.error(f"Транзакция не выполнена: {explorer_url}/tx/{tx_hash_bytes.hex()}")
+        return False
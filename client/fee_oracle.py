@@ -0,0 +1,110 @@
+from typing import Optional, Union
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.rpc_pool import normalize_urls
+from client.receipt_tracker import BLOCK_TIMES, DEFAULT_BLOCK_TIME
+from utils.logger import logger
+import asyncio
+import time
+
+FEE_HISTORY_BLOCKS = 5
+PRIORITY_PERCENTILES = [25, 50, 75]
+# Запас на рост base fee между подготовкой и включением транзакции (как в Client.prepare_tx)
+BASE_FEE_MULTIPLIER = 1.25
+
+
+class FeeOracle:
+    """
+    Общий для сети источник данных о комиссиях.
+    Обновляется из fee_history не чаще одного раза за блок и отдаёт всем клиентам
+    одинаковые EIP-1559 и legacy поля из памяти.
+    """
+
+    _instances: dict[tuple[int, str], "FeeOracle"] = {}
+
+    def __init__(self, chain_id: int, rpc_url: Union[str, list], proxy: Optional[str] = None):
+        self.chain_id = chain_id
+        self.rpc_url = rpc_url
+        self.proxy = proxy
+        self.ttl = BLOCK_TIMES.get(chain_id, DEFAULT_BLOCK_TIME)
+        self.fees: Optional[dict] = None
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def get(cls, chain_id: int, rpc_url: Union[str, list], proxy: Optional[str] = None) -> "FeeOracle":
+        key = (chain_id, normalize_urls(rpc_url))
+        if key not in cls._instances:
+            cls._instances[key] = cls(chain_id, rpc_url, proxy)
+        return cls._instances[key]
+
+    def _is_fresh(self) -> bool:
+        return self.fees is not None and time.monotonic() - self.fees["updated_at"] < self.ttl
+
+    def ingest(self, fee_history: Optional[dict], gas_price: int, percentiles: list[int] = None) -> dict:
+        """Обновляет кэш из уже полученных fee_history (в формате JSON-RPC) и gas_price."""
+        percentiles = percentiles or PRIORITY_PERCENTILES
+        base_fee = gas_price
+        priority_fees = {p: 0 for p in percentiles}
+        block_number = None
+
+        if fee_history and fee_history.get("baseFeePerGas"):
+            base_fee = int(fee_history["baseFeePerGas"][-1], 16)
+            block_number = int(fee_history["oldestBlock"], 16) + len(fee_history["baseFeePerGas"]) - 2
+            rewards = fee_history.get("reward") or []
+            for i, percentile in enumerate(percentiles):
+                values = sorted(int(r[i], 16) for r in rewards if len(r) > i)
+                if values:
+                    priority_fees[percentile] = values[len(values) // 2]
+
+        # Сети без рынка приоритетных комиссий отдают нулевые награды — берём разницу с gas_price
+        priority_fee = priority_fees.get(50) or max(gas_price - base_fee, 0)
+
+        self.fees = {
+            "base_fee": base_fee,
+            "priority_fees": priority_fees,
+            "max_priority_fee_per_gas": priority_fee,
+            "max_fee_per_gas": int(base_fee * BASE_FEE_MULTIPLIER + priority_fee),
+            "gas_price": gas_price,
+            "legacy_gas_price": int(gas_price * BASE_FEE_MULTIPLIER),
+            "block_number": block_number,
+            "updated_at": time.monotonic()
+        }
+        return self.fees
+
+    async def refresh(self) -> dict:
+        batch = JsonRpcBatch(self.rpc_url, self.proxy)
+        batch.add("eth_feeHistory", [hex(FEE_HISTORY_BLOCKS), "latest", PRIORITY_PERCENTILES])
+        batch.add("eth_gasPrice")
+        fee_history, gas_price = await batch.execute()
+
+        if isinstance(gas_price, JsonRpcError):
+            raise gas_price
+        if isinstance(fee_history, JsonRpcError):
+            logger.warning(f"[{self.chain_id}] fee_history недоступен, используем gas_price: {fee_history}")
+            fee_history = None
+        return self.ingest(fee_history, int(gas_price, 16))
+
+    async def get_fees(self) -> dict:
+        """Текущие данные о комиссиях; RPC запрашивается не чаще одного раза за блок."""
+        if self._is_fresh():
+            return self.fees
+        async with self.lock:
+            # Пока ждали блокировку, кэш мог обновить другой клиент
+            if not self._is_fresh():
+                await self.refresh()
+            return self.fees
+
+    async def tx_fields(self, eip_1559: bool = True) -> dict:
+        """Поля комиссии, готовые для подстановки в транзакцию."""
+        fees = await self.get_fees()
+        if eip_1559:
+            return {
+                "maxPriorityFeePerGas": fees["max_priority_fee_per_gas"],
+                "maxFeePerGas": fees["max_fee_per_gas"],
+                "type": "0x2"
+            }
+        return {"gasPrice": fees["legacy_gas_price"]}
+
+    async def estimate_cost(self, gas: int) -> int:
+        """Оценка стоимости транзакции в wei для заданного количества газа."""
+        fees = await self.get_fees()
+        return (fees["base_fee"] + fees["max_priority_fee_per_gas"]) * gas
@@ -0,0 +1,130 @@
+from typing import Optional
+from client.metadata_cache import MetadataCache
+from utils.encoders import SWAP_EXACT_ETH_FOR_TOKENS
+import math
+
+# Запас к оценке eth_estimateGas, пока по ключу нет receipt-ов (как было для всех транзакций)
+ESTIMATE_PADDING = 1.5
+# Сколько успешных receipt-ов нужно, чтобы отправлять без eth_estimateGas
+MIN_SAMPLES = 3
+# Лимит = среднее + SIGMAS стандартных отклонений, но не меньше максимума с запасом MAX_MARGIN
+SIGMAS = 4
+MAX_MARGIN = 1.1
+# Лимит по статистике не ниже этой доли от среднего (защита от нулевого разброса),
+# а при симуляции — не ниже этой доли от оценки
+MIN_PADDING = 1.15
+
+# Функции роутера, у которых расход газа зависит от длины пути: селектор → смещение слова с offset-ом path
+PATH_ARGUMENT_OFFSETS = {SWAP_EXACT_ETH_FOR_TOKENS: 32}
+
+GasKey = tuple[str, str, int]
+
+
+def gas_key(to: str, data: Optional[str]) -> GasKey:
+    """Ключ кэша для вызова: (контракт, селектор функции, длина пути для свапов роутера)."""
+    raw = bytes.fromhex((data or "0x")[2:])
+    selector = raw[:4]
+    path_length = 0
+    offset_position = PATH_ARGUMENT_OFFSETS.get(selector)
+    if offset_position is not None:
+        offset = int.from_bytes(raw[4 + offset_position:4 + offset_position + 32], "big")
+        path_length = int.from_bytes(raw[4 + offset:4 + offset + 32], "big")
+    return to.lower(), selector.hex(), path_length
+
+
+def _key_text(key: GasKey) -> str:
+    """Ключ в виде строки для JSON-кэша."""
+    return ":".join(map(str, key))
+
+
+def swap_gas_key(router: str, path_length: int) -> GasKey:
+    """Ключ свапа swapExactETHForTokens без сборки calldata."""
+    return router.lower(), SWAP_EXACT_ETH_FOR_TOKENS.hex(), path_length
+
+
+class GasStats:
+    """Среднее и дисперсия gasUsed по алгоритму Уэлфорда, без хранения выборки."""
+
+    __slots__ = ("count", "mean", "m2", "max")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0, max: int = 0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.max = max
+
+    def to_list(self) -> list:
+        return [self.count, self.mean, self.m2, self.max]
+
+    def observe(self, gas_used: int) -> None:
+        self.count += 1
+        delta = gas_used - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (gas_used - self.mean)
+        self.max = max(self.max, gas_used)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def limit(self) -> int:
+        return math.ceil(max(self.mean + SIGMAS * self.std, self.max * MAX_MARGIN, self.mean * MIN_PADDING))
+
+
+class GasCache:
+    """
+    Лимиты газа по фактическому gasUsed из receipt-ов для ключа (сеть, контракт, селектор, длина пути).
+    Когда по ключу набралось MIN_SAMPLES успешных транзакций, лимит берётся из статистики
+    без eth_estimateGas, а запас определяется разбросом gasUsed, а не фиксированным множителем.
+    Статистика хранится в MetadataCache и переживает перезапуск. Экземпляры общие для всех кошельков одной сети.
+    """
+
+    _instances: dict[int, "GasCache"] = {}
+
+    def __init__(self, chain_id: int, metadata: Optional[MetadataCache] = None):
+        self.chain_id = chain_id
+        self.metadata = metadata or MetadataCache.get()
+        self.stats: dict[GasKey, GasStats] = {}
+        for key, values in self.metadata.gas_stats(chain_id).items():
+            to, selector, path_length = key.split(":")
+            self.stats[(to, selector, int(path_length))] = GasStats(*values)
+
+    @classmethod
+    def get(cls, chain_id: int) -> "GasCache":
+        if chain_id not in cls._instances:
+            cls._instances[chain_id] = cls(chain_id)
+        return cls._instances[chain_id]
+
+    def limit(self, key: GasKey) -> Optional[int]:
+        """Лимит газа без симуляции или None, если данных по ключу недостаточно."""
+        stats = self.stats.get(key)
+        if stats is None or stats.count < MIN_SAMPLES:
+            return None
+        return stats.limit()
+
+    def pad(self, key: GasKey, estimate: int) -> int:
+        """
+        Лимит по результату eth_estimateGas. Оценка всегда отправляется с запасом: фиксированным,
+        пока статистики нет, и не меньше MIN_PADDING и лимита по статистике, когда она есть.
+        """
+        stats = self.stats.get(key)
+        if stats is not None and stats.count:
+            return max(math.ceil(estimate * MIN_PADDING), stats.limit())
+        return math.ceil(estimate * ESTIMATE_PADDING)
+
+    def expected(self, key: GasKey, default: int) -> int:
+        """Ожидаемый расход газа для оценки комиссии."""
+        stats = self.stats.get(key)
+        return round(stats.mean) if stats is not None and stats.count else default
+
+    def observe(self, key: GasKey, gas_used: int, gas_limit: Optional[int], success: bool) -> None:
+        """Учитывает receipt. Транзакция, упёршаяся в лимит, сбрасывает статистику ключа."""
+        if not success and gas_limit is not None and gas_used >= gas_limit:
+            # Кончился газ: лимит по статистике оказался мал, дальше снова через симуляцию
+            if self.stats.pop(key, None) is not None:
+                self.metadata.store_gas_stats(self.chain_id, _key_text(key), None)
+            return
+        if success:
+            stats = self.stats.setdefault(key, GasStats())
+            stats.observe(gas_used)
+            self.metadata.store_gas_stats(self.chain_id, _key_text(key), stats.to_list())
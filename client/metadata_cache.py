@@ -0,0 +1,238 @@
+from eth_utils import keccak, to_checksum_address
+from typing import Optional, Union
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.rpc_pool import normalize_urls
+from utils.logger import logger
+from utils.resources import resolve_path
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+# Версия формата файла: при изменении структуры старый кэш отбрасывается целиком
+CACHE_VERSION = 1
+DEFAULT_PATH = resolve_path("cache", "metadata.json")
+# Как часто сверять кэш с сетью: chain id эндпоинтов и код роутера
+REVALIDATE_SECONDS = 24 * 60 * 60
+# Статистика газа меняется на каждом receipt-е: на диск не чаще, чем раз в столько секунд (и в flush)
+GAS_FLUSH_SECONDS = 30
+
+
+def _networks_fingerprint() -> str:
+    """Отпечаток constants/networks_data.json: правка конфигурации сетей сбрасывает кэш."""
+    with open(resolve_path("constants", "networks_data.json"), "rb") as f:
+        return keccak(f.read()).hex()
+
+
+def _pair_key(token0: str, token1: str) -> str:
+    return f"{token0.lower()}:{token1.lower()}"
+
+
+class MetadataCache:
+    """
+    Постоянный кэш статических данных сетей в JSON-файле: проверенные chain id эндпоинтов,
+    decimals и symbol токенов, checksum-адреса, хэши кода роутеров, фабрики и адреса пар,
+    статистика gasUsed для GasCache.
+    С тёплым кэшем запуск и отправка транзакций не делают RPC-запросов за статическими данными;
+    раз в REVALIDATE_SECONDS одним пакетом сверяются chain id и код роутера. Если код роутера
+    изменился, его фабрика и пары забываются; смена версии формата или networks_data.json
+    сбрасывает весь кэш.
+    """
+
+    _instance: Optional["MetadataCache"] = None
+
+    def __init__(self, path: Union[str, os.PathLike] = DEFAULT_PATH):
+        self.path = str(path)
+        self.data = self._empty()
+        self.locks: dict[int, asyncio.Lock] = {}
+        # Есть изменения, ещё не записанные в файл (статистика газа)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.load()
+
+    @classmethod
+    def get(cls) -> "MetadataCache":
+        """Кэш процесса; файл читается при первом обращении."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"version": CACHE_VERSION, "networks": _networks_fingerprint(), "addresses": {}, "chains": {}}
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Кэш метаданных {self.path} не прочитан, создаём заново: {e}")
+            return
+        if data.get("version") != CACHE_VERSION or data.get("networks") != self.data["networks"]:
+            logger.info("Кэш метаданных устарел (версия или конфигурация сетей), создаём заново")
+            return
+        self.data = data
+
+    def save(self) -> None:
+        """
+        Атомарная запись: при падении посередине остаётся прежний файл. Временный файл уникален,
+        поэтому параллельные процессы (несколько заданий cron) не пишут в один и тот же файл.
+        """
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=".metadata-",
+                                             suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump(self.data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            self.saved_at = time.monotonic()
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш метаданных: {e}")
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+
+    def flush(self) -> None:
+        """Записывает отложенные изменения; вызывается при завершении работы."""
+        if self.dirty:
+            self.save()
+
+    def _chain(self, chain_id: int) -> dict:
+        return self.data["chains"].setdefault(str(chain_id), {"endpoints": {}, "tokens": {}, "routers": {}})
+
+    # --- адреса -------------------------------------------------------------
+
+    def checksum(self, address: str) -> str:
+        """Checksum-адрес из кэша; новый адрес вычисляется один раз и сохраняется."""
+        key = address.lower()
+        cached = self.data["addresses"].get(key)
+        if cached is None:
+            cached = self.data["addresses"][key] = to_checksum_address(address)
+            self.save()
+        return cached
+
+    def checksum_many(self, addresses: list[str]) -> list[str]:
+        """То же для списка, с одной записью файла на все новые адреса."""
+        known = self.data["addresses"]
+        missing = {a.lower(): a for a in addresses if a.lower() not in known}
+        for key, address in missing.items():
+            known[key] = to_checksum_address(address)
+        if missing:
+            self.save()
+        return [known[a.lower()] for a in addresses]
+
+    # --- сеть и роутер ------------------------------------------------------
+
+    def is_verified(self, chain_id: int, rpc_url: Union[str, list, tuple]) -> bool:
+        """Chain id эндпоинтов сверялся с сетью не раньше REVALIDATE_SECONDS назад."""
+        checked_at = self._chain(chain_id)["endpoints"].get("|".join(normalize_urls(rpc_url)))
+        return checked_at is not None and time.time() - checked_at < REVALIDATE_SECONDS
+
+    async def verify(self, chain_id: int, rpc_url: Union[str, list, tuple], proxy: Optional[str] = None,
+                     router: Optional[str] = None) -> None:
+        """
+        Сверяет chain id эндпоинтов и хэш кода роутера одним пакетом, если срок проверки истёк.
+        Несовпадение chain id — ошибка конфигурации; изменившийся код роутера сбрасывает его данные.
+        """
+        lock = self.locks.setdefault(chain_id, asyncio.Lock())
+        async with lock:
+            if self.is_verified(chain_id, rpc_url):
+                return
+            batch = JsonRpcBatch(rpc_url, proxy)
+            batch.add("eth_chainId")
+            if router:
+                batch.add("eth_getCode", [router, "latest"])
+            results = await batch.execute()
+            for result in results:
+                if isinstance(result, JsonRpcError):
+                    raise result
+            if int(results[0], 16) != chain_id:
+                raise ValueError(f"RPC отвечает chain id {int(results[0], 16)}, ожидался {chain_id}")
+
+            chain = self._chain(chain_id)
+            if router:
+                code_hash = "0x" + keccak(hexstr=results[1]).hex()
+                entry = chain["routers"].get(router.lower())
+                if entry is not None and entry.get("code_hash") != code_hash:
+                    logger.warning(f"[{chain_id}] Код роутера {router} изменился, сбрасываем его фабрику и пары")
+                    entry = None
+                if entry is None:
+                    entry = chain["routers"][router.lower()] = {"code_hash": code_hash, "factory": None, "pairs": {}}
+            chain["endpoints"]["|".join(normalize_urls(rpc_url))] = time.time()
+            self.save()
+
+    def _router(self, chain_id: int, router: str) -> dict:
+        return self._chain(chain_id)["routers"].setdefault(
+            router.lower(), {"code_hash": None, "factory": None, "pairs": {}})
+
+    def factory(self, chain_id: int, router: str) -> Optional[str]:
+        return self._router(chain_id, router)["factory"]
+
+    def pairs(self, chain_id: int, router: str) -> dict[tuple[str, str], str]:
+        """Известные адреса пар роутера: (token0, token1) в checksum → адрес пары."""
+        stored = self._router(chain_id, router)["pairs"]
+        keys = list(stored)
+        # Все адреса одним вызовом: новые checksum-адреса сохраняются одной записью файла
+        tokens = self.checksum_many([token for key in keys for token in key.split(":")])
+        return {(tokens[2 * i], tokens[2 * i + 1]): stored[key] for i, key in enumerate(keys)}
+
+    def store_router(self, chain_id: int, router: str, factory: Optional[str],
+                     pairs: dict[tuple[str, str], str]) -> None:
+        """Запоминает фабрику и адреса пар роутера; файл пишется, только если что-то добавилось."""
+        entry = self._router(chain_id, router)
+        changed = factory is not None and entry["factory"] != factory
+        if changed:
+            entry["factory"] = factory
+        for (token0, token1), address in pairs.items():
+            key = _pair_key(token0, token1)
+            if entry["pairs"].get(key) != address:
+                entry["pairs"][key] = address
+                changed = True
+        if changed:
+            self.save()
+
+    # --- токены -------------------------------------------------------------
+
+    def token(self, chain_id: int, token: str) -> Optional[dict]:
+        """{"decimals", "symbol"} токена или None, если его ещё нет в кэше."""
+        return self._chain(chain_id)["tokens"].get(token.lower())
+
+    def store_tokens(self, chain_id: int, metadata: dict[str, dict]) -> None:
+        """Запоминает метаданные токенов; файл пишется, только если что-то изменилось."""
+        tokens = self._chain(chain_id)["tokens"]
+        changed = False
+        for token, info in metadata.items():
+            entry = {"decimals": info.get("decimals"), "symbol": info.get("symbol")}
+            if info.get("decimals") is not None and tokens.get(token.lower()) != entry:
+                tokens[token.lower()] = entry
+                changed = True
+        if changed:
+            self.save()
+
+    # --- газ ----------------------------------------------------------------
+
+    def gas_stats(self, chain_id: int) -> dict[str, list]:
+        """Статистика gasUsed сети: ключ «контракт:селектор:длина пути» → [count, mean, m2, max]."""
+        return self._chain(chain_id).setdefault("gas", {})
+
+    def store_gas_stats(self, chain_id: int, key: str, values: Optional[list]) -> None:
+        """
+        Запоминает статистику ключа; None удаляет её (после транзакции, упёршейся в лимит).
+        Файл пишется не чаще раза в GAS_FLUSH_SECONDS, остальное — в flush при завершении.
+        """
+        gas = self.gas_stats(chain_id)
+        if values is None:
+            if gas.pop(key, None) is None:
+                return
+        else:
+            gas[key] = values
+        self.dirty = True
+        if time.monotonic() - self.saved_at >= GAS_FLUSH_SECONDS:
+            self.save()
@@ -0,0 +1,173 @@
+from eth_abi import decode
+from typing import Optional
+from web3 import AsyncWeb3
+from web3.exceptions import ContractLogicError
+from utils.encoders import (BALANCE_OF, ALLOWANCE, DECIMALS, SYMBOL, GET_RESERVES, GET_ETH_BALANCE,
+                            encode_balance_of, encode_allowance, encode_get_eth_balance, get_cached_contract)
+from utils.logger import logger
+from utils.resources import load_abi
+import asyncio
+
+# Multicall3 развёрнут по одному адресу во всех поддерживаемых сетях
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Ограничения на один вызов aggregate3
+MAX_CALLDATA_BYTES = 100_000
+MAX_CALL_GAS = 20_000_000
+
+# Размер одного элемента Call3 в ABI без данных вызова: offset + target + allowFailure + offset + length
+CALL3_OVERHEAD_BYTES = 5 * 32
+
+# Оценка газа на один вложенный вызов (холодный доступ к аккаунту и слоту + накладные расходы)
+CALL_GAS = {
+    BALANCE_OF: 12_000,
+    ALLOWANCE: 12_000,
+    DECIMALS: 8_000,
+    SYMBOL: 15_000,
+    GET_RESERVES: 10_000,
+    GET_ETH_BALANCE: 5_000
+}
+
+# Ошибки, после которых пакет имеет смысл разделить: откат aggregate3 или лимиты размера и газа у RPC.
+# Остальные (недоступный эндпоинт, таймаут) пробрасываются: деление лишь умножило бы число запросов
+SPLIT_ERROR_MARKERS = ("execution reverted", "out of gas", "gas limit", "gas required exceeds", "too large",
+                       "413", "size exceeded", "payload")
+
+
+def _call_size(call_data: bytes) -> int:
+    return CALL3_OVERHEAD_BYTES + (len(call_data) + 31) // 32 * 32
+
+
+def _decode_uint(data: bytes) -> Optional[int]:
+    return int.from_bytes(data[:32], "big") if len(data) >= 32 else None
+
+
+def _should_split(error: Exception) -> bool:
+    if isinstance(error, ContractLogicError):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in SPLIT_ERROR_MARKERS)
+
+
+def _decode_symbol(data: bytes) -> Optional[str]:
+    try:
+        return decode(["string"], data)[0]
+    except Exception:
+        # Старые токены (например MKR) возвращают bytes32 вместо string
+        if len(data) == 32:
+            return data.rstrip(b"\x00").decode("utf-8", errors="ignore")
+        return None
+
+
+class MulticallReader:
+    """
+    Массовое чтение балансов, allowance и метаданных токенов через Multicall3.aggregate3.
+    Размер пакета подбирается по объёму calldata и лимиту газа, ошибки отдельных вызовов
+    не ломают весь пакет (allowFailure=True), а отклонённый из-за отката или лимитов пакет
+    делится пополам и повторяется; ошибки эндпоинта пробрасываются вызывающему.
+    """
+
+    def __init__(self, w3: AsyncWeb3, multicall_address: str = MULTICALL3_ADDRESS,
+                 max_calldata_bytes: int = MAX_CALLDATA_BYTES, max_gas: int = MAX_CALL_GAS,
+                 max_concurrency: int = 4):
+        self.w3 = w3
+        self.contract = get_cached_contract(w3, multicall_address, load_abi("multicall3"))
+        self.max_calldata_bytes = max_calldata_bytes
+        self.max_gas = max_gas
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _chunk(self, calls: list[tuple[str, bytes]]) -> list[list[tuple[str, bytes]]]:
+        """Делит вызовы на пакеты, не превышающие лимиты calldata и газа."""
+        chunks, current, size, gas = [], [], 0, 0
+        for call in calls:
+            call_size = _call_size(call[1])
+            call_gas = CALL_GAS.get(call[1][:4], 30_000)
+            if current and (size + call_size > self.max_calldata_bytes or gas + call_gas > self.max_gas):
+                chunks.append(current)
+                current, size, gas = [], 0, 0
+            current.append(call)
+            size += call_size
+            gas += call_gas
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _aggregate(self, calls: list[tuple[str, bytes]]) -> list[Optional[bytes]]:
+        try:
+            async with self.semaphore:
+                results = await self.contract.functions.aggregate3(
+                    [(target, True, data) for target, data in calls]
+                ).call()
+            return [bytes(data) if success else None for success, data in results]
+        except Exception as e:
+            if not _should_split(e):
+                raise
+            if len(calls) == 1:
+                logger.warning(f"Multicall: вызов к {calls[0][0]} не выполнен: {e}")
+                return [None]
+            # Пакет целиком отклонён (лимит газа/размера у RPC) — делим пополам
+            middle = len(calls) // 2
+            left, right = await asyncio.gather(self._aggregate(calls[:middle]), self._aggregate(calls[middle:]))
+            return left + right
+
+    async def aggregate(self, calls: list[tuple[str, bytes]]) -> list[Optional[bytes]]:
+        """Выполняет произвольные вызовы (адрес, calldata); для неудачных возвращает None."""
+        chunks = self._chunk(calls)
+        results = await asyncio.gather(*(self._aggregate(chunk) for chunk in chunks))
+        return [item for chunk in results for item in chunk]
+
+    async def get_token_metadata(self, tokens: list[str]) -> dict[str, dict]:
+        tokens = [self.w3.to_checksum_address(token) for token in tokens]
+        calls = []
+        for token in tokens:
+            calls.append((token, DECIMALS))
+            calls.append((token, SYMBOL))
+        results = await self.aggregate(calls)
+
+        metadata = {}
+        for i, token in enumerate(tokens):
+            decimals, symbol = results[2 * i], results[2 * i + 1]
+            metadata[token] = {
+                "decimals": _decode_uint(decimals) if decimals is not None else None,
+                "symbol": _decode_symbol(symbol) if symbol is not None else None
+            }
+        return metadata
+
+    async def get_wallets_state(self, wallets: list[str], tokens: list[str], spender: Optional[str] = None,
+                                native: bool = False) -> dict[tuple[str, Optional[str]], dict]:
+        """
+        Читает balanceOf (и allowance для spender, если указан) для всех пар кошелёк × токен,
+        а при native=True — и баланс нативного токена через Multicall3.getEthBalance.
+        Возвращает {(кошелёк, токен): {"balance": int | None, "allowance": int | None}};
+        нативный баланс лежит под ключом (кошелёк, None).
+        """
+        wallets = [self.w3.to_checksum_address(wallet) for wallet in wallets]
+        tokens = [self.w3.to_checksum_address(token) for token in tokens]
+        spender = self.w3.to_checksum_address(spender) if spender else None
+
+        keys, calls = [], []
+        for wallet in wallets:
+            balance_data = bytes.fromhex(encode_balance_of(wallet)[2:])
+            allowance_data = bytes.fromhex(encode_allowance(wallet, spender)[2:]) if spender else None
+            for token in tokens:
+                keys.append((wallet, token))
+                calls.append((token, balance_data))
+                if spender:
+                    calls.append((token, allowance_data))
+        native_calls = [(self.contract.address, bytes.fromhex(encode_get_eth_balance(wallet)[2:]))
+                        for wallet in wallets] if native else []
+        results = await self.aggregate(calls + native_calls)
+
+        step = 2 if spender else 1
+        state = {}
+        for i, key in enumerate(keys):
+            balance = results[i * step]
+            allowance = results[i * step + 1] if spender else None
+            state[key] = {
+                "balance": _decode_uint(balance) if balance is not None else None,
+                "allowance": _decode_uint(allowance) if allowance is not None else None
+            }
+        for wallet, balance in zip(wallets, results[len(calls):]):
+            state[(wallet, None)] = {"balance": _decode_uint(balance) if balance is not None else None,
+                                     "allowance": None}
+        return state
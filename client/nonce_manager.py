@@ -0,0 +1,66 @@
+from typing import Optional
+from web3 import AsyncWeb3
+from utils.logger import logger
+import asyncio
+
+
+class NonceManager:
+    """
+    Локальный счётчик nonce для пары (сеть, адрес).
+    Инициализируется один раз из pending-счётчика, дальше выдаёт nonce без запросов к RPC.
+    Экземпляры общие для всех клиентов одного кошелька в одной сети.
+    """
+
+    _instances: dict[tuple[int, str], "NonceManager"] = {}
+
+    def __init__(self, chain_id: int, address: str):
+        self.chain_id = chain_id
+        self.address = address
+        self.next_nonce: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def get(cls, chain_id: int, address: str) -> "NonceManager":
+        key = (chain_id, address.lower())
+        if key not in cls._instances:
+            cls._instances[key] = cls(chain_id, address)
+        return cls._instances[key]
+
+    async def _fetch_pending(self, w3: AsyncWeb3) -> int:
+        return await w3.eth.get_transaction_count(self.address, "pending")
+
+    def seed(self, pending_nonce: int) -> None:
+        """Учитывает pending-счётчик, полученный снаружи (например, из пакетного снимка)."""
+        if self.next_nonce is None or pending_nonce > self.next_nonce:
+            self.next_nonce = pending_nonce
+
+    async def get_nonce(self, w3: AsyncWeb3) -> int:
+        """Выдаёт следующий nonce; RPC запрашивается только при первом обращении."""
+        async with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = await self._fetch_pending(w3)
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    async def release(self, nonce: int) -> None:
+        """
+        Возвращает nonce транзакции, которая не была отправлена.
+        Если после неё уже выданы другие nonce, счётчик будет пересинхронизирован при следующем запросе.
+        """
+        async with self.lock:
+            if self.next_nonce == nonce + 1:
+                self.next_nonce = nonce
+            else:
+                self.next_nonce = None
+
+    def invalidate(self) -> None:
+        """Сбрасывает счётчик: следующий get_nonce заново запросит pending-значение из сети."""
+        self.next_nonce = None
+
+    async def resync(self, w3: AsyncWeb3) -> int:
+        """Сбрасывает локальный счётчик на pending-значение из сети (после потерянных транзакций)."""
+        async with self.lock:
+            self.next_nonce = await self._fetch_pending(w3)
+            logger.info(f"[{self.chain_id}] nonce для {self.address} пересинхронизирован: {self.next_nonce}")
+            return self.next_nonce
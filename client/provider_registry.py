@@ -0,0 +1,69 @@
+from web3.middleware.geth_poa import async_geth_poa_middleware
+from web3 import AsyncWeb3
+from typing import Optional, Union
+from client.rpc_pool import PooledHTTPProvider, normalize_urls
+from utils.logger import logger
+import aiohttp
+import asyncio
+
+# Параметры пула соединений к одному RPC
+CONNECTION_LIMIT = 100
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = 30
+
+
+class ProviderRegistry:
+    """
+    Реестр общих ресурсов для RPC-эндпоинтов с ключом (rpc_url, proxy):
+    одна keep-alive aiohttp-сессия на эндпоинт и один экземпляр AsyncWeb3 на набор
+    эндпоинтов сети, независимо от количества кошельков.
+    """
+
+    _sessions: dict[tuple[str, Optional[str]], aiohttp.ClientSession] = {}
+    _web3: dict[tuple[tuple[str, ...], Optional[str]], AsyncWeb3] = {}
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def get_web3(cls, rpc_url: Union[str, list], proxy: Optional[str] = None, is_poa: bool = False) -> AsyncWeb3:
+        """Возвращает общий AsyncWeb3 для эндпоинтов сети, создавая его при первом обращении."""
+        key = (normalize_urls(rpc_url), proxy)
+        if key not in cls._web3:
+            w3 = AsyncWeb3(PooledHTTPProvider(rpc_url, proxy))
+            # Применяем middleware для PoA-сетей
+            if is_poa:
+                w3.middleware_onion.clear()
+                w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+            cls._web3[key] = w3
+        return cls._web3[key]
+
+    @classmethod
+    async def get_session(cls, rpc_url: str, proxy: Optional[str] = None) -> aiohttp.ClientSession:
+        """Возвращает общую keep-alive сессию для эндпоинта."""
+        key = (rpc_url, proxy)
+        session = cls._sessions.get(key)
+        if session is not None and not session.closed:
+            return session
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            session = cls._sessions.get(key)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=CONNECTION_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT),
+                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+                )
+                cls._sessions[key] = session
+        return session
+
+    @classmethod
+    async def close(cls) -> None:
+        """Закрывает все сессии; вызывается при завершении работы."""
+        sessions = [s for s in cls._sessions.values() if not s.closed]
+        cls._sessions.clear()
+        cls._web3.clear()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии HTTP-сессии: {e}")
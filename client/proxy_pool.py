@@ -0,0 +1,152 @@
+from collections import deque
+from typing import Optional
+from utils.logger import logger
+import aiohttp
+import asyncio
+import itertools
+import math
+import time
+
+CHECK_URL = "https://httpbin.org/ip"
+CHECK_TIMEOUT = 5
+STATS_WINDOW = 20
+# Подряд идущих ошибок до исключения прокси и время исключения
+FAILURE_LIMIT = 3
+COOLDOWN_SECONDS = 60
+# Оценка задержки ещё не проверенного прокси: он идёт после быстрых, но раньше отказавших
+UNKNOWN_LATENCY = CHECK_TIMEOUT
+
+# Значение proxy, при котором RpcPool берёт прокси из пула на каждый запрос
+ROTATING = "pool"
+
+
+class ProxyStats:
+    """Задержки и ошибки одного прокси по проверкам и реальным запросам."""
+
+    def __init__(self, proxy: str):
+        self.proxy = proxy
+        self.latencies: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def score(self) -> float:
+        # Прокси без успешных ответов — худший, а не лучший
+        if not self.latencies:
+            return math.inf if self.failures else UNKNOWN_LATENCY
+        return sorted(self.latencies)[len(self.latencies) // 2] * (1 + self.failures)
+
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def record(self, latency: float, ok: bool) -> None:
+        if ok:
+            self.latencies.append(latency)
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= FAILURE_LIMIT:
+            self.cool_down(f"подряд {FAILURE_LIMIT} ошибки")
+
+    def cool_down(self, reason: str) -> None:
+        # После паузы прокси снова доступен, одна ошибка вернёт его в исключённые
+        self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+        self.failures = max(self.failures, FAILURE_LIMIT - 1)
+        logger.warning(f"Прокси {self.proxy.split('@')[-1]} временно исключён: {reason}")
+
+
+class ProxyPool:
+    """
+    Пул прокси: асинхронные проверки, оценка по задержке и ошибкам, выдача прокси.
+    В режиме sticky каждый кошелёк закреплён за своим прокси (до его отказа),
+    в режиме rotate прокси выбирается заново на каждый RPC-запрос.
+    """
+
+    MODES = ("sticky", "rotate")
+    _current: Optional["ProxyPool"] = None
+
+    def __init__(self, proxies: list[str], mode: str = "sticky"):
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим прокси: {mode}")
+        self.proxies = list(dict.fromkeys(proxies))
+        self.mode = mode
+        self.stats = {proxy: ProxyStats(proxy) for proxy in self.proxies}
+        self.assignments: dict[str, str] = {}
+        self._turn = itertools.count()
+
+    @classmethod
+    def configure(cls, proxies: list[str], mode: str = "sticky") -> "ProxyPool":
+        """Создаёт пул процесса; его используют все Client, созданные без явного proxy."""
+        cls._current = cls(proxies, mode)
+        return cls._current
+
+    @classmethod
+    def current(cls) -> Optional["ProxyPool"]:
+        return cls._current
+
+    def ranked(self) -> list[str]:
+        """Прокси от лучшего к худшему; исключённые — в конце списка."""
+        return sorted(self.proxies, key=lambda p: (not self.stats[p].is_healthy(), self.stats[p].score))
+
+    def healthy(self) -> list[str]:
+        ranked = self.ranked()
+        # Если исключены все, пробуем лучшие из них, а не работаем без прокси
+        return [p for p in ranked if self.stats[p].is_healthy()] or ranked
+
+    def client_proxy(self, owner: str) -> str:
+        """Значение proxy для нового Client: закреплённый прокси или признак ротации."""
+        return ROTATING if self.mode == "rotate" else self.acquire(owner)
+
+    def acquire(self, owner: Optional[str] = None, exclude: Optional[str] = None) -> str:
+        """
+        Выдаёт прокси. Для владельца в режиме sticky возвращает закреплённый, пока тот здоров,
+        иначе — наименее загруженный из здоровых; без владельца — по кругу среди здоровых.
+        """
+        candidates = [p for p in self.healthy() if p != exclude] or self.healthy()
+        if owner is None or self.mode == "rotate":
+            return candidates[next(self._turn) % len(candidates)]
+
+        assigned = self.assignments.get(owner)
+        if assigned in candidates and self.stats[assigned].is_healthy():
+            return assigned
+        load = {p: 0 for p in candidates}
+        for proxy in self.assignments.values():
+            if proxy in load:
+                load[proxy] += 1
+        proxy = min(candidates, key=lambda p: (load[p], self.stats[p].score))
+        self.assignments[owner] = proxy
+        return proxy
+
+    def fail_over(self, owner: str, proxy: str) -> str:
+        """Снимает владельца с отказавшего прокси и выдаёт другой."""
+        if self.assignments.get(owner) == proxy:
+            del self.assignments[owner]
+        return self.acquire(owner, exclude=proxy)
+
+    def report(self, proxy: Optional[str], latency: float, ok: bool) -> None:
+        stats = self.stats.get(proxy) if proxy else None
+        if stats is not None:
+            stats.record(latency, ok)
+
+    async def _check(self, session: aiohttp.ClientSession, proxy: str, check_url: str) -> bool:
+        started = time.perf_counter()
+        try:
+            async with session.get(check_url, proxy=f"http://{proxy}") as response:
+                ok = response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok = False
+        self.report(proxy, time.perf_counter() - started, ok)
+        return ok
+
+    async def check_all(self, timeout: float = CHECK_TIMEOUT, check_url: str = CHECK_URL) -> list[str]:
+        """
+        Одновременно проверяет все прокси и возвращает рабочие, от быстрого к медленному.
+        Не прошедшие проверку исключаются на COOLDOWN_SECONDS и не выдаются кошелькам.
+        """
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            results = await asyncio.gather(*(self._check(session, proxy, check_url) for proxy in self.proxies))
+        for proxy, ok in zip(self.proxies, results):
+            if not ok:
+                self.stats[proxy].cool_down("не прошёл проверку доступности")
+        working = {proxy for proxy, ok in zip(self.proxies, results) if ok}
+        return [proxy for proxy in self.ranked() if proxy in working]
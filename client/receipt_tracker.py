@@ -0,0 +1,119 @@
+from typing import Optional, Union
+from hexbytes import HexBytes
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.rpc_pool import normalize_urls
+from utils.logger import logger
+import asyncio
+import time
+
+# Примерное время блока по сетям (секунды), уточняется на лету
+BLOCK_TIMES = {
+    1: 12.0,
+    10: 2.0,
+    56: 3.0,
+    137: 2.0,
+    42161: 0.25
+}
+DEFAULT_BLOCK_TIME = 2.0
+MIN_POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 5.0
+
+
+class ReceiptTracker:
+    """
+    Отслеживает подтверждение транзакций по появлению новых блоков.
+    Один фоновый цикл на сеть: опрашивает номер блока с интервалом, подстроенным под время блока,
+    и на каждом новом блоке одним пакетным запросом проверяет receipt всех ожидающих транзакций.
+    """
+
+    _instances: dict[tuple[int, str], "ReceiptTracker"] = {}
+
+    def __init__(self, chain_id: int, rpc_url: Union[str, list], proxy: Optional[str] = None):
+        self.chain_id = chain_id
+        self.rpc_url = rpc_url
+        self.proxy = proxy
+        self.block_time = BLOCK_TIMES.get(chain_id, DEFAULT_BLOCK_TIME)
+        self.pending: dict[str, asyncio.Future] = {}
+        self.deadlines: dict[str, float] = {}
+        self.last_block: Optional[int] = None
+        self.last_block_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get(cls, chain_id: int, rpc_url: Union[str, list], proxy: Optional[str] = None) -> "ReceiptTracker":
+        key = (chain_id, normalize_urls(rpc_url))
+        if key not in cls._instances:
+            cls._instances[key] = cls(chain_id, rpc_url, proxy)
+        return cls._instances[key]
+
+    @property
+    def poll_interval(self) -> float:
+        return min(max(self.block_time / 2, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    def track(self, tx_hash, timeout: float = 120) -> asyncio.Future:
+        """
+        Возвращает future, который завершится receipt-ом транзакции
+        или None, если она не подтвердилась за timeout.
+        """
+        tx_hash = HexBytes(tx_hash).hex()
+        tx_hash = tx_hash if tx_hash.startswith("0x") else "0x" + tx_hash
+        if tx_hash not in self.pending:
+            self.pending[tx_hash] = asyncio.get_running_loop().create_future()
+        self.deadlines[tx_hash] = max(self.deadlines.get(tx_hash, 0), time.monotonic() + timeout)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return self.pending[tx_hash]
+
+    async def wait(self, tx_hash, timeout: float = 120) -> Optional[dict]:
+        """Ждёт receipt транзакции; возвращает None, если она не подтвердилась за timeout."""
+        return await asyncio.shield(self.track(tx_hash, timeout))
+
+    def _resolve(self, tx_hash: str, receipt: Optional[dict]) -> None:
+        future = self.pending.pop(tx_hash)
+        self.deadlines.pop(tx_hash, None)
+        if not future.done():
+            future.set_result(receipt)
+
+    def _update_block_time(self, block_number: int) -> None:
+        now = time.monotonic()
+        if self.last_block is not None and block_number > self.last_block:
+            observed = (now - self.last_block_at) / (block_number - self.last_block)
+            # Скользящее среднее, чтобы интервал не скакал от одного блока
+            self.block_time = self.block_time * 0.8 + observed * 0.2
+        self.last_block, self.last_block_at = block_number, now
+
+    async def _check_receipts(self) -> None:
+        hashes = [h for h, future in self.pending.items() if not future.done()]
+        batch = JsonRpcBatch(self.rpc_url, self.proxy)
+        for tx_hash in hashes:
+            batch.add("eth_getTransactionReceipt", [tx_hash])
+        for tx_hash, receipt in zip(hashes, await batch.execute()):
+            if isinstance(receipt, JsonRpcError):
+                logger.warning(f"[{self.chain_id}] Ошибка при получении receipt {tx_hash}: {receipt}")
+            elif receipt is not None:
+                self._resolve(tx_hash, receipt)
+
+    async def _run(self) -> None:
+        while True:
+            # Завершаем ожидания с истёкшим таймаутом
+            now = time.monotonic()
+            for tx_hash in [h for h, deadline in self.deadlines.items() if deadline < now]:
+                self._resolve(tx_hash, None)
+            if not self.pending:
+                return
+
+            try:
+                batch = JsonRpcBatch(self.rpc_url, self.proxy)
+                batch.add("eth_blockNumber")
+                block_number = (await batch.execute())[0]
+                if isinstance(block_number, JsonRpcError):
+                    raise block_number
+                block_number = int(block_number, 16)
+
+                if self.last_block is None or block_number > self.last_block:
+                    self._update_block_time(block_number)
+                    await self._check_receipts()
+            except Exception as e:
+                logger.warning(f"[{self.chain_id}] Ошибка в цикле отслеживания транзакций: {e}")
+
+            await asyncio.sleep(self.poll_interval)
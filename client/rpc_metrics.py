@@ -0,0 +1,255 @@
+from aiohttp import web
+from bisect import bisect_left
+from typing import Any, Optional
+from urllib.parse import urlsplit
+from web3 import AsyncWeb3
+from utils.logger import logger
+import time
+
+# Верхние границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Метка метода для пакетных запросов JsonRpcBatch
+BATCH_METHOD = "batch"
+MIDDLEWARE_NAME = "rpc_metrics"
+
+
+def endpoint_label(url: str) -> str:
+    """Метка эндпоинта без пути и query: в них часто лежит API-ключ провайдера."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.netloc else url
+
+
+class SeriesStats:
+    """Счётчики и гистограмма задержек одного ряда (сеть, эндпоинт, метод)."""
+
+    __slots__ = ("count", "errors", "bytes_sent", "bytes_received", "latency_sum", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        # Последняя корзина — +Inf
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, latency: float, ok: bool, sent: int = 0, received: int = 0) -> None:
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.latency_sum += latency
+        self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        rank, seen = q * self.count, 0
+        for bound, hits in zip(LATENCY_BUCKETS, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class RpcMetrics:
+    """
+    Метрики RPC в процессе: запросы на уровне транспорта (сеть, эндпоинт, метод) из RpcPool
+    и вызовы на уровне AsyncWeb3 (сеть, метод) из middleware — с повторами и фейловером.
+    Запись — несколько инкрементов без блокировок, поэтому метрики включены всегда.
+    """
+
+    enabled = True
+    requests: dict[tuple[str, str, str], SeriesStats] = {}
+    calls: dict[tuple[str, str], SeriesStats] = {}
+    batched: dict[tuple[str, str], list[int]] = {}
+    _runner: Optional[web.AppRunner] = None
+
+    @classmethod
+    def record_request(cls, chain: str, url: str, payload: Any, latency: float, ok: bool,
+                       sent: int, received: int, result: Any = None) -> None:
+        """Учитывает один HTTP-запрос к эндпоинту (одиночный вызов или пакет)."""
+        if not cls.enabled:
+            return
+        if isinstance(payload, list):
+            method = BATCH_METHOD
+            errors = {}
+            if isinstance(result, list):
+                errors = {item.get("id"): "error" in item for item in result if isinstance(item, dict)}
+            for call in payload:
+                counters = cls.batched.setdefault((chain, call["method"]), [0, 0])
+                counters[0] += 1
+                if not ok or errors.get(call.get("id"), False):
+                    counters[1] += 1
+        else:
+            method = payload["method"]
+            ok = ok and not (isinstance(result, dict) and "error" in result)
+
+        key = (chain, endpoint_label(url), method)
+        series = cls.requests.get(key)
+        if series is None:
+            series = cls.requests[key] = SeriesStats()
+        series.observe(latency, ok, sent, received)
+
+    @classmethod
+    def record_call(cls, chain: str, method: str, latency: float, ok: bool) -> None:
+        if not cls.enabled:
+            return
+        series = cls.calls.get((chain, method))
+        if series is None:
+            series = cls.calls[(chain, method)] = SeriesStats()
+        series.observe(latency, ok)
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.requests.clear()
+        cls.calls.clear()
+        cls.batched.clear()
+
+    # --- экспорт ----------------------------------------------------------------------
+
+    @classmethod
+    def _histogram(cls, name: str, labels: str, series: SeriesStats) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, hits in zip(LATENCY_BUCKETS, series.buckets):
+            cumulative += hits
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {series.count}')
+        lines.append(f"{name}_sum{{{labels}}} {series.latency_sum}")
+        lines.append(f"{name}_count{{{labels}}} {series.count}")
+        return lines
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        counters = [
+            ("rpc_requests_total", "HTTP-запросы к RPC-эндпоинтам", "count"),
+            ("rpc_request_errors_total", "Неудачные запросы (транспорт, HTTP-статус, ошибка JSON-RPC)", "errors"),
+            ("rpc_request_sent_bytes_total", "Отправлено байт", "bytes_sent"),
+            ("rpc_request_received_bytes_total", "Получено байт", "bytes_received")
+        ]
+        for name, help_text, field in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (chain, endpoint, method), series in cls.requests.items():
+                lines.append(f"{name}{{{_labels(chain=chain, endpoint=endpoint, method=method)}}} "
+                             f"{getattr(series, field)}")
+
+        lines += ["# HELP rpc_request_duration_seconds Задержка HTTP-запроса к эндпоинту",
+                  "# TYPE rpc_request_duration_seconds histogram"]
+        for (chain, endpoint, method), series in cls.requests.items():
+            lines += cls._histogram("rpc_request_duration_seconds",
+                                    _labels(chain=chain, endpoint=endpoint, method=method), series)
+
+        lines += ["# HELP rpc_batched_calls_total Вызовы внутри пакетных запросов",
+                  "# TYPE rpc_batched_calls_total counter"]
+        for (chain, method), (count, _) in cls.batched.items():
+            lines.append(f"rpc_batched_calls_total{{{_labels(chain=chain, method=method)}}} {count}")
+        lines += ["# HELP rpc_batched_call_errors_total Ошибки вызовов внутри пакетных запросов",
+                  "# TYPE rpc_batched_call_errors_total counter"]
+        for (chain, method), (_, errors) in cls.batched.items():
+            lines.append(f"rpc_batched_call_errors_total{{{_labels(chain=chain, method=method)}}} {errors}")
+
+        lines += ["# HELP rpc_call_duration_seconds Задержка вызова AsyncWeb3 с учётом повторов и фейловера",
+                  "# TYPE rpc_call_duration_seconds histogram"]
+        for (chain, method), series in cls.calls.items():
+            lines += cls._histogram("rpc_call_duration_seconds", _labels(chain=chain, method=method), series)
+        lines += ["# HELP rpc_call_errors_total Вызовы AsyncWeb3, завершившиеся ошибкой",
+                  "# TYPE rpc_call_errors_total counter"]
+        for (chain, method), series in cls.calls.items():
+            lines.append(f"rpc_call_errors_total{{{_labels(chain=chain, method=method)}}} {series.errors}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def dump(cls, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(cls.to_prometheus())
+
+    @classmethod
+    async def serve(cls, port: int, host: str = "127.0.0.1") -> None:
+        """Поднимает эндпоинт /metrics для Prometheus."""
+        async def handle(_: web.Request) -> web.Response:
+            return web.Response(text=cls.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        cls._runner = web.AppRunner(app)
+        await cls._runner.setup()
+        try:
+            await web.TCPSite(cls._runner, host, port).start()
+        except OSError as e:
+            # Занятый порт не должен останавливать свапы
+            logger.warning(f"Не удалось открыть порт метрик {port}: {e}")
+            await cls.stop()
+            return
+        logger.info(f"Метрики RPC доступны на http://{host}:{port}/metrics")
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
+
+    @classmethod
+    def log_summary(cls, top: int = 10) -> None:
+        """Краткая сводка: самые затратные по суммарному времени методы и ошибки по эндпоинтам."""
+        if not cls.requests:
+            return
+        total_time = sum(s.latency_sum for s in cls.requests.values())
+        total = sum(s.count for s in cls.requests.values())
+        sent = sum(s.bytes_sent for s in cls.requests.values())
+        received = sum(s.bytes_received for s in cls.requests.values())
+        logger.info(f"RPC: {total} запросов, {total_time:.1f} с суммарно, "
+                    f"отправлено {sent / 1024:.1f} КБ, получено {received / 1024:.1f} КБ")
+
+        by_method: dict[tuple[str, str], SeriesStats] = {}
+        for (chain, _, method), series in cls.requests.items():
+            merged = by_method.setdefault((chain, method), SeriesStats())
+            merged.count += series.count
+            merged.errors += series.errors
+            merged.latency_sum += series.latency_sum
+            merged.buckets = [a + b for a, b in zip(merged.buckets, series.buckets)]
+        ranked = sorted(by_method.items(), key=lambda item: item[1].latency_sum, reverse=True)
+        for (chain, method), series in ranked[:top]:
+            logger.info(f"  [{chain}] {method:<28} {series.count:5} шт, {series.latency_sum:6.2f} с, "
+                        f"p50 ≤{series.quantile(0.5)} с, p99 ≤{series.quantile(0.99)} с, ошибок {series.errors}")
+
+        for (chain, endpoint, method), series in cls.requests.items():
+            if series.errors:
+                logger.warning(f"  [{chain}] {endpoint} {method}: ошибок {series.errors} из {series.count}")
+
+
+def build_metrics_middleware(chain: str):
+    """Async-middleware AsyncWeb3, замеряющее вызовы на уровне web3 (с повторами и фейловером пула)."""
+
+    async def metrics_middleware(make_request, w3: AsyncWeb3):
+        async def middleware(method, params):
+            started = time.perf_counter()
+            ok = False
+            try:
+                response = await make_request(method, params)
+                ok = "error" not in response
+                return response
+            finally:
+                RpcMetrics.record_call(chain, method, time.perf_counter() - started, ok)
+
+        return middleware
+
+    return metrics_middleware
+
+
+def instrument(w3: AsyncWeb3, chain: str) -> None:
+    """
+    Подключает метрики к общему AsyncWeb3 сети: middleware на уровне web3
+    и метку сети у пула эндпоинтов, через который идут и пакетные запросы.
+    """
+    pool = getattr(w3.provider, "pool", None)
+    if pool is not None:
+        pool.chain = chain
+    if MIDDLEWARE_NAME not in w3.middleware_onion:
+        w3.middleware_onion.add(build_metrics_middleware(chain), name=MIDDLEWARE_NAME)
@@ -0,0 +1,285 @@
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+from collections import deque
+from typing import Any, Optional, Union
+from client.rpc_metrics import RpcMetrics
+from client.proxy_pool import ProxyPool, ROTATING
+from utils.logger import logger
+import aiohttp
+import asyncio
+import itertools
+import json
+import math
+import time
+
+# Окно статистики по эндпоинту и параметры здоровья
+STATS_WINDOW = 50
+ERROR_RATE_LIMIT = 0.5
+COOLDOWN_SECONDS = 30
+# Запрос к второму эндпоинту, если первый не ответил дольше этого перцентиля своих задержек
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 5
+DEFAULT_HEDGE_DELAY = 1.0
+# Оценка задержки ещё не опрошенного эндпоинта: он пробуется после быстрых, но раньше отказавших
+UNKNOWN_LATENCY = DEFAULT_HEDGE_DELAY
+MAX_ATTEMPTS = 3
+# На сколько эндпоинтов одновременно рассылается транзакция
+BROADCAST_FANOUT = 3
+
+# Коды JSON-RPC, означающие проблему эндпоинта, а не запроса (лимиты, перегрузка)
+ENDPOINT_ERROR_CODES = {-32005, -32090, 429}
+# Тот же -32005 провайдеры возвращают на слишком широкий eth_getLogs — это ошибка запроса
+RANGE_ERROR_MARKERS = ("more than", "too many results", "block range", "response size", "range is too")
+
+_request_ids = itertools.count(1)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def normalize_urls(rpc_url: Union[str, list, tuple]) -> tuple[str, ...]:
+    """Приводит rpc_url из networks_data.json (строка или список) к кортежу адресов."""
+    urls = (rpc_url,) if isinstance(rpc_url, str) else tuple(rpc_url)
+    if not urls:
+        raise ValueError("Не указан ни один RPC-эндпоинт")
+    return urls
+
+
+def is_range_error(message: str) -> bool:
+    """Ответ означает, что диапазон блоков запроса нужно сузить."""
+    message = message.lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+class EndpointError(Exception):
+    """Эндпоинт не смог обработать запрос (сеть, HTTP-статус, лимит запросов)."""
+
+
+class ProxyError(EndpointError):
+    """Запрос не прошёл через прокси: эндпоинт не виноват, нужен другой прокси."""
+
+
+class EndpointStats:
+    """Скользящая статистика задержек и ошибок одного эндпоинта."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latencies: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.results: deque[bool] = deque(maxlen=STATS_WINDOW)
+        self.cooldown_until = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.results.count(False) / len(self.results) if self.results else 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    @property
+    def score(self) -> float:
+        # Ошибки штрафуют задержку; эндпоинт без успешных ответов идёт после всех отвечающих
+        if not self.latencies:
+            return math.inf if self.results else UNKNOWN_LATENCY
+        return self.percentile(0.5) * (1 + 4 * self.error_rate)
+
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.results.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        elif len(self.results) >= 5 and self.error_rate > ERROR_RATE_LIMIT:
+            self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+            self.results.clear()
+            logger.warning(f"RPC {self.url} временно исключён: слишком много ошибок")
+
+
+class RpcPool:
+    """
+    Пул RPC-эндпоинтов одной сети.
+    Чтения уходят на самый быстрый здоровый эндпоинт, при задержке дублируются на второй,
+    при ошибке повторяются на следующем; транзакции рассылаются на несколько эндпоинтов сразу.
+    """
+
+    _instances: dict[tuple[tuple[str, ...], Optional[str]], "RpcPool"] = {}
+
+    def __init__(self, urls: tuple[str, ...], proxy: Optional[str] = None, hedge: bool = True):
+        self.urls = urls
+        self.proxy = proxy
+        self.hedge = hedge
+        self.stats = {url: EndpointStats(url) for url in urls}
+        # Метка сети для метрик, выставляется при подключении к Client
+        self.chain = "unknown"
+
+    @classmethod
+    def get(cls, rpc_url: Union[str, list, tuple], proxy: Optional[str] = None) -> "RpcPool":
+        key = (normalize_urls(rpc_url), proxy)
+        if key not in cls._instances:
+            cls._instances[key] = cls(key[0], proxy)
+        return cls._instances[key]
+
+    def ranked(self) -> list[str]:
+        """Эндпоинты от лучшего к худшему; исключённые — в конце списка."""
+        return sorted(self.urls, key=lambda url: (not self.stats[url].is_healthy(), self.stats[url].score))
+
+    def hedge_delay(self, url: str) -> float:
+        stats = self.stats[url]
+        if len(stats.latencies) < HEDGE_MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return stats.percentile(HEDGE_PERCENTILE)
+
+    def resolve_proxy(self) -> Optional[str]:
+        """Прокси для очередного запроса: закреплённый за пулом или следующий из ProxyPool."""
+        if self.proxy != ROTATING:
+            return self.proxy
+        proxy_pool = ProxyPool.current()
+        return proxy_pool.acquire() if proxy_pool else None
+
+    @staticmethod
+    def _report_proxy(proxy: Optional[str], latency: float, ok: bool) -> None:
+        proxy_pool = ProxyPool.current()
+        if proxy and proxy_pool is not None:
+            proxy_pool.report(proxy, latency, ok)
+
+    async def _post(self, url: str, payload: Any) -> Any:
+        from client.provider_registry import ProviderRegistry
+
+        session = await ProviderRegistry.get_session(url, self.proxy)
+        proxy = self.resolve_proxy()
+        # Тело сериализуется здесь, чтобы метрики знали размер запроса и ответа
+        body = json.dumps(payload).encode()
+        received = 0
+        started = time.perf_counter()
+        try:
+            async with session.post(url, data=body, headers=JSON_HEADERS,
+                                    proxy=f"http://{proxy}" if proxy else None) as response:
+                if response.status == 429 or response.status >= 500:
+                    raise EndpointError(f"{url}: HTTP {response.status}")
+                response.raise_for_status()
+                raw = await response.read()
+                received = len(raw)
+                result = json.loads(raw)
+            responses = result if isinstance(result, list) else [result]
+            for item in responses:
+                error = item.get("error") if isinstance(item, dict) else None
+                if (error and error.get("code") in ENDPOINT_ERROR_CODES
+                        and not is_range_error(str(error.get("message", "")))):
+                    raise EndpointError(f"{url}: {error.get('message')}")
+        except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError) as e:
+            # Отказ прокси не портит статистику эндпоинта
+            latency = time.perf_counter() - started
+            self._report_proxy(proxy, latency, False)
+            RpcMetrics.record_request(self.chain, url, payload, latency, False, len(body), received)
+            raise ProxyError(f"Прокси {proxy.split('@')[-1]}: {e}") from e
+        except (aiohttp.ClientError, asyncio.TimeoutError, EndpointError, ValueError) as e:
+            latency = time.perf_counter() - started
+            self.stats[url].record(latency, False)
+            RpcMetrics.record_request(self.chain, url, payload, latency, False, len(body), received)
+            raise EndpointError(str(e) or type(e).__name__) from e
+        except asyncio.CancelledError:
+            # Проигравший хедж-запрос не считается ошибкой эндпоинта
+            raise
+        latency = time.perf_counter() - started
+        self.stats[url].record(latency, True)
+        self._report_proxy(proxy, latency, True)
+        RpcMetrics.record_request(self.chain, url, payload, latency, True, len(body), received, result)
+        return result
+
+    async def _hedged(self, primary: str, secondary: Optional[str], payload: Any) -> Any:
+        first = asyncio.create_task(self._post(primary, payload))
+        if secondary is None or not self.hedge:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay(primary))
+        if done:
+            return first.result()
+
+        second = asyncio.create_task(self._post(secondary, payload))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def post(self, payload: Any) -> Any:
+        """Отправляет JSON-RPC запрос (или пакет) с выбором эндпоинта, хеджированием и фейловером."""
+        ranked = self.ranked()
+        last_error = None
+        for attempt in range(min(MAX_ATTEMPTS, len(ranked))):
+            primary = ranked[attempt]
+            secondary = ranked[attempt + 1] if attempt + 1 < len(ranked) else None
+            try:
+                return await self._hedged(primary, secondary, payload)
+            except ProxyError as e:
+                # Закреплённый прокси меняет Client, при ротации следующая попытка возьмёт другой
+                if self.proxy != ROTATING:
+                    raise
+                last_error = e
+                logger.warning(f"Прокси недоступен, повторяем через другой: {e}")
+            except EndpointError as e:
+                last_error = e
+                logger.warning(f"RPC {primary} недоступен, пробуем следующий: {e}")
+        if isinstance(last_error, ProxyError):
+            raise last_error
+        raise EndpointError(f"Все RPC-эндпоинты недоступны: {last_error}")
+
+    async def broadcast(self, payload: dict) -> dict:
+        """
+        Рассылает запрос (отправку транзакции) на несколько эндпоинтов одновременно.
+        Возвращает первый успешный ответ, иначе первую полученную ошибку.
+        """
+        urls = self.ranked()[:BROADCAST_FANOUT]
+        tasks = [asyncio.create_task(self._post(url, payload)) for url in urls]
+        first_error, transport_error = None, None
+        try:
+            for future in asyncio.as_completed(tasks):
+                try:
+                    response = await future
+                except EndpointError as e:
+                    transport_error = transport_error or e
+                    continue
+                if "error" not in response:
+                    return response
+                first_error = first_error or response
+        finally:
+            for task in tasks:
+                task.cancel()
+        if first_error is not None:
+            return first_error
+        if isinstance(transport_error, ProxyError):
+            raise transport_error
+        raise EndpointError(f"Не удалось разослать транзакцию: {transport_error}")
+
+
+class PooledHTTPProvider(AsyncJSONBaseProvider):
+    """Провайдер AsyncWeb3, отправляющий запросы через RpcPool."""
+
+    def __init__(self, rpc_url: Union[str, list, tuple], proxy: Optional[str] = None):
+        super().__init__()
+        self.pool = RpcPool.get(rpc_url, proxy)
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        payload = {"jsonrpc": "2.0", "id": next(_request_ids), "method": method, "params": params}
+        if method == "eth_sendRawTransaction":
+            return await self.pool.broadcast(payload)
+        return await self.pool.post(payload)
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = await self.make_request(RPCEndpoint("web3_clientVersion"), [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return "error" not in response
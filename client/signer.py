@@ -0,0 +1,66 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import os
+
+# Ключи живут в воркерах: задача на подпись передаёт только индекс ключа и транзакцию
+_WORKER_KEYS: list[str] = []
+
+# Сколько транзакций отправлять в воркер за одну задачу при пакетной подписи
+BATCH_CHUNK = 16
+
+
+def raw_transaction(signed) -> bytes:
+    """Сырые байты подписанной транзакции для разных версий eth_account."""
+    raw = getattr(signed, "raw_transaction", None)
+    return bytes(raw if raw is not None else signed.rawTransaction)
+
+
+def _init_worker(keys: list[str]) -> None:
+    _WORKER_KEYS[:] = keys
+
+
+def _sign(key_index: int, tx: dict) -> bytes:
+    from eth_account import Account
+
+    return raw_transaction(Account.sign_transaction(tx, _WORKER_KEYS[key_index]))
+
+
+def _sign_many(items: list[tuple[int, dict]]) -> list[bytes]:
+    return [_sign(key_index, tx) for key_index, tx in items]
+
+
+class SigningService:
+    """
+    Подписывает транзакции вне event loop: в пуле процессов (по умолчанию)
+    или в пуле потоков, если бэкенд secp256k1 отпускает GIL.
+    Снаружи доступны только адреса ключей; кошелёк ссылается на свой ключ по индексу в addresses.
+    """
+
+    def __init__(self, private_keys: list[str], workers: Optional[int] = None, use_threads: bool = False):
+        from eth_account import Account
+
+        keys = list(private_keys)
+        self.addresses = [Account.from_key(key).address for key in keys]
+        self.workers = workers or os.cpu_count() or 1
+        if use_threads:
+            _init_worker(keys)
+            self.executor: Executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(keys,))
+
+    async def sign(self, key_index: int, tx: dict) -> bytes:
+        """Подписывает одну транзакцию и возвращает сырые байты для send_raw_transaction."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _sign, key_index, dict(tx))
+
+    async def sign_batch(self, items: list[tuple[int, dict]]) -> list[bytes]:
+        """Подписывает пакет (индекс ключа, транзакция), порядок результатов совпадает с входным."""
+        loop = asyncio.get_running_loop()
+        chunks = [[(key_index, dict(tx)) for key_index, tx in items[i:i + BATCH_CHUNK]]
+                  for i in range(0, len(items), BATCH_CHUNK)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, _sign_many, chunk) for chunk in chunks))
+        return [raw for chunk in results for raw in chunk]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,16 +1,14 @@
-from decimal import Decimal, InvalidOperation
-from eth_utils import decode_hex
 from dotenv import load_dotenv
-from eth_keys import keys
-import requests
+from utils.amount import Amount
+from utils.resources import resolve_path
 import logging
 import json
 import os
 import re
 
-MIN_AMOUNT = Decimal(0.0001)
+MIN_AMOUNT = Amount.parse("0.0001", 18)
 logger = logging.getLogger(__name__)
-load_dotenv(dotenv_path=".env")
+load_dotenv(dotenv_path=resolve_path(".env"))
 
 
 class ConfigValidator:
@@ -30,21 +28,32 @@ class ConfigValidator:
             logging.error(f"Ошибка разбора JSON в файле конфигурации {self.config_path}.")
             exit(1)
 
+    @staticmethod
+    def load_key_map() -> dict:
+        """Загружает словарь приватных ключей из переменной окружения PRIVATE_KEYS"""
+        raw = os.getenv("PRIVATE_KEYS")
+        if not raw:
+            logging.error("Ошибка: переменная окружения 'PRIVATE_KEYS' не найдена.")
+            exit(1)
+
+        try:
+            key_map = json.loads(raw)
+        except json.JSONDecodeError:
+            logging.error("Ошибка: 'PRIVATE_KEYS' в .env имеет некорректный JSON формат.")
+            exit(1)
+
+        if not isinstance(key_map, dict) or not key_map:
+            logging.error("Ошибка: 'PRIVATE_KEYS' должен быть непустым JSON-объектом.")
+            exit(1)
+
+        return key_map
+
     @staticmethod
     async def resolve_private_key(key: str) -> str:
 
         if key.startswith("ENV:"):
             key_name = key[4:]
-            raw = os.getenv("PRIVATE_KEYS")
-            if not raw:
-                logging.error("Ошибка: переменная окружения 'PRIVATE_KEYS' не найдена.")
-                exit(1)
-
-            try:
-                key_map = json.loads(raw)
-            except json.JSONDecodeError:
-                logging.error("Ошибка: 'PRIVATE_KEYS' в .env имеет некорректный JSON формат.")
-                exit(1)
+            key_map = ConfigValidator.load_key_map()
 
             if key_name not in key_map:
                 logging.error(f"Ошибка: ключ '{key_name}' не найден в переменной PRIVATE_KEYS.")
@@ -87,7 +96,7 @@ class ConfigValidator:
             logging.error("Ошибка: Отсутствует 'network' в конфигурации.")
             exit(1)
 
-        load_dotenv(dotenv_path="../.env")
+        load_dotenv(dotenv_path=resolve_path("..", ".env"))
 
         resolved_key = await self.resolve_private_key(self.config_data["private_key"])
 
@@ -95,11 +104,19 @@ class ConfigValidator:
 
         self.config_data["private_key"] = resolved_key
 
+        if self.config_data.get("batch"):
+            # Пакетный режим: все ключи из PRIVATE_KEYS
+            private_keys = self.load_key_map()
+            for private_key in private_keys.values():
+                await self.validate_private_key(private_key)
+            self.config_data["private_keys"] = private_keys
+            await self.validate_max_concurrency(self.config_data.get("max_concurrency", 3))
+
         await self.validate_from_token(self.config_data["from_token"])
         await self.validate_to_token(self.config_data["to_token"])
         await self.validate_network(self.config_data["network"])
         await self.validate_amount(self.config_data["amount"])
-        await self.validate_proxy(self.config_data["proxy"])
+        await self.validate_proxy(self.config_data["proxy"], self.config_data.get("proxy_mode", "sticky"))
 
         return self.config_data
 
@@ -121,6 +138,9 @@ class ConfigValidator:
     @staticmethod
     async def validate_private_key(private_key: str) -> None:
         """Валидация приватного ключа"""
+        # Импортируем криптографию только при реальной проверке ключа
+        from eth_utils import decode_hex
+        from eth_keys import keys
         try:
             private_key_bytes = decode_hex(private_key)
             _ = keys.PrivateKey(private_key_bytes)
@@ -132,7 +152,7 @@ class ConfigValidator:
     async def validate_network(network: str) -> None:
         """Валидация названия сети"""
         networks = [
-            "OPTIMISM", "BSC", "POLYGON", "ARBITRUM"
+            "OPTIMISM", "BSC", "POLYGON", "ARBITRUM", "BEST"
         ]
         if network not in networks:
             logging.error("Ошибка: Неподдерживаемая сеть! Введите одну из поддерживаемых сетей.")
@@ -159,25 +179,33 @@ class ConfigValidator:
             exit(1)
 
     @staticmethod
-    async def validate_proxy(proxy: str) -> None:
-        """Валидация прокси-адреса"""
-        if not proxy:
+    async def validate_proxy(proxy: str | list, mode: str = "sticky") -> None:
+        """Валидация прокси: формат каждого адреса и одновременная проверка доступности"""
+        proxies = proxy if isinstance(proxy, list) else [proxy] if proxy else []
+        if not proxies:
             logging.info("Прокси не указан — пропуск валидации.\n")
             return
 
         pattern = r"^(?P<login>[^:@]+):(?P<password>[^:@]+)@(?P<host>[\w.-]+):(?P<port>\d+)$"
-        match = re.match(pattern, proxy)
-        if not match:
-            logging.error("Ошибка: Неверный формат прокси! Должен быть 'login:pass@host:port'.")
+        for item in proxies:
+            if not isinstance(item, str) or not re.match(pattern, item):
+                logging.error("Ошибка: Неверный формат прокси! Должен быть 'login:pass@host:port'.")
+                exit(1)
+
+        from client.proxy_pool import ProxyPool
+
+        if mode not in ProxyPool.MODES:
+            logging.error(f"Ошибка: 'proxy_mode' должен быть одним из: {', '.join(ProxyPool.MODES)}.")
             exit(1)
 
-        proxy_url = {
-            "http": f"http://{proxy}"
-        }
-        response = requests.get("https://httpbin.org/ip", proxies=proxy_url, timeout=5)
-        if response.status_code != 200:
-            logging.error("Ошибка: 'proxy' нерабочий или вернул неверный статус-код!")
+        # Пул создаётся здесь, чтобы результаты проверки сразу учитывались при выдаче прокси
+        pool = ProxyPool.configure(proxies, mode)
+        working = await pool.check_all()
+        if not working:
+            logging.error("Ошибка: ни один 'proxy' не отвечает!")
             exit(1)
+        if len(working) < len(proxies):
+            logging.warning(f"Рабочих прокси {len(working)} из {len(proxies)}, нерабочие исключены.")
 
     @staticmethod
     async def validate_amount(amount_raw: float) -> None:
@@ -186,15 +214,22 @@ class ConfigValidator:
             raise ValueError(f"Количество должно быть строкой или числом, но имеет тип {type(amount_raw)}.")
 
         try:
-            amount = Decimal(str(amount_raw))
-        except InvalidOperation:
-            logging.error("Ошибка количества токенов! Введено невалидное значение.")
+            amount = Amount.parse(amount_raw, 18)
+        except (ValueError, TypeError):
+            logging.error("Ошибка количества токенов! Введено невалидное значение или больше 18 знаков после запятой.")
             exit(1)
 
-        if amount <= 0:
+        if amount.wei <= 0:
             logging.error("Количество токенов должно быть больше нуля.")
             exit(1)
 
         if amount < MIN_AMOUNT:
             logging.error("Количество токенов для отправки слишком мало, введите значение больше 0.0001.")
             exit(1)
+
+    @staticmethod
+    async def validate_max_concurrency(max_concurrency: int) -> None:
+        """Валидация лимита одновременных кошельков в одной сети"""
+        if not isinstance(max_concurrency, int) or isinstance(max_concurrency, bool) or max_concurrency < 1:
+            logging.error("Ошибка: 'max_concurrency' должен быть целым числом не меньше 1.")
+            exit(1)
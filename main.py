@@ -1,33 +1,53 @@
 import asyncio
-import json
-from web3 import Web3
+from typing import Optional
 from config.configvalidator import ConfigValidator
-from client.client import Client
-from uniswap.router import get_amount_out
-from uniswap.swapper import swap_eth_to_usdc
+from utils.resources import resolve_path, load_networks
 from utils.logger import logger
 
 
 async def main():
+    registry = None
+    metrics = None
+    metadata_cache = None
+    settings = {}
     try:
         logger.info("Запуск скрипта...\n")
 
         logger.info("Загрузка параметров конфигурации...\n")
-        config = ConfigValidator("config/settings.json")
+        config = ConfigValidator(resolve_path("config", "settings.json"))
         settings = await config.validate_config()
 
-        amount = float(settings["amount"])
+        # Стек web3 импортируется только после успешной проверки конфигурации
+        from client.client import Client
+        from client.metadata_cache import MetadataCache
+        from utils.amount import Amount
+        from client.provider_registry import ProviderRegistry
+        from uniswap.price_checker import get_best_quote, get_best_allocation, CHAIN_TIMEOUT, TOTAL_BUDGET
+        from uniswap.runner import run_swap_flow, run_batch, run_allocation, log_summary
+        from uniswap.watcher import run_watch
+        from uniswap.indexer import run_index
+        from uniswap.backtest import run_backtest
+        from client.signer import SigningService
+        from client.rpc_metrics import RpcMetrics
+        registry = ProviderRegistry
+        metrics = RpcMetrics
+
+        if settings.get("metrics_port"):
+            await metrics.serve(int(settings["metrics_port"]))
+
+        # Строка или число из настроек → точное количество в wei, без потерь float
+        amount = Amount.parse(settings["amount"], 18)
         private_key = settings["private_key"]
-        proxy = settings.get("proxy")
         network = settings["network"].upper()
 
-        with open("constants/networks_data.json", "r", encoding="utf-8") as f:
-            networks_data = json.load(f)
+        networks_data = load_networks()
 
+        # Checksum-адреса берутся из постоянного кэша метаданных, а не пересчитываются на каждом запуске
+        metadata_cache = MetadataCache.get()
         for net in networks_data.values():
-            for key in ["router_address", "wrapped_token"]:
-                if key in net:
-                    net[key] = Web3.to_checksum_address(net[key])
+            keys = [key for key in ["router_address", "wrapped_token"] if key in net]
+            for key, address in zip(keys, metadata_cache.checksum_many([net[key] for key in keys])):
+                net[key] = address
 
         usdc_tokens = {
             "OPTIMISM": "0x7F5c764cBc14f9669B88837ca1490cCa17c31607",
@@ -36,66 +56,109 @@ async def main():
             "ARBITRUM": "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
         }
 
-        net = networks_data[network]
+        def build_client(network_name: str, key: Optional[str] = private_key,
+                         signer: Optional[SigningService] = None, key_index: Optional[int] = None) -> Client:
+            net = networks_data[network_name]
+            return Client(
+                from_address=net["wrapped_token"],
+                to_address=usdc_tokens[network_name],
+                chain_id=net["chain_id"],
+                rpc_url=net["rpc_url"],
+                private_key=None if signer is not None else key,
+                amount=amount,
+                router_address=net["router_address"],
+                explorer_url=net["explorer_url"],
+                signer=signer,
+                key_index=key_index
+            )
 
         logger.info("Инициализация клиента...\n")
-        client = Client(
-            from_address=net["wrapped_token"],
-            to_address=usdc_tokens[network],
-            chain_id=net["chain_id"],
-            rpc_url=net["rpc_url"],
-            private_key=private_key,
-            amount=amount,
-            router_address=net["router_address"],
-            explorer_url=net["explorer_url"],
-            proxy=proxy
-        )
-        # Проверка на наличие wrapped native
-        w_balance = await client.get_erc20_balance()
-        w_balance = client.from_wei_main(w_balance, 18)
-
-        if w_balance < amount:
-            logger.info("⛓  Врапаем нативный токен в wrapped...\n")
-            try:
-                balance = await client.get_native_balance()
-                gas_cost = await client.get_tx_fee()
-                amount_in_wei = client.to_wei_main(client.amount, 18)
-
-                if balance < amount_in_wei + gas_cost:
-                    logger.error(f"[{client.network.name}] Недостаточно средств: баланс {client.from_wei_main(balance, 18)}")
-                    return ""
-
-                wrap_tx_hash = await client.wrap_native()
-                await client.wait_tx(wrap_tx_hash, client.explorer_url)
-            except Exception as e:
-                logger.error(f"Ошибка при врапе токена: {e}")
-                return
+        if settings.get("watch"):
+            # Режим наблюдения за котировками без свапов: в выбранной сети или во всех для BEST
+            names = [name for name in usdc_tokens if name in networks_data] if network == "BEST" else [network]
+            await run_watch([build_client(name) for name in names], settings.get("watch_threshold_bps", 10))
+            return
 
-        path = [
-            client.from_address,
-            client.to_address
-        ]
+        if settings.get("index"):
+            # Режим индексации истории пар маршрутов: в выбранной сети или во всех для BEST
+            names = [name for name in usdc_tokens if name in networks_data] if network == "BEST" else [network]
+            await run_index([build_client(name) for name in names],
+                            str(resolve_path(settings.get("index_db", "history.db"))),
+                            settings.get("index_from_block", 0))
+            return
 
-        logger.info("Подготовка свапа...\n")
-        amount_in_wei = client.to_wei_main(client.amount, 18)
+        if settings.get("backtest"):
+            # Бэктест допуска проскальзывания по истории, собранной режимом индексации
+            names = [name for name in usdc_tokens if name in networks_data] if network == "BEST" else [network]
+            await run_backtest([build_client(name) for name in names],
+                               str(resolve_path(settings.get("index_db", "history.db"))),
+                               settings.get("index_from_block", 0))
+            return
 
-        try:
-            usdc_out = await get_amount_out(client.w3, client.router_address, amount_in_wei, path)
-            logger.info(f"[{network}] Котировка: {amount} ETH ≈ {client.from_wei_main(usdc_out, 6)} USDC")
-        except Exception as e:
-            logger.error(f"Не удалось получить котировку: {e}")
+        if network == "BEST" and settings.get("split_order"):
+            # Разбиение ордера между сетями и маршрутами с учётом газа
+            clients = [build_client(name) for name in usdc_tokens if name in networks_data]
+            allocation = await get_best_allocation(
+                clients, amount.wei,
+                chain_timeout=settings.get("quote_timeout", CHAIN_TIMEOUT),
+                total_budget=settings.get("quote_budget", TOTAL_BUDGET)
+            )
+            if not allocation:
+                logger.error("Не удалось получить маршруты ни в одной сети")
+                return
+            log_summary(await run_allocation(allocation, settings.get("pipeline", False)))
             return
-        try:
-            tx_hash = await swap_eth_to_usdc(client, path, usdc_out)
-            if tx_hash:
-                logger.info(f"✅ Swap завершён")
-            else:
-                logger.warning("❌ Swap не был отправлен")
-        except Exception as e:
-            logger.error(f"Ошибка при выполнении свапа: {e}")
+
+        if network == "BEST":
+            # Режим лучшей сети: опрашиваем все сети параллельно и выбираем максимальную котировку
+            clients = [build_client(name) for name in usdc_tokens if name in networks_data]
+            wrapped_map = {name: networks_data[name]["wrapped_token"] for name in usdc_tokens if name in networks_data}
+            best_quote = await get_best_quote(
+                clients, wrapped_map, usdc_tokens,
+                chain_timeout=settings.get("quote_timeout", CHAIN_TIMEOUT),
+                total_budget=settings.get("quote_budget", TOTAL_BUDGET)
+            )
+            if not best_quote:
+                logger.error("Не удалось получить котировку ни в одной сети")
+                return
+            client = best_quote["client"]
+            network = client.network.name
+            logger.info(f"Выбрана сеть {network}\n")
+        else:
+            client = build_client(network)
+
+        if settings.get("batch"):
+            # Пакетный режим: все кошельки из PRIVATE_KEYS в выбранной сети
+            # Подпись выносится из event loop в пул процессов; клиенты знают только адрес и индекс ключа
+            signer = SigningService(list(settings.pop("private_keys").values()), settings.get("signing_workers"))
+            clients = [build_client(network, signer=signer, key_index=i) for i in range(len(signer.addresses))]
+            logger.info(f"Пакетный режим: {len(clients)} кошельков в сети {network}\n")
+            try:
+                records = await run_batch(clients, settings.get("max_concurrency", 3), settings.get("pipeline", False))
+            finally:
+                signer.shutdown()
+            log_summary(records)
+            return
+
+        record = await run_swap_flow(client, pipelined=settings.get("pipeline", False))
+        if record["success"]:
+            logger.info(f"✅ Swap завершён")
+        elif record["tx_hash"] is None:
+            logger.warning("❌ Swap не был отправлен")
 
     except Exception as e:
         logger.exception(f"Фатальная ошибка в main(): {e}")
+    finally:
+        if metrics is not None:
+            metrics.log_summary()
+            if settings.get("metrics_file"):
+                metrics.dump(resolve_path(settings["metrics_file"]))
+            await metrics.stop()
+        if registry is not None:
+            await registry.close()
+        if metadata_cache is not None:
+            # Статистика газа за запуск пишется одной записью
+            metadata_cache.flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Тесты запускаются из корня репозитория: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_account import Account  # noqa: E402
+from benchmarks.mock_chain import MockChain  # noqa: E402
+from client.client import Client  # noqa: E402
+from client.fee_oracle import FeeOracle  # noqa: E402
+from client.gas_cache import GasCache  # noqa: E402
+from client.metadata_cache import MetadataCache  # noqa: E402
+from client.nonce_manager import NonceManager  # noqa: E402
+from client.provider_registry import ProviderRegistry  # noqa: E402
+from client.proxy_pool import ProxyPool  # noqa: E402
+from client.receipt_tracker import ReceiptTracker  # noqa: E402
+from client.rpc_pool import RpcPool  # noqa: E402
+from uniswap.route_finder import RouteFinder  # noqa: E402
+from utils.resources import load_networks  # noqa: E402
+
+NETWORK = "ARBITRUM"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+
+
+@pytest.fixture(autouse=True)
+def metadata_cache(tmp_path):
+    """Отдельный кэш метаданных на тест, чтобы не трогать cache/metadata.json."""
+    MetadataCache._instance = MetadataCache(tmp_path / "metadata.json")
+    yield MetadataCache._instance
+    MetadataCache._instance = None
+
+
+@pytest.fixture(autouse=True)
+def reset_singletons():
+    """Общие на сеть компоненты привязаны к event loop теста и не переживают его."""
+    yield
+    for cls in (NonceManager, RpcPool, ReceiptTracker, GasCache, FeeOracle, RouteFinder):
+        cls._instances.clear()
+    ProxyPool._current = None
+
+
+@pytest.fixture
+def net() -> dict:
+    return load_networks()[NETWORK]
+
+
+@pytest.fixture
+def run_chain(net):
+    """
+    Запускает сценарий scenario(chain) на свежей заглушке JSON-RPC (benchmarks/mock_chain.py)
+    в новом event loop и закрывает HTTP-сессии после него.
+    """
+    def run(scenario, endpoints: int = 1, **kwargs):
+        async def main():
+            kwargs.setdefault("block_time", 3600)
+            chain = MockChain(net["chain_id"], net["wrapped_token"], USDC, net["router_address"], **kwargs)
+            await chain.start(endpoints)
+            try:
+                return await scenario(chain)
+            finally:
+                await ProviderRegistry.close()
+                await chain.stop()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def make_client(net):
+    """Кошелёк с новым ключом (или ключом из пула подписи) на эндпоинтах заглушки."""
+    def make(chain: MockChain, rpc_url=None, signer=None, key_index=None) -> Client:
+        return Client(
+            from_address=net["wrapped_token"],
+            to_address=USDC,
+            chain_id=net["chain_id"],
+            rpc_url=rpc_url or chain.urls,
+            private_key=None if signer is not None else Account.create().key.hex(),
+            amount="0.001",
+            router_address=net["router_address"],
+            explorer_url=net["explorer_url"],
+            signer=signer,
+            key_index=key_index
+        )
+
+    return make
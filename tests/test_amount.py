@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.amount import Amount
+
+
+@pytest.mark.parametrize("text, decimals, wei", [
+    ("1.5", 18, 15 * 10 ** 17),
+    ("-0.25", 6, -250_000),
+    ("+2", 6, 2_000_000),
+    (".5", 6, 500_000),
+    ("7.", 6, 7_000_000),
+    (" 0.000001 ", 6, 1),
+    ("1e-05", 18, 10 ** 13),
+    ("1.5E+3", 6, 1_500_000_000),
+    ("0.1000000", 6, 100_000),
+])
+def test_parse(text, decimals, wei):
+    assert Amount.parse(text, decimals).wei == wei
+    assert Amount.parse_many([text], decimals) == [wei]
+
+
+@pytest.mark.parametrize("text", ["", "-", "+", ".", "1e", "1e+", "e5", "١", "1١", "abc", "1.2.3", "1_000",
+                                  "1.-5", "--1", "+-1", "1e1.5", "1e_1", "inf", "nan"])
+def test_parse_rejects_invalid(text):
+    with pytest.raises(ValueError, match="Невалидное количество"):
+        Amount.parse(text, 18)
+
+
+def test_parse_rejects_lost_precision():
+    with pytest.raises(ValueError, match="не помещается"):
+        Amount.parse("0.0000001", 6)
+
+
+def test_parse_numbers_and_format_roundtrip():
+    assert Amount.parse(0.1).wei == 10 ** 17
+    assert Amount.parse(Decimal("1.25"), 6).wei == 1_250_000
+    assert Amount.parse(3, 6).wei == 3_000_000
+    assert str(Amount.parse("12.000034", 6)) == "12.000034"
+    assert Amount.format_many([-1_500_000], 6) == ["-1.5"]
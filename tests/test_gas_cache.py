@@ -0,0 +1,54 @@
+from client.gas_cache import ESTIMATE_PADDING, MIN_PADDING, MIN_SAMPLES, GasCache, swap_gas_key
+from client.metadata_cache import GAS_FLUSH_SECONDS, MetadataCache
+
+KEY = swap_gas_key("0x4752ba5DBc23f44D87826276BF6Fd6b1C372aD24", 2)
+
+
+def test_pad_without_stats_uses_fixed_padding():
+    assert GasCache(42161).pad(KEY, 100_000) == 100_000 * ESTIMATE_PADDING
+
+
+def test_pad_never_returns_unpadded_estimate():
+    cache = GasCache(42161)
+    cache.observe(KEY, 50_000, 200_000, True)
+    # Оценка выше всего, что видела статистика: отправляется с запасом, а не как есть
+    assert cache.pad(KEY, 150_000) >= 150_000 * MIN_PADDING
+    assert cache.pad(KEY, 10_000) == cache.stats[KEY].limit()
+
+
+def test_stats_survive_restart(tmp_path):
+    path = tmp_path / "gas.json"
+    cache = GasCache(42161, MetadataCache(path))
+    for gas_used in (100_000, 101_000, 99_000):
+        cache.observe(KEY, gas_used, 200_000, True)
+    # Receipt-ы не переписывают файл, статистика уходит на диск одной записью при завершении
+    assert not path.exists()
+    cache.metadata.flush()
+
+    restored = GasCache(42161, MetadataCache(path))
+    assert restored.stats[KEY].count == MIN_SAMPLES
+    assert restored.limit(KEY) == cache.limit(KEY)
+    assert restored.expected(KEY, 0) == 100_000
+
+
+def test_out_of_gas_resets_persisted_stats(tmp_path):
+    path = tmp_path / "gas.json"
+    cache = GasCache(42161, MetadataCache(path))
+    cache.observe(KEY, 100_000, 200_000, True)
+    cache.metadata.flush()
+    cache.observe(KEY, 120_000, 120_000, False)
+    cache.metadata.flush()
+    assert GasCache(42161, MetadataCache(path)).limit(KEY) is None
+    assert KEY not in GasCache(42161, MetadataCache(path)).stats
+
+
+def test_stats_flushed_periodically(tmp_path, monkeypatch):
+    path = tmp_path / "gas.json"
+    cache = GasCache(42161, MetadataCache(path))
+    cache.observe(KEY, 100_000, 200_000, True)
+    assert not path.exists()
+
+    monkeypatch.setattr(cache.metadata, "saved_at", cache.metadata.saved_at - GAS_FLUSH_SECONDS)
+    cache.observe(KEY, 101_000, 200_000, True)
+    assert GasCache(42161, MetadataCache(path)).stats[KEY].count == 2
+    assert not cache.metadata.dirty
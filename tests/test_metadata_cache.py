@@ -0,0 +1,71 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from client.metadata_cache import MetadataCache
+
+
+def test_concurrent_saves_leave_valid_file(tmp_path):
+    # Несколько процессов cron с общим файлом кэша: у каждого свой экземпляр и свой временный файл
+    path = tmp_path / "metadata.json"
+    caches = [MetadataCache(path) for _ in range(8)]
+
+    def save_many(index: int) -> None:
+        cache = caches[index]
+        for i in range(50):
+            cache.store_tokens(42161, {f"0x{index:020x}{i:020x}": {"decimals": 6, "symbol": "USDC"}})
+
+    with ThreadPoolExecutor(len(caches)) as pool:
+        list(pool.map(save_many, range(len(caches))))
+
+    with open(path, encoding="utf-8") as f:
+        json.load(f)
+    assert os.listdir(tmp_path) == ["metadata.json"]
+    # Файл целиком от одного из процессов: все 50 токенов последнего записавшего
+    assert len(MetadataCache(path).data["chains"]["42161"]["tokens"]) == 50
+
+
+def test_failed_save_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "metadata.json"
+    cache = MetadataCache(path)
+    cache.store_tokens(42161, {"0xaf88d065e77c8cC2239327C5EDb3A432268e5831": {"decimals": 6, "symbol": "USDC"}})
+
+    def fail(*args):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(os, "replace", fail)
+    cache.store_tokens(42161, {"0x82aF49447D8a07e3bd95BD0d56f35241523fBab1": {"decimals": 18, "symbol": "WETH"}})
+    assert os.listdir(tmp_path) == ["metadata.json"]
+    assert MetadataCache(path).token(42161, "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1") is None
+
+
+def count_saves(cache, monkeypatch) -> list:
+    saves = []
+    save = cache.save
+    monkeypatch.setattr(cache, "save", lambda: (saves.append(1), save()))
+    return saves
+
+
+def test_store_tokens_saves_only_changes(tmp_path, monkeypatch):
+    cache = MetadataCache(tmp_path / "metadata.json")
+    saves = count_saves(cache, monkeypatch)
+    usdc = {"0xaf88d065e77c8cC2239327C5EDb3A432268e5831": {"decimals": 6, "symbol": "USDC"}}
+    cache.store_tokens(42161, usdc)
+    cache.store_tokens(42161, usdc)
+    cache.store_tokens(42161, {"0x82aF49447D8a07e3bd95BD0d56f35241523fBab1": {"decimals": None, "symbol": None}})
+    assert len(saves) == 1
+
+
+def test_pairs_checksums_with_one_save(tmp_path, monkeypatch):
+    router = "0x4752ba5DBc23f44D87826276BF6Fd6b1C372aD24"
+    weth, usdc, arb = ("0x82aF49447D8a07e3bd95BD0d56f35241523fBab1", "0xaf88d065e77c8cC2239327C5EDb3A432268e5831",
+                       "0x912CE59144191C1204E64559FE8253a0e49E6548")
+    cache = MetadataCache(tmp_path / "metadata.json")
+    cache.store_router(42161, router, None, {(weth, usdc): "0x01", (arb, usdc): "0x02"})
+    cache.data["addresses"].clear()
+
+    saves = count_saves(cache, monkeypatch)
+    assert cache.pairs(42161, router) == {(weth, usdc): "0x01", (arb, usdc): "0x02"}
+    assert len(saves) == 1
+    cache.pairs(42161, router)
+    assert len(saves) == 1
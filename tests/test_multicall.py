@@ -0,0 +1,64 @@
+import pytest
+
+from client.multicall import MulticallReader
+from client.rpc_pool import EndpointError
+from uniswap.runner import prefetch_balances
+
+
+def test_wallets_state_in_one_call(run_chain, make_client):
+    async def scenario(chain):
+        clients = [make_client(chain) for _ in range(50)]
+        wrapped = clients[0].from_address
+        for i, client in enumerate(clients):
+            chain.native[client.address.lower()] = i * 10 ** 15
+            chain.tokens[chain.wrapped_token][client.address.lower()] = i
+
+        chain.reset_counters()
+        state = await MulticallReader(clients[0].w3).get_wallets_state(
+            [client.address for client in clients], [wrapped], native=True)
+        # Один eth_call на все кошельки (eth_chainId добавляет валидация web3 к любому eth_call)
+        assert chain.calls["eth_call"] == 1
+        for i, client in enumerate(clients):
+            assert state[(client.address, wrapped)]["balance"] == i
+            assert state[(client.address, None)]["balance"] == i * 10 ** 15
+
+    run_chain(scenario)
+
+
+def test_rejected_batch_is_split(run_chain, make_client):
+    async def scenario(chain):
+        clients = [make_client(chain) for _ in range(10)]
+        state = await MulticallReader(clients[0].w3).get_wallets_state(
+            [client.address for client in clients], [clients[0].from_address], native=True)
+        assert all(item["balance"] is not None for item in state.values())
+        # 20 вызовов при лимите 6: 20 → 10 → 5 — три уровня деления
+        assert chain.calls["eth_call"] == 1 + 2 + 4
+
+    run_chain(scenario, max_multicall=6)
+
+
+def test_endpoint_error_is_not_split(run_chain, make_client):
+    async def scenario(chain):
+        clients = [make_client(chain) for _ in range(10)]
+        chain.error_rate = 1.0
+        chain.reset_counters()
+        with pytest.raises(EndpointError):
+            await MulticallReader(clients[0].w3).get_wallets_state(
+                [client.address for client in clients], [clients[0].from_address], native=True)
+        assert chain.http_requests == 1
+
+    run_chain(scenario)
+
+
+def test_batch_prefetch(run_chain, make_client):
+    async def scenario(chain):
+        clients = [make_client(chain) for _ in range(20)]
+        chain.tokens[chain.wrapped_token][clients[3].address.lower()] = 5
+        chain.reset_counters()
+        balances = await prefetch_balances(clients)
+        assert chain.calls["eth_call"] == 1
+        assert "eth_getBalance" not in chain.calls
+        assert balances[clients[3]] == {"native": chain.native_balance(clients[3].address), "wrapped": 5}
+        assert len(balances) == len(clients)
+
+    run_chain(scenario)
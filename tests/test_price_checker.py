@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+from uniswap import price_checker
+
+
+def fake_client(network: str):
+    return SimpleNamespace(network=SimpleNamespace(name=network), amount="1", from_wei_main=lambda wei, d: wei)
+
+
+def test_best_quote_compares_usdc_across_decimals(monkeypatch):
+    # BSC: USDC с 18 знаками, но котировка на 10% хуже, чем в Arbitrum с 6 знаками
+    quotes = {"BSC": (2_700 * 10 ** 18, 18), "ARBITRUM": (3_000 * 10 ** 6, 6)}
+
+    async def quote_chain(client, wrapped_token_map, usdc_map, timeout):
+        amount, decimals = quotes[client.network.name]
+        return {"network": client.network.name, "client": client, "usdc_amount": amount, "path": ["w", "u"],
+                "decimals": decimals, "latency": 0.0, "error": None}
+
+    monkeypatch.setattr(price_checker, "_quote_chain", quote_chain)
+    clients = [fake_client("BSC"), fake_client("ARBITRUM")]
+    best = asyncio.run(price_checker.get_best_quote(clients, {}, {}))
+    assert best["client"].network.name == "ARBITRUM"
+    assert best["decimals"] == 6
+
+
+def test_best_quote_skips_chain_without_decimals(monkeypatch):
+    async def quote_chain(client, wrapped_token_map, usdc_map, timeout):
+        error = "Не удалось получить decimals токена u" if client.network.name == "BSC" else None
+        return {"network": client.network.name, "client": client, "usdc_amount": None if error else 3_000 * 10 ** 6,
+                "path": ["w", "u"], "decimals": None if error else 6, "latency": 0.0, "error": error}
+
+    monkeypatch.setattr(price_checker, "_quote_chain", quote_chain)
+    best = asyncio.run(price_checker.get_best_quote([fake_client("BSC"), fake_client("ARBITRUM")], {}, {}))
+    assert best["client"].network.name == "ARBITRUM"
+
+
+def test_allocation_compares_curves_across_decimals(monkeypatch):
+    # Одинаковая глубина пулов, но в BSC выход на 10% хуже; без нормализации 18 знаков BSC забрал бы всё
+    curves = {"BSC": (2_700 * 10 ** 18 * 1_000, 1_000 * 10 ** 18, 18),
+              "ARBITRUM": (3_000 * 10 ** 6 * 1_000, 1_000 * 10 ** 18, 6)}
+
+    async def chain_pools(client, timeout):
+        r, k, decimals = curves[client.network.name]
+        return {"network": client.network.name, "client": client, "decimals": decimals, "latency": 0.0,
+                "error": None, "pools": [{"path": ["w", "u"], "curve": (r, k), "gas_cost": 0.0}]}
+
+    def finder(client):
+        r, k, _ = curves[client.network.name]
+        return SimpleNamespace(quoter=SimpleNamespace(quote=lambda amount, path: [amount, r * amount // (k + amount)]))
+
+    monkeypatch.setattr(price_checker, "_chain_pools", chain_pools)
+    monkeypatch.setattr(price_checker.RouteFinder, "get", finder)
+    allocation = asyncio.run(price_checker.get_best_allocation([fake_client("BSC"), fake_client("ARBITRUM")],
+                                                               10 * 10 ** 18))
+    legs = {leg["network"]: leg for leg in allocation["legs"]}
+    assert legs["ARBITRUM"]["amount_in"] > legs.get("BSC", {"amount_in": 0})["amount_in"]
+    assert legs["ARBITRUM"]["decimals"] == 6
+    assert sum(leg["amount_in"] for leg in allocation["legs"]) == 10 * 10 ** 18
+
+
+def test_allocation_chain_without_decimals_is_skipped(monkeypatch):
+    async def chain_pools(client, timeout):
+        error = "Не удалось получить decimals токена u" if client.network.name == "BSC" else None
+        pools = [] if error else [{"path": ["w", "u"], "curve": (3 * 10 ** 12, 10 ** 21), "gas_cost": 0.0}]
+        return {"network": client.network.name, "client": client, "decimals": None if error else 6,
+                "latency": 0.0, "error": error, "pools": pools}
+
+    quoter = SimpleNamespace(quote=lambda amount, path: [amount, 3 * 10 ** 12 * amount // (10 ** 21 + amount)])
+    monkeypatch.setattr(price_checker, "_chain_pools", chain_pools)
+    monkeypatch.setattr(price_checker.RouteFinder, "get", lambda client: SimpleNamespace(quoter=quoter))
+    allocation = asyncio.run(price_checker.get_best_allocation([fake_client("BSC"), fake_client("ARBITRUM")],
+                                                               10 ** 18))
+    assert [leg["network"] for leg in allocation["legs"]] == ["ARBITRUM"]
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import math
+import socket
+
+import aiohttp
+
+from client.proxy_pool import ProxyPool, ProxyStats, ROTATING
+
+CHECK_URL = "http://proxy-check.invalid/ip"
+
+
+class StandInProxy:
+    """
+    HTTP-прокси на localhost: пересылает запросы к RPC-заглушке, а проверку доступности
+    (CHECK_URL) обслуживает сам, как httpbin. Считает прошедшие через него запросы.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.server = None
+        self.address = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode()
+            method, target, _ = head.split("\r\n")[0].split(" ")
+            headers = {}
+            for line in head.split("\r\n")[1:]:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests += 1
+            if target == CHECK_URL:
+                status, payload = 200, json.dumps({"origin": "127.0.0.1"}).encode()
+            else:
+                async with aiohttp.ClientSession() as session:
+                    async with session.request(method, target, data=body,
+                                               headers={"Content-Type": "application/json"}) as response:
+                        status, payload = response.status, await response.read()
+            writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.address = f"user:pass@127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        return self.address
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def dead_proxy() -> str:
+    """Адрес порта, на котором никто не слушает: соединение с прокси отклоняется."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"user:pass@127.0.0.1:{port}"
+
+
+def with_proxy(run_chain, scenario, **kwargs):
+    async def wrapped(chain):
+        proxy = StandInProxy()
+        await proxy.start()
+        try:
+            return await scenario(chain, proxy)
+        finally:
+            await proxy.stop()
+
+    return run_chain(wrapped, **kwargs)
+
+
+def test_score_without_successes_is_worst():
+    dead, good, fresh = ProxyStats("dead"), ProxyStats("good"), ProxyStats("fresh")
+    dead.record(0.1, False)
+    good.record(0.2, True)
+    assert dead.score == math.inf
+    assert good.score < fresh.score < dead.score
+
+
+def test_failed_check_excludes_proxy(run_chain, make_client):
+    async def scenario(chain, proxy):
+        dead = dead_proxy()
+        pool = ProxyPool.configure([dead, proxy.address])
+        working = await pool.check_all(timeout=2, check_url=CHECK_URL)
+        assert working == [proxy.address]
+        assert pool.ranked() == [proxy.address, dead]
+        assert not pool.stats[dead].is_healthy()
+        assert {pool.client_proxy(f"wallet-{i}") for i in range(5)} == {proxy.address}
+
+        client = make_client(chain)
+        assert client.proxy == proxy.address
+        assert await client.get_native_balance() == chain.native_balance(client.address)
+        assert proxy.requests >= 2
+
+    with_proxy(run_chain, scenario)
+
+
+def test_sticky_failover_through_retry(run_chain, make_client):
+    async def scenario(chain, proxy):
+        dead = dead_proxy()
+        ProxyPool.configure([dead, proxy.address])
+        # Без проверки оба прокси равны, кошелёк получает первый — нерабочий
+        client = make_client(chain)
+        assert client.proxy == dead
+
+        assert await client.get_native_balance() == chain.native_balance(client.address)
+        assert client.proxy == proxy.address
+        pool = ProxyPool.current()
+        assert pool.assignments[client.address] == proxy.address
+        assert pool.stats[dead].failures == 1
+
+    with_proxy(run_chain, scenario)
+
+
+def test_rotating_requests_skip_excluded_proxy(run_chain, make_client):
+    async def scenario(chain, proxy):
+        dead = dead_proxy()
+        pool = ProxyPool.configure([dead, proxy.address], mode="rotate")
+        await pool.check_all(timeout=2, check_url=CHECK_URL)
+        client = make_client(chain)
+        assert client.proxy == ROTATING
+
+        proxy.requests = 0
+        for _ in range(4):
+            await client.get_native_balance()
+        assert proxy.requests == 4
+        assert pool.stats[proxy.address].failures == 0
+
+    with_proxy(run_chain, scenario)
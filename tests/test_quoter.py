@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from uniswap.quoter import V2Quoter, apply_slippage, sort_tokens
+
+ROUTER = "0x1b02dA8Cb0d097eB8D57A175b88c7D8b47997506"
+WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+ARB = "0x912CE59144191C1204E64559FE8253a0e49E6548"
+
+# Синтетические резервы пар (не снятые с сети): (токен, резерв) для каждой стороны
+PAIRS = [
+    ((USDC, 5_812_345_678_901), (WETH, 1_934_567_890_123_456_789_012)),
+    ((WETH, 1_234_567_890_123_456_789_012), (ARB, 3_456_789_012_345_678_901_234_567)),
+    ((ARB, 9_876_543_210_987_654_321_098_765), (USDC, 7_654_321_098_765)),
+]
+
+
+def make_quoter(fee_bps: int) -> V2Quoter:
+    """Квотер с резервами из PAIRS в кэше, без RPC."""
+    quoter = V2Quoter(None, ROUTER, fee_bps=fee_bps)
+    for i, ((token_a, reserve_a), (token_b, reserve_b)) in enumerate(PAIRS):
+        token0, token1 = sort_tokens(token_a, token_b)
+        reserves = {token_a: reserve_a, token_b: reserve_b}
+        address = f"0x{i + 1:040x}"
+        quoter.pair_addresses[(token0, token1)] = address
+        quoter.pairs[address] = {"token0": token0, "token1": token1, "reserve0": reserves[token0],
+                                 "reserve1": reserves[token1], "updated_at": time.monotonic()}
+    return quoter
+
+
+def reference_amounts_out(amount_in: int, path: list[str], fee_bps: int) -> list[int]:
+    """Формула UniswapV2Library.getAmountsOut, записанная независимо от uniswap/quoter.py."""
+    reserves = {}
+    for (token_a, reserve_a), (token_b, reserve_b) in PAIRS:
+        reserves[(token_a, token_b)] = (reserve_a, reserve_b)
+        reserves[(token_b, token_a)] = (reserve_b, reserve_a)
+    amounts = [amount_in]
+    for token_in, token_out in zip(path, path[1:]):
+        reserve_in, reserve_out = reserves[(token_in, token_out)]
+        amount_with_fee = amounts[-1] * (10_000 - fee_bps)
+        amounts.append(amount_with_fee * reserve_out // (reserve_in * 10_000 + amount_with_fee))
+    return amounts
+
+
+# Ожидаемые суммы для 1 WETH вычислены по формуле V2 из синтетических резервов PAIRS,
+# а не записаны из ответов getAmountsOut реального роутера
+@pytest.mark.parametrize("fee_bps, path, expected", [
+    (30, [WETH, USDC], [10 ** 18, 2_993_910_806]),
+    (30, [WETH, ARB, USDC], [10 ** 18, 2_789_346_535_222_668_959_013, 2_154_651_671]),
+    (25, [WETH, USDC], [10 ** 18, 2_995_411_492]),
+    (25, [WETH, ARB, USDC], [10 ** 18, 2_790_744_275_760_490_812_018, 2_156_811_866]),
+])
+def test_quote_matches_v2_formula(fee_bps, path, expected):
+    assert reference_amounts_out(10 ** 18, path, fee_bps) == expected
+    assert make_quoter(fee_bps).quote(10 ** 18, path) == expected
+
+
+def test_quote_reverse_direction():
+    # 5 USDC → WETH: резервы берутся в обратном порядке
+    assert make_quoter(30).quote(5 * 10 ** 6, [USDC, WETH]) == [5 * 10 ** 6, 1_659_194_616_759_910]
+
+
+def test_quote_ladder_matches_quote():
+    quoter = make_quoter(30)
+    amounts = [10 ** 15, 10 ** 17, 10 ** 18, 10 ** 20]
+    path = [WETH, ARB, USDC]
+    assert quoter.quote_ladder(amounts, path) == [quoter.quote(a, path)[-1] for a in amounts]
+    assert quoter.quote_ladder([10 ** 18], path, slippage_bps=50) == [apply_slippage(2_154_651_671, 50)]
+
+
+def test_curve_matches_quote():
+    r, k = make_quoter(30).curve([WETH, ARB, USDC])
+    assert r * 10 ** 18 / (k + 10 ** 18) == pytest.approx(2_154_651_671, rel=1e-9)
+
+
+def test_missing_reserves():
+    with pytest.raises(KeyError):
+        V2Quoter(None, ROUTER).quote(10 ** 18, [WETH, USDC])
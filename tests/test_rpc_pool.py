@@ -0,0 +1,153 @@
+import asyncio
+import math
+import time
+
+import pytest
+from aiohttp import web
+
+from client import rpc_pool
+from client.provider_registry import ProviderRegistry
+from client.rpc_pool import EndpointError, EndpointStats, RpcPool
+
+PAYLOAD = {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+
+
+class StandInNode:
+    """Эндпоинт JSON-RPC с настраиваемой задержкой и отказами; отвечает своим номером блока."""
+
+    def __init__(self, block: int, latency: float = 0.0, status: int = 200):
+        self.block = block
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return web.Response(status=self.status, text="stand-in failure")
+        return web.json_response({"jsonrpc": "2.0", "id": payload["id"], "result": hex(self.block)})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+        return self.url
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+def run_nodes(nodes: list[StandInNode], scenario):
+    async def main():
+        urls = [await node.start() for node in nodes]
+        try:
+            return await scenario(RpcPool(tuple(urls)))
+        finally:
+            await ProviderRegistry.close()
+            for node in nodes:
+                await node.stop()
+
+    return asyncio.run(main())
+
+
+def test_score_penalizes_endpoints_without_successes():
+    dead, good, fresh = EndpointStats("http://dead"), EndpointStats("http://good"), EndpointStats("http://fresh")
+    dead.record(0.01, False)
+    for _ in range(3):
+        good.record(0.05, True)
+    assert dead.score == math.inf
+    assert good.score < fresh.score < dead.score
+
+
+def test_prefers_lower_latency():
+    slow, fast = StandInNode(1, latency=0.05), StandInNode(2, latency=0.0)
+
+    async def scenario(pool):
+        pool.hedge = False
+        for url in pool.urls:
+            await pool._post(url, PAYLOAD)
+        assert pool.ranked()[0] == fast.url
+        fast.requests = slow.requests = 0
+        responses = [await pool.post(PAYLOAD) for _ in range(5)]
+        assert {response["result"] for response in responses} == {hex(2)}
+        assert slow.requests == 0
+
+    run_nodes([slow, fast], scenario)
+
+
+def test_failed_endpoint_ranks_last():
+    dead, good = StandInNode(1, status=503), StandInNode(2, latency=0.05)
+
+    async def scenario(pool):
+        with pytest.raises(EndpointError):
+            await pool._post(dead.url, PAYLOAD)
+        await pool._post(good.url, PAYLOAD)
+        assert pool.ranked() == [good.url, dead.url]
+
+    run_nodes([dead, good], scenario)
+
+
+def test_failover_to_next_endpoint():
+    dead, good = StandInNode(1, status=503), StandInNode(2)
+
+    async def scenario(pool):
+        pool.hedge = False
+        response = await pool.post(PAYLOAD)
+        assert response["result"] == hex(2)
+        assert dead.requests == 1 and good.requests == 1
+        assert pool.stats[dead.url].results[-1] is False
+
+    run_nodes([dead, good], scenario)
+
+
+def test_all_endpoints_down():
+    async def scenario(pool):
+        with pytest.raises(EndpointError):
+            await pool.post(PAYLOAD)
+
+    run_nodes([StandInNode(1, status=503), StandInNode(2, status=429)], scenario)
+
+
+def test_hedges_slow_primary():
+    primary, secondary = StandInNode(1), StandInNode(2, latency=0.01)
+
+    async def scenario(pool):
+        # Быстрая история первичного эндпоинта даёт короткую задержку хеджа
+        for _ in range(rpc_pool.HEDGE_MIN_SAMPLES):
+            pool.stats[primary.url].record(0.005, True)
+            pool.stats[secondary.url].record(0.05, True)
+        assert pool.ranked()[0] == primary.url
+        primary.latency = 1.0
+
+        started = time.perf_counter()
+        response = await pool.post(PAYLOAD)
+        assert response["result"] == hex(2)
+        assert time.perf_counter() - started < 0.5
+        assert primary.requests == 1 and secondary.requests == 1
+
+    run_nodes([primary, secondary], scenario)
+
+
+def test_cooldown_after_error_rate():
+    flaky, good = StandInNode(1, status=500), StandInNode(2, latency=0.02)
+
+    async def scenario(pool):
+        for _ in range(5):
+            with pytest.raises(EndpointError):
+                await pool._post(flaky.url, PAYLOAD)
+        assert not pool.stats[flaky.url].is_healthy()
+        flaky.status = 200
+        flaky.requests = 0
+        pool.hedge = False
+        assert (await pool.post(PAYLOAD))["result"] == hex(2)
+        assert flaky.requests == 0
+
+    run_nodes([flaky, good], scenario)
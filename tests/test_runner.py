@@ -0,0 +1,91 @@
+import asyncio
+
+from uniswap import runner
+from uniswap.quoter import compute_pair_address
+from uniswap.runner import run_batch, run_swap_flow
+from utils.encoders import DEPOSIT
+
+from conftest import USDC
+
+
+def chain_kwargs(net, block_time: float = 0.05) -> dict:
+    # По умолчанию блоки часто, чтобы ожидание receipt-ов не растягивало тест
+    return {"block_time": block_time, "pair_address": compute_pair_address(
+        net["factory_address"], net["wrapped_token"], USDC, net["init_code_hash"])}
+
+
+def test_swap_flow_end_to_end(run_chain, make_client, net, metadata_cache):
+    async def scenario(chain):
+        client = make_client(chain)
+        record = await run_swap_flow(client)
+        return record, chain.tokens[USDC.lower()].get(client.address.lower(), 0)
+
+    record, usdc_balance = run_chain(scenario, **chain_kwargs(net))
+    assert record["success"], record["error"]
+    assert record["wrap_tx"] and record["tx_hash"]
+    assert record["amount_out"] == usdc_balance > 0
+    # Decimals USDC заглушка отдаёт сама, без значения по умолчанию
+    assert metadata_cache.token(net["chain_id"], USDC)["decimals"] == 6
+
+
+def test_batch_end_to_end(run_chain, make_client, net):
+    async def scenario(chain):
+        return await run_batch([make_client(chain) for _ in range(3)], max_concurrency=2)
+
+    records = run_chain(scenario, **chain_kwargs(net))
+    assert [record["error"] for record in records] == [None] * 3
+    assert all(record["success"] and record["amount_out"] > 0 for record in records)
+
+
+async def until(predicate, timeout: float = 10.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "условие не выполнилось"
+        await asyncio.sleep(0.01)
+
+
+async def mine_until_done(chain, task) -> dict:
+    """Блоки до завершения сценария: receipt-ы проверяются только на новых блоках."""
+    while not task.done():
+        chain.mine_block()
+        await asyncio.sleep(0.05)
+    return task.result()
+
+
+# Блоки добывает сам тест: за время теста таймер заглушки (60 с) не срабатывает,
+# а время блока остаётся в пределах срока действия свапа
+def test_pipelined_reverted_wrap_cancels_swap(run_chain, make_client, net):
+    async def scenario(chain):
+        chain.reverting.add(DEPOSIT)
+        client = make_client(chain)
+        task = asyncio.create_task(run_swap_flow(client, pipelined=True))
+        await until(lambda: len(chain.mempool) == 2)
+        # Wrap отдельным блоком и откатывается; свап остаётся в мемпуле
+        chain.mine_block(max_txs=1)
+        await until(lambda: chain.replaced == 1)
+        cancel = chain.mempool[0]
+        return client, cancel, await mine_until_done(chain, task)
+
+    client, cancel, record = run_chain(scenario, **chain_kwargs(net, block_time=60))
+    assert record["error"] == "Wrap откатился, свап отменён"
+    assert cancel["to"] == client.address.lower() and cancel["value"] == 0
+    assert not record["success"]
+
+
+def test_pipelined_stuck_wrap_is_replaced_with_higher_fee(run_chain, make_client, net, monkeypatch):
+    monkeypatch.setattr(runner, "PIPELINE_WRAP_TIMEOUT", 0.3)
+
+    async def scenario(chain):
+        task = asyncio.create_task(run_swap_flow(make_client(chain), pipelined=True))
+        await until(lambda: len(chain.mempool) == 2)
+        wrap = chain.mempool[0]
+        # Блоков нет, пока wrap не заменён копией с большей комиссией
+        await until(lambda: chain.replaced == 1)
+        replacement = chain.mempool[0]
+        return wrap, replacement, await mine_until_done(chain, task)
+
+    wrap, replacement, record = run_chain(scenario, **chain_kwargs(net, block_time=60))
+    assert record["success"], record["error"]
+    assert replacement["to"] == wrap["to"] and replacement["data"] == wrap["data"]
+    assert replacement["nonce"] == wrap["nonce"] and replacement["fee"] > wrap["fee"]
@@ -0,0 +1,38 @@
+import asyncio
+
+from eth_account import Account
+
+from client.signer import SigningService
+
+from conftest import NETWORK
+
+TX = {"chainId": 42161, "nonce": 0, "to": "0x1b02dA8Cb0d097eB8D57A175b88c7D8b47997506", "value": 10 ** 15,
+      "data": "0x", "gas": 21_000, "maxFeePerGas": 10 ** 8, "maxPriorityFeePerGas": 0, "type": 2}
+
+
+def test_client_with_signer_keeps_no_key(run_chain, make_client, net):
+    keys = [Account.create().key.hex() for _ in range(2)]
+    signer = SigningService(keys, workers=1, use_threads=True)
+
+    async def scenario(chain):
+        client = make_client(chain, signer=signer, key_index=1)
+        return client, await client.sign_tx(dict(TX))
+
+    try:
+        client, raw = run_chain(scenario)
+    finally:
+        signer.shutdown()
+    assert client.private_key is None
+    assert client.address == Account.from_key(keys[1]).address
+    assert Account.recover_transaction(raw) == client.address
+    assert client.network.name == NETWORK
+
+
+def test_sign_batch_uses_key_indices():
+    keys = [Account.create().key.hex() for _ in range(3)]
+    signer = SigningService(keys, workers=2, use_threads=True)
+    try:
+        raws = asyncio.run(signer.sign_batch([(i % 3, dict(TX, nonce=i)) for i in range(5)]))
+    finally:
+        signer.shutdown()
+    assert [Account.recover_transaction(raw) for raw in raws] == [signer.addresses[i % 3] for i in range(5)]
@@ -0,0 +1,34 @@
+SNAPSHOT_METHODS = {"eth_getBalance", "eth_call", "eth_getTransactionCount", "eth_gasPrice", "eth_feeHistory",
+                    "eth_getBlockByNumber"}
+
+
+def test_snapshot_is_one_batch(run_chain, make_client):
+    async def scenario(chain):
+        client = make_client(chain)
+        # Первый снимок заодно сверяет chain id для кэша метаданных
+        await client.get_snapshot()
+
+        chain.reset_counters()
+        snapshots = [await client.get_snapshot() for _ in range(3)]
+        assert chain.http_requests == 3
+        assert set(chain.calls) == SNAPSHOT_METHODS
+        assert all(count == 3 for count in chain.calls.values())
+
+        snapshot = snapshots[-1]
+        assert snapshot["chain_id"] == chain.chain_id
+        assert snapshot["native_balance"] == chain.native_balance(client.address)
+        assert snapshot["nonce"] == 0
+        assert snapshot["block_number"] == chain.block_number
+
+    run_chain(scenario)
+
+
+def test_cold_snapshot_verifies_chain_once(run_chain, make_client):
+    async def scenario(chain):
+        client = make_client(chain)
+        await client.get_snapshot()
+        # Пакет снимка и один пакет сверки chain id и кода роутера
+        assert chain.http_requests == 2
+        assert chain.calls["eth_chainId"] == 1
+
+    run_chain(scenario)
@@ -0,0 +1,13 @@
+from types import SimpleNamespace
+
+from uniswap.swapper import encode_swap
+
+WALLET = "0x" + "11" * 20
+PATH = ["0x82aF49447D8a07e3bd95BD0d56f35241523fBab1", "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"]
+
+
+def test_min_out_keeps_every_wei_of_18_decimal_usdc():
+    # 2 999.123456789012345678 USDC с 18 знаками (BSC): float округлил бы младшие разряды
+    quote = 2_999_123_456_789_012_345_678
+    data = bytes.fromhex(encode_swap(SimpleNamespace(address=WALLET), PATH, quote, {"timestamp": 0})[2:])
+    assert int.from_bytes(data[4:36], "big") == quote * 99 // 100 != int(quote * 0.99)
@@ -0,0 +1,190 @@
+from typing import Optional
+from client.client import Client
+from uniswap.history_store import HistoryStore
+from uniswap.quoter import DEFAULT_FEE_BPS, FEE_DENOMINATOR, sort_tokens
+from uniswap.route_finder import RouteFinder
+from utils.logger import logger
+
+# numpy нужен только для бэктеста, поэтому остальной скрипт работает и без него
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_TOLERANCES_BPS = (10, 25, 50, 75, 100, 150, 200, 300)
+DEFAULT_DELAYS = (1, 2, 3, 5, 10)
+# Доля худших исполнений для expected shortfall
+TAIL = 0.05
+# Допустимая доля откатов при выборе рекомендуемого допуска
+TARGET_REVERT_RATE = 0.01
+# Допуск, с которым сейчас отправляется свап (minOut = 99% котировки)
+CURRENT_TOLERANCE_BPS = 100
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Для бэктеста нужен numpy: pip install numpy")
+
+
+def dense_reserves(blocks, reserve0, reserve1, from_block: int, to_block: int):
+    """
+    Резервы на конец каждого блока from_block..to_block по событиям Sync:
+    берётся последнее событие блока, блоки без событий наследуют предыдущее состояние.
+    Блоки до первого события отбрасываются. Возвращает (номера блоков, reserve0, reserve1) как массивы.
+    """
+    _require_numpy()
+    blocks = np.asarray(blocks, dtype=np.int64)
+    reserve0 = np.asarray(reserve0, dtype=np.float64)
+    reserve1 = np.asarray(reserve1, dtype=np.float64)
+    if not len(blocks):
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+
+    # Последнее событие каждого блока: события отсортированы по (блок, log_index)
+    last = np.append(blocks[1:] != blocks[:-1], True)
+    blocks, reserve0, reserve1 = blocks[last], reserve0[last], reserve1[last]
+
+    grid = np.arange(max(from_block, blocks[0]), to_block + 1, dtype=np.int64)
+    index = np.searchsorted(blocks, grid, side="right") - 1
+    return grid, reserve0[index], reserve1[index]
+
+
+def amounts_out(sizes, reserve_in, reserve_out, fee_bps: int = DEFAULT_FEE_BPS):
+    """getAmountOut V2 по сетке: reserve_* — массивы по блокам, sizes — по размерам; результат (блоки, размеры)."""
+    gamma = (FEE_DENOMINATOR - fee_bps) / FEE_DENOMINATOR
+    amount_in = np.asarray(sizes, dtype=np.float64)[None, :] * gamma
+    return amount_in * reserve_out[:, None] / (reserve_in[:, None] + amount_in)
+
+
+def backtest_reserves(reserve_in, reserve_out, sizes, tolerances_bps=DEFAULT_TOLERANCES_BPS,
+                      delays=DEFAULT_DELAYS, fee_bps: int = DEFAULT_FEE_BPS) -> dict:
+    """
+    Воспроизводит свапы по истории резервов пары на сетке размер × допуск × задержка.
+    Котировка берётся по резервам на конец блока b, свап исполняется по резервам на конец
+    блока b + delay (консервативно: транзакция попадает в конец своего блока).
+    Свап откатывается, если недобор к котировке больше допуска; для прошедших свапов
+    считаются средний недобор, expected shortfall худших TAIL исполнений и «запас» —
+    разница между допуском и фактическим недобором, которую может забрать сэндвич.
+    Цикл только по задержкам и размерам, все блоки и допуски обрабатываются массивами.
+    """
+    _require_numpy()
+    reserve_in = np.asarray(reserve_in, dtype=np.float64)
+    reserve_out = np.asarray(reserve_out, dtype=np.float64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    tolerances = np.asarray(tolerances_bps, dtype=np.float64)
+    delays = [int(d) for d in delays if 0 < int(d) < len(reserve_in)]
+    if not delays:
+        raise ValueError("Истории резервов меньше, чем максимальная задержка")
+
+    outs = amounts_out(sizes, reserve_in, reserve_out, fee_bps)
+    # Влияние на цену — потеря относительно спотовой цены, включая комиссию пула
+    spot = sizes[None, :] * reserve_out[:, None] / reserve_in[:, None]
+    price_impact_bps = ((1 - outs / spot) * FEE_DENOMINATOR).mean(axis=0)
+
+    revert_rate = np.empty((len(delays), len(sizes), len(tolerances)))
+    mean_shortfall = np.full_like(revert_rate, np.nan)
+    tail_shortfall = np.full_like(revert_rate, np.nan)
+    slack = np.full_like(revert_rate, np.nan)
+
+    for i, delay in enumerate(delays):
+        quoted, executed = outs[:-delay], outs[delay:]
+        # Недобор в б.п. к котировке; отрицательный — исполнение лучше котировки
+        shortfall = np.sort((quoted - executed) / quoted * FEE_DENOMINATOR, axis=0)
+        samples = shortfall.shape[0]
+        cumulative = np.vstack([np.zeros((1, len(sizes))), np.cumsum(shortfall, axis=0)])
+
+        for j in range(len(sizes)):
+            # Свап проходит, если недобор не больше допуска; в отсортированном столбце это префикс
+            filled = np.searchsorted(shortfall[:, j], tolerances, side="right")
+            revert_rate[i, j] = 1 - filled / samples
+            has_fills = filled > 0
+            tail = np.maximum(np.ceil(filled * TAIL).astype(np.int64), 1)
+            total = cumulative[filled, j]
+            mean = np.divide(total, filled, out=np.full(len(tolerances), np.nan), where=has_fills)
+            mean_shortfall[i, j] = mean
+            tail_shortfall[i, j] = np.where(has_fills, (total - cumulative[np.maximum(filled - tail, 0), j]) / tail,
+                                            np.nan)
+            slack[i, j] = tolerances - mean
+
+    return {
+        "delays": delays,
+        "sizes": sizes,
+        "tolerances_bps": tolerances,
+        "samples": len(reserve_in),
+        "combinations": sum(len(reserve_in) - d for d in delays) * len(sizes) * len(tolerances),
+        "price_impact_bps": price_impact_bps,
+        "revert_rate": revert_rate,
+        "mean_shortfall_bps": mean_shortfall,
+        "expected_shortfall_bps": tail_shortfall,
+        "slack_bps": slack
+    }
+
+
+def recommend_tolerance(result: dict, target_revert_rate: float = TARGET_REVERT_RATE) -> dict[tuple[int, float], Optional[float]]:
+    """Минимальный допуск из сетки с долей откатов не выше целевой для каждой пары (задержка, размер)."""
+    recommended = {}
+    for i, delay in enumerate(result["delays"]):
+        for j, size in enumerate(result["sizes"]):
+            ok = np.nonzero(result["revert_rate"][i, j] <= target_revert_rate)[0]
+            recommended[(delay, float(size))] = float(result["tolerances_bps"][ok[0]]) if len(ok) else None
+    return recommended
+
+
+async def backtest_pair(store: HistoryStore, chain_id: int, pair: str, token_in_is_token0: bool,
+                        from_block: int, to_block: int, sizes, **kwargs) -> dict:
+    """Бэктест по истории пары из HistoryStore; sizes — в минимальных единицах входного токена."""
+    _require_numpy()
+    rows = await store.get_reserves(chain_id, pair, from_block, to_block)
+    if not rows:
+        raise ValueError(f"Нет истории резервов пары {pair} в блоках {from_block}-{to_block}")
+    blocks, reserve0, reserve1 = zip(*rows)
+    # uint112 точнее float64, но для относительных величин в б.п. точности хватает
+    _, reserve0, reserve1 = dense_reserves(blocks, [float(r) for r in reserve0], [float(r) for r in reserve1],
+                                           from_block, to_block)
+    if token_in_is_token0:
+        return backtest_reserves(reserve0, reserve1, sizes, **kwargs)
+    return backtest_reserves(reserve1, reserve0, sizes, **kwargs)
+
+
+async def run_backtest(clients: list[Client], db_path: str, from_block: int = 0, to_block: Optional[int] = None,
+                       size_multipliers=(0.1, 1, 10, 100)) -> dict[str, dict]:
+    """
+    Бэктест допуска проскальзывания прямой пары wrapped → USDC каждой сети по истории,
+    собранной режимом индексации. Размеры свапа — кратные client.amount. Итоги выводятся в лог.
+    """
+    _require_numpy()
+    results = {}
+    store = await HistoryStore(db_path).open()
+    try:
+        for client in clients:
+            network = client.network.name
+            try:
+                pair = await RouteFinder.get(client).quoter.get_pair_address(client.from_address, client.to_address)
+                last = to_block if to_block is not None else await store.get_checkpoint(client.chain_id, [pair])
+                if last is None:
+                    raise ValueError("история пары ещё не проиндексирована")
+                sizes = [int(client.amount.wei * m) for m in size_multipliers]
+                token0, _ = sort_tokens(client.from_address, client.to_address)
+                result = await backtest_pair(store, client.chain_id, pair, token0 == client.from_address,
+                                             from_block, last, sizes)
+            except Exception as e:
+                logger.warning(f"[{network}] Бэктест не выполнен: {e}")
+                continue
+
+            results[network] = result
+            logger.info(f"[{network}] Бэктест: {result['samples']} блоков, {result['combinations']} комбинаций")
+            recommended = recommend_tolerance(result)
+            k = int(np.abs(result["tolerances_bps"] - CURRENT_TOLERANCE_BPS).argmin())
+            for i, delay in enumerate(result["delays"]):
+                for j, size in enumerate(result["sizes"]):
+                    best = recommended[(delay, float(size))]
+                    logger.info(
+                        f"[{network}] задержка {delay} бл., {client.from_wei_main(int(size), 18)}: "
+                        f"влияние {result['price_impact_bps'][j]:.1f} б.п., "
+                        f"при {result['tolerances_bps'][k]:.0f} б.п. откаты {result['revert_rate'][i, j, k]:.1%}, "
+                        f"ES{int(TAIL * 100)} {result['expected_shortfall_bps'][i, j, k]:.1f} б.п., "
+                        f"запас {result['slack_bps'][i, j, k]:.1f} б.п.; "
+                        f"рекомендуемый допуск {f'{best:.0f} б.п.' if best is not None else 'вне сетки'}")
+    finally:
+        await store.close()
+    return results
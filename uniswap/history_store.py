@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync (
+    chain_id INTEGER NOT NULL,
+    pair BLOB NOT NULL,
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    reserve0 BLOB NOT NULL,
+    reserve1 BLOB NOT NULL,
+    PRIMARY KEY (chain_id, pair, block, log_index)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS swap (
+    chain_id INTEGER NOT NULL,
+    pair BLOB NOT NULL,
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash BLOB NOT NULL,
+    sender BLOB NOT NULL,
+    recipient BLOB NOT NULL,
+    amount0_in BLOB NOT NULL,
+    amount1_in BLOB NOT NULL,
+    amount0_out BLOB NOT NULL,
+    amount1_out BLOB NOT NULL,
+    PRIMARY KEY (chain_id, pair, block, log_index)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS checkpoint (
+    chain_id INTEGER NOT NULL,
+    pair BLOB NOT NULL,
+    block INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, pair)
+) WITHOUT ROWID;
+"""
+
+
+def pack_uint(value: int) -> bytes:
+    """uint256 не помещается в INTEGER SQLite, поэтому суммы хранятся минимальными big-endian байтами."""
+    return value.to_bytes(max((value.bit_length() + 7) // 8, 1), "big")
+
+
+def unpack_uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def pack_address(address: str) -> bytes:
+    return bytes.fromhex(address[2:].lower())
+
+
+class HistoryStore:
+    """
+    Хранилище истории пар V2 в SQLite (режим WAL): события Sync и Swap и контрольные точки индексации.
+    Запись идёт в отдельном потоке с одним соединением, чтобы не блокировать event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-store")
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> None:
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def open(self) -> "HistoryStore":
+        await self._run(self._open)
+        return self
+
+    def _checkpoint(self, chain_id: int, pairs: list[str]) -> Optional[int]:
+        rows = self.connection.execute(
+            f"SELECT pair, block FROM checkpoint WHERE chain_id = ? AND pair IN ({','.join('?' * len(pairs))})",
+            [chain_id, *(pack_address(pair) for pair in pairs)]
+        ).fetchall()
+        # Общий прогресс набора пар — минимальный; пара без контрольной точки начинает с нуля
+        if len(rows) < len(pairs):
+            return None
+        return min(block for _, block in rows)
+
+    async def get_checkpoint(self, chain_id: int, pairs: list[str]) -> Optional[int]:
+        """Последний полностью проиндексированный блок для набора пар или None."""
+        return await self._run(self._checkpoint, chain_id, pairs)
+
+    def _write(self, chain_id: int, syncs: list[tuple], swaps: list[tuple],
+               pairs: list[str], checkpoint: Optional[int]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO sync VALUES (?, ?, ?, ?, ?, ?)",
+                [(chain_id, *row) for row in syncs])
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO swap VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(chain_id, *row) for row in swaps])
+            if checkpoint is not None:
+                self.connection.executemany(
+                    "INSERT INTO checkpoint VALUES (?, ?, ?) "
+                    "ON CONFLICT (chain_id, pair) DO UPDATE SET block = excluded.block",
+                    [(chain_id, pack_address(pair), checkpoint) for pair in pairs])
+
+    async def write(self, chain_id: int, syncs: list[tuple], swaps: list[tuple],
+                    pairs: list[str], checkpoint: Optional[int] = None) -> None:
+        """Записывает события одного диапазона и, если указана, контрольную точку — одной транзакцией."""
+        await self._run(self._write, chain_id, syncs, swaps, pairs, checkpoint)
+
+    def _reserves(self, chain_id: int, pair: str, from_block: int, to_block: int) -> list[tuple[int, int, int]]:
+        rows = self.connection.execute(
+            "SELECT block, reserve0, reserve1 FROM sync WHERE chain_id = ? AND pair = ? AND block BETWEEN ? AND ? "
+            "ORDER BY block, log_index",
+            (chain_id, pack_address(pair), from_block, to_block)
+        ).fetchall()
+        return [(block, unpack_uint(r0), unpack_uint(r1)) for block, r0, r1 in rows]
+
+    async def get_reserves(self, chain_id: int, pair: str, from_block: int, to_block: int) -> list[tuple[int, int, int]]:
+        """История резервов пары: [(блок, reserve0, reserve1)]."""
+        return await self._run(self._reserves, chain_id, pair, from_block, to_block)
+
+    def _volume(self, chain_id: int, pair: str, from_block: int, to_block: int) -> tuple[int, int]:
+        volume0 = volume1 = 0
+        for a0_in, a1_in, a0_out, a1_out in self.connection.execute(
+                "SELECT amount0_in, amount1_in, amount0_out, amount1_out FROM swap "
+                "WHERE chain_id = ? AND pair = ? AND block BETWEEN ? AND ?",
+                (chain_id, pack_address(pair), from_block, to_block)):
+            volume0 += unpack_uint(a0_in) + unpack_uint(a0_out)
+            volume1 += unpack_uint(a1_in) + unpack_uint(a1_out)
+        return volume0, volume1
+
+    async def get_volume(self, chain_id: int, pair: str, from_block: int, to_block: int) -> tuple[int, int]:
+        """Объём свапов пары по token0 и token1 за диапазон блоков."""
+        return await self._run(self._volume, chain_id, pair, from_block, to_block)
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            await self._run(self.connection.close)
+            self.connection = None
+        self.executor.shutdown(wait=False)
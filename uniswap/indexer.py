@@ -0,0 +1,237 @@
+from collections import deque
+from eth_utils import keccak
+from typing import Optional, Union
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.client import Client
+from client.proxy_pool import ROTATING
+from client.receipt_tracker import BLOCK_TIMES, DEFAULT_BLOCK_TIME
+from client.rpc_pool import is_range_error
+from uniswap.history_store import HistoryStore, pack_uint, pack_address
+from uniswap.quoter import sort_tokens
+from uniswap.route_finder import RouteFinder
+from uniswap.watcher import SYNC_TOPIC
+from utils.logger import logger
+import asyncio
+import time
+
+SWAP_TOPIC = "0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex()
+
+DEFAULT_CONCURRENCY = 4
+INITIAL_RANGE = 2_000
+MIN_RANGE = 1
+MAX_RANGE = 10_000
+# Рост диапазона после успешного запроса; при ошибке «слишком много логов» диапазон делится пополам
+RANGE_GROWTH = 1.5
+# Блоки ближе к голове не индексируются, чтобы не писать логи, которые отменит реорг
+CONFIRMATIONS = 5
+RETRY_ATTEMPTS = 3
+
+
+class PairIndexer:
+    """
+    Индексатор истории пар V2: события Sync (резервы) и Swap (объёмы) в HistoryStore.
+    Диапазон блоков режется на куски, которые несколько воркеров параллельно забирают
+    через eth_getLogs (один запрос на все пары). Размер куска подстраивается под лимиты ноды.
+    Контрольная точка сдвигается только по непрерывному префиксу готовых кусков, поэтому
+    после перезапуска индексация продолжается без пропусков; повторная запись логов безвредна.
+    """
+
+    def __init__(self, chain_id: int, rpc_url: Union[str, list, tuple], pairs: list[str], store: HistoryStore,
+                 proxy: Optional[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 initial_range: int = INITIAL_RANGE, min_range: int = MIN_RANGE, max_range: int = MAX_RANGE,
+                 confirmations: int = CONFIRMATIONS):
+        if not pairs:
+            raise ValueError("Не задано ни одной пары для индексации")
+        self.chain_id = chain_id
+        self.rpc_url = rpc_url
+        self.pairs = sorted({pair.lower() for pair in pairs})
+        self.store = store
+        self.proxy = proxy
+        self.concurrency = concurrency
+        self.range = initial_range
+        self.min_range = min_range
+        self.max_range = max_range
+        self.confirmations = confirmations
+        self.block_time = BLOCK_TIMES.get(chain_id, DEFAULT_BLOCK_TIME)
+
+        # Последний блок, до которого всё записано, и готовые куски за ним: начало → конец
+        self.indexed: Optional[int] = None
+        self.completed: dict[int, int] = {}
+        self.stats = {"blocks": 0, "logs": 0, "requests": 0, "range_errors": 0, "seconds": 0.0}
+
+    @classmethod
+    async def for_client(cls, client: Client, store: HistoryStore, **kwargs) -> "PairIndexer":
+        """Индексатор всех существующих пар, через которые RouteFinder строит маршруты кошелька."""
+        finder = RouteFinder.get(client)
+        paths = finder.candidate_paths(client.from_address, client.to_address)
+        await finder.refresh(paths)
+        keys = {sort_tokens(path[i], path[i + 1]) for path in paths for i in range(len(path) - 1)}
+        pairs = [finder.quoter.pair_addresses[key] for key in keys
+                 if finder.quoter.pair_addresses.get(key) in finder.quoter.pairs]
+        proxy = ROTATING if client.proxy_pool is not None else client.proxy
+        return cls(client.chain_id, client.rpc_url, pairs, store, proxy=proxy, **kwargs)
+
+    async def _call(self, method: str, params: list) -> object:
+        batch = JsonRpcBatch(self.rpc_url, self.proxy)
+        batch.add(method, params)
+        self.stats["requests"] += 1
+        result = (await batch.execute())[0]
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    async def safe_head(self) -> int:
+        """Последний блок с достаточным числом подтверждений."""
+        return int(await self._call("eth_blockNumber", []), 16) - self.confirmations
+
+    async def _get_logs(self, from_block: int, to_block: int) -> list[dict]:
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                return await self._call("eth_getLogs", [{
+                    "fromBlock": hex(from_block),
+                    "toBlock": hex(to_block),
+                    "address": self.pairs,
+                    "topics": [[SYNC_TOPIC, SWAP_TOPIC]]
+                }])
+            except JsonRpcError as e:
+                if is_range_error(e.message):
+                    raise
+                error = e
+            except Exception as e:
+                error = e
+            logger.warning(f"[{self.chain_id}] eth_getLogs {from_block}-{to_block}: {error}, "
+                           f"попытка {attempt + 1}/{RETRY_ATTEMPTS}")
+            await asyncio.sleep(2 ** attempt)
+        raise error
+
+    @staticmethod
+    def decode_logs(logs: list[dict]) -> tuple[list[tuple], list[tuple]]:
+        """Строки таблиц sync и swap (без chain_id) из сырых логов."""
+        syncs, swaps = [], []
+        for log in logs:
+            if log.get("removed"):
+                continue
+            pair = pack_address(log["address"])
+            block, log_index = int(log["blockNumber"], 16), int(log["logIndex"], 16)
+            data = bytes.fromhex(log["data"][2:])
+            words = [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+            topic = log["topics"][0].lower()
+            if topic == SYNC_TOPIC:
+                syncs.append((pair, block, log_index, pack_uint(words[0]), pack_uint(words[1])))
+            elif topic == SWAP_TOPIC:
+                swaps.append((
+                    pair, block, log_index, bytes.fromhex(log["transactionHash"][2:]),
+                    bytes.fromhex(log["topics"][1][-40:]), bytes.fromhex(log["topics"][2][-40:]),
+                    *(pack_uint(word) for word in words[:4])
+                ))
+        return syncs, swaps
+
+    async def _complete(self, from_block: int, to_block: int) -> None:
+        """Отмечает кусок готовым и сдвигает контрольную точку по непрерывному префиксу."""
+        self.completed[from_block] = to_block
+        advanced = self.indexed
+        while advanced + 1 in self.completed:
+            advanced = self.completed.pop(advanced + 1)
+        if advanced != self.indexed:
+            self.indexed = advanced
+            await self.store.write(self.chain_id, [], [], self.pairs, checkpoint=advanced)
+
+    async def backfill(self, from_block: int, to_block: int) -> None:
+        """Индексирует блоки from_block..to_block включительно."""
+        if to_block < from_block:
+            return
+        if self.indexed is None or self.indexed != from_block - 1:
+            self.indexed, self.completed = from_block - 1, {}
+
+        cursor = from_block
+        retry: deque[tuple[int, int]] = deque()
+        started = time.perf_counter()
+
+        def take() -> Optional[tuple[int, int]]:
+            nonlocal cursor
+            if retry:
+                return retry.popleft()
+            if cursor > to_block:
+                return None
+            chunk = (cursor, min(cursor + self.range - 1, to_block))
+            cursor = chunk[1] + 1
+            return chunk
+
+        async def worker() -> None:
+            # Свои разделённые куски воркер дорабатывает сам, поэтому выход при пустой очереди безопасен
+            while (chunk := take()) is not None:
+                start, end = chunk
+                try:
+                    logs = await self._get_logs(start, end)
+                except JsonRpcError as e:
+                    if not is_range_error(e.message) or start == end:
+                        raise
+                    self.stats["range_errors"] += 1
+                    size = end - start + 1
+                    self.range = max(self.min_range, min(self.range, size // 2))
+                    middle = start + size // 2
+                    retry.appendleft((middle, end))
+                    retry.appendleft((start, middle - 1))
+                    continue
+
+                syncs, swaps = self.decode_logs(logs)
+                if syncs or swaps:
+                    await self.store.write(self.chain_id, syncs, swaps, self.pairs)
+                self.stats["logs"] += len(syncs) + len(swaps)
+                self.stats["blocks"] += end - start + 1
+                if end - start + 1 >= self.range:
+                    self.range = min(self.max_range, max(int(self.range * RANGE_GROWTH), self.range + 1))
+                await self._complete(start, end)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.stats["seconds"] += time.perf_counter() - started
+
+    async def resume_block(self, start_block: int) -> int:
+        """Первый блок для индексации: после контрольной точки или start_block."""
+        checkpoint = await self.store.get_checkpoint(self.chain_id, self.pairs)
+        return max(start_block, checkpoint + 1) if checkpoint is not None else start_block
+
+    async def sync(self, start_block: int) -> int:
+        """Догоняет историю от контрольной точки до безопасной головы; возвращает последний блок."""
+        from_block = await self.resume_block(start_block)
+        head = await self.safe_head()
+        await self.backfill(from_block, head)
+        return max(head, from_block - 1)
+
+    async def follow(self, start_block: int) -> None:
+        """Догоняет историю, затем бесконечно индексирует новые блоки по мере их подтверждения."""
+        indexed = await self.sync(start_block)
+        logger.info(f"[{self.chain_id}] История догнана до блока {indexed}: {self.blocks_per_second:.0f} блоков/с")
+        while True:
+            await asyncio.sleep(max(self.block_time, 1.0))
+            try:
+                head = await self.safe_head()
+                if head > indexed:
+                    await self.backfill(indexed + 1, head)
+                    indexed = head
+            except Exception as e:
+                # Незавершённый кусок будет перезапрошен: контрольная точка его не покрывает
+                logger.warning(f"[{self.chain_id}] Ошибка индексации новых блоков: {e}")
+                indexed = self.indexed if self.indexed is not None else indexed
+
+    @property
+    def blocks_per_second(self) -> float:
+        return self.stats["blocks"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+
+async def run_index(clients: list[Client], db_path: str, start_block: int = 0) -> None:
+    """Режим индексации: история пар маршрутов каждой сети в одну базу, затем следование за головой."""
+    store = await HistoryStore(db_path).open()
+    try:
+        indexers = [await PairIndexer.for_client(client, store) for client in clients]
+        for client, indexer in zip(clients, indexers):
+            logger.info(f"[{client.network.name}] Индексация {len(indexer.pairs)} пар с блока "
+                        f"{await indexer.resume_block(start_block)}")
+        await asyncio.gather(*(indexer.follow(start_block) for indexer in indexers))
+    finally:
+        await store.close()
@@ -1,35 +1,280 @@
+from typing import Optional, Union
 from uniswap.router import get_amount_out
+from uniswap.route_finder import RouteFinder
+from uniswap.quoter import sort_tokens
 from client.client import Client
+from client.gas_cache import swap_gas_key
 from utils.logger import logger
+import asyncio
+import math
+import time
 
+# Таймаут на котировку в одной сети и общий бюджет на опрос всех сетей (секунды)
+CHAIN_TIMEOUT = 5.0
+TOTAL_BUDGET = 8.0
 
-async def get_best_quote(clients: list[Client], wrapped_token_map: dict, usdc_map: dict) -> dict:
+# Оценка газа свапа, пока нет статистики receipt-ов: базовая стоимость и добавка за каждую следующую пару
+SWAP_GAS = 130_000
+HOP_GAS = 60_000
+
+
+def _report(client: Client, **fields) -> dict:
+    """Отчёт по сети: задержка и причина ошибки плюс поля конкретного запроса."""
+    return {"network": client.network.name, "client": client, **fields, "latency": None, "error": None}
+
+
+async def _fan_out(clients: list[Client], fetch, chain_timeout: Union[float, dict], total_budget: float,
+                   **empty) -> list[dict]:
     """
-    Проверяет котировки во всех сетях и возвращает лучшую.
+    Запускает fetch(client, timeout) во всех сетях параллельно: таймаут на сеть (число или
+    словарь {сеть: таймаут}) и общий бюджет. Сети, не уложившиеся в бюджет, получают отчёт
+    с ошибкой и полями empty.
     """
-    best_quote = None
-
+    tasks = {}
     for client in clients:
-        try:
-            amount_in_wei = client.to_wei_main(client.amount, 18)
-            path = [
-                client.w3.to_checksum_address(wrapped_token_map[client.network.name]),
-                client.w3.to_checksum_address(usdc_map[client.network.name])
-            ]
+        timeout = chain_timeout.get(client.network.name, CHAIN_TIMEOUT) \
+            if isinstance(chain_timeout, dict) else chain_timeout
+        tasks[asyncio.create_task(fetch(client, timeout))] = client
+
+    done, pending = await asyncio.wait(tasks, timeout=total_budget)
+    for task in pending:
+        task.cancel()
+
+    reports = []
+    for task, client in tasks.items():
+        if task in done:
+            reports.append(task.result())
+        else:
+            report = _report(client, **empty)
+            report.update(latency=total_budget, error=f"превышен общий бюджет {total_budget} с")
+            reports.append(report)
+    return reports
+
+
+def _scale_to_18(decimals: int) -> int:
+    """Множитель к 18 знакам: USDC в разных сетях имеет разные decimals (на BSC — 18)."""
+    return 10 ** (18 - decimals)
+
+
+async def _quote_chain(client: Client, wrapped_token_map: dict, usdc_map: dict, timeout: float) -> dict:
+    """
+    Запрашивает котировку в одной сети и возвращает отчёт с задержкой и причиной ошибки.
+    """
+    report = _report(client, usdc_amount=None, path=None, decimals=None)
+    started = time.perf_counter()
+    try:
+        amount_in_wei = client.amount.wei
+        path = client.metadata.checksum_many([wrapped_token_map[client.network.name], usdc_map[client.network.name]])
+        report["path"] = path
+        # Decimals USDC нужны для сравнения сетей: без них котировка сети считается ошибкой
+        report["decimals"], report["usdc_amount"] = await asyncio.wait_for(asyncio.gather(
+            client.token_decimals(path[-1]),
+            get_amount_out(client.w3, client.router_address, amount_in_wei, path)), timeout)
+    except asyncio.TimeoutError:
+        report["error"] = f"таймаут {timeout} с"
+    except Exception as e:
+        report["error"] = str(e) or type(e).__name__
+    report["latency"] = time.perf_counter() - started
+    return report
+
+
+def _normalized(quote: dict) -> int:
+    """Сумма USDC котировки, приведённая к 18 знакам."""
+    return quote["usdc_amount"] * _scale_to_18(quote["decimals"])
+
+
+async def get_best_quote(clients: list[Client], wrapped_token_map: dict, usdc_map: dict,
+                         chain_timeout: Union[float, dict] = CHAIN_TIMEOUT,
+                         total_budget: float = TOTAL_BUDGET) -> Optional[dict]:
+    """
+    Параллельно проверяет котировки во всех сетях и возвращает лучшую.
+
+    chain_timeout — таймаут на одну сеть (число или словарь {сеть: таймаут}),
+    total_budget — общий бюджет: по его истечении возвращается лучшая из уже полученных котировок.
+    В результат добавляется ключ "reports" с задержкой и ошибкой по каждой сети.
+    """
+    if not clients:
+        return None
 
-            out_amount = await get_amount_out(client.w3, client.router_address, amount_in_wei, path)
+    reports = await _fan_out(
+        clients, lambda client, timeout: _quote_chain(client, wrapped_token_map, usdc_map, timeout),
+        chain_timeout, total_budget, usdc_amount=None, path=None, decimals=None)
 
-            logger.info(f"[{client.network.name}] Котировка: {client.amount} "
-                        f"ETH ≈ {client.from_wei_main(out_amount, 6)} USDC")
+    best_quote = None
+    for report in reports:
+        network = report["network"]
+        if report["error"] is not None:
+            logger.warning(f"[{network}] Ошибка получения котировки за {report['latency']:.3f} с: {report['error']}")
+            continue
 
-            if not best_quote or out_amount > best_quote["usdc_amount"]:
-                best_quote = {
-                    "client": client,
-                    "usdc_amount": out_amount,
-                    "path": path
-                }
+        client = report["client"]
+        logger.info(f"[{network}] Котировка за {report['latency']:.3f} с: {client.amount} "
+                    f"ETH ≈ {client.from_wei_main(report['usdc_amount'], report['decimals'])} USDC")
 
-        except Exception as e:
-            logger.warning(f"[{client.network.name}] Ошибка получения котировки: {e}")
+        # USDC в разных сетях имеет разные decimals (на BSC — 18), сравниваем в единых единицах
+        if not best_quote or _normalized(report) > _normalized(best_quote):
+            best_quote = {
+                "client": client,
+                "usdc_amount": report["usdc_amount"],
+                "path": report["path"],
+                "decimals": report["decimals"]
+            }
 
+    if best_quote:
+        best_quote["reports"] = reports
     return best_quote
+
+
+def split_amount(curves: list[tuple[float, float]], total: float) -> list[float]:
+    """
+    Оптимальное разбиение total между кривыми out = R·x / (K + x) без учёта газа.
+    На оптимуме предельные цены R·K / (K + x)² активных пулов равны λ, откуда
+    x_i = √(R_i·K_i / λ) − K_i. Пулы подключаются по убыванию спотовой цены R / K,
+    пока она выше λ текущего набора (water-filling), — решение за O(n log n).
+    """
+    order = sorted(range(len(curves)), key=lambda i: curves[i][0] / curves[i][1], reverse=True)
+    active, sum_k, sum_s, scale = [], 0.0, 0.0, 0.0
+    for i in order:
+        r, k = curves[i]
+        # 1/√λ для текущего набора; пул с ценой не выше λ уже не получает объёма
+        if active and r / k <= 1 / scale ** 2:
+            break
+        active.append(i)
+        sum_k += k
+        sum_s += math.sqrt(r * k)
+        scale = (total + sum_k) / sum_s
+
+    amounts = [0.0] * len(curves)
+    for i in active:
+        r, k = curves[i]
+        amounts[i] = max(math.sqrt(r * k) * scale - k, 0.0)
+    return amounts
+
+
+def optimize_split(curves: list[tuple[float, float]], gas_costs: list[float], total: float) -> list[float]:
+    """
+    Разбиение с учётом газа (в единицах выхода): фиксированная стоимость делает задачу невыпуклой,
+    поэтому пулы жадно исключаются, пока исключение увеличивает итог за вычетом газа.
+    """
+    def net(indices: list[int]) -> tuple[float, list[float]]:
+        amounts = split_amount([curves[i] for i in indices], total)
+        value = 0.0
+        for i, x in zip(indices, amounts):
+            if x > 0:
+                r, k = curves[i]
+                value += r * x / (k + x) - gas_costs[i]
+        return value, amounts
+
+    active = list(range(len(curves)))
+    best_value, best_amounts = net(active)
+    while len(active) > 1:
+        candidates = [(net(active[:j] + active[j + 1:]), j) for j in range(len(active))]
+        (value, amounts), j = max(candidates, key=lambda item: item[0][0])
+        if value <= best_value:
+            break
+        active.pop(j)
+        best_value, best_amounts = value, amounts
+
+    result = [0.0] * len(curves)
+    for i, x in zip(active, best_amounts):
+        result[i] = x
+    return result
+
+
+async def _chain_pools(client: Client, timeout: float) -> dict:
+    """
+    Маршруты сети для разбиения: кривые пар-непересекающихся маршрутов (общие пары
+    делят резервы, и их кривые не независимы) и стоимость газа каждого свапа в единицах USDC сети.
+    Резервы, комиссии и decimals USDC запрашиваются параллельно в пределах одного таймаута.
+    """
+    report = _report(client, pools=[], decimals=None)
+    started = time.perf_counter()
+    try:
+        finder = RouteFinder.get(client)
+        paths = finder.candidate_paths(client.from_address, client.to_address)
+        _, fees, report["decimals"] = await asyncio.wait_for(asyncio.gather(
+            finder.refresh(paths), client.fee_oracle.get_fees(), client.token_decimals(client.to_address)), timeout)
+
+        curves = sorted(((path, finder.quoter.curve(path)) for path in finder.available_paths(paths)),
+                        key=lambda item: item[1][0] / item[1][1], reverse=True)
+        used_pairs = set()
+        for path, (r, k) in curves:
+            pairs = {sort_tokens(path[i], path[i + 1]) for i in range(len(path) - 1)}
+            if pairs & used_pairs:
+                continue
+            used_pairs |= pairs
+            gas = client.gas_cache.expected(swap_gas_key(client.router_address, len(path)),
+                                            SWAP_GAS + HOP_GAS * (len(path) - 2))
+            gas_wei = (fees["base_fee"] + fees["max_priority_fee_per_gas"]) * gas
+            # Газ платится в нативном токене, он же вход свапа: переводим по спотовой цене маршрута
+            report["pools"].append({"path": path, "curve": (r, k), "gas_cost": gas_wei * r / k})
+        if not report["pools"]:
+            report["error"] = "нет маршрутов с ликвидностью"
+    except asyncio.TimeoutError:
+        report["error"] = f"таймаут {timeout} с"
+    except Exception as e:
+        report["error"] = str(e) or type(e).__name__
+    report["latency"] = time.perf_counter() - started
+    return report
+
+
+async def get_best_allocation(clients: list[Client], amount_in: int,
+                              chain_timeout: Union[float, dict] = CHAIN_TIMEOUT,
+                              total_budget: float = TOTAL_BUDGET) -> Optional[dict]:
+    """
+    Делит amount_in (в wei входного токена) между сетями и маршрутами так, чтобы итог
+    за вычетом газа был максимальным. Возвращает {"legs": [...], "amount_out", "gas_cost", "reports"},
+    где каждая нога — {"client", "network", "path", "amount_in", "amount_out", "gas_cost", "decimals"}
+    в единицах USDC своей сети и исполняется через run_allocation; итоговые amount_out и gas_cost
+    приведены к 18 знакам.
+    """
+    if not clients:
+        return None
+
+    reports = await _fan_out(clients, _chain_pools, chain_timeout, total_budget, pools=[], decimals=None)
+    pools = []
+    for report in reports:
+        if report["error"] is not None:
+            logger.warning(f"[{report['network']}] Маршруты не получены за {report['latency']:.3f} с: {report['error']}")
+            continue
+        pools += [(report, pool) for pool in report["pools"]]
+    if not pools:
+        return None
+
+    # Выход и газ сравниваются между сетями только в единых единицах USDC
+    scales = [_scale_to_18(report["decimals"]) for report, _ in pools]
+    curves = [(pool["curve"][0] * scale, pool["curve"][1]) for (_, pool), scale in zip(pools, scales)]
+    amounts = optimize_split(curves, [pool["gas_cost"] * scale for (_, pool), scale in zip(pools, scales)],
+                             float(amount_in))
+
+    # Целые суммы: округляем вниз, остаток отдаём самой крупной ноге
+    legs_in = [int(x) for x in amounts]
+    largest = max(range(len(legs_in)), key=legs_in.__getitem__)
+    legs_in[largest] += amount_in - sum(legs_in)
+
+    legs, amount_out, gas_cost = [], 0, 0.0
+    for (report, pool), scale, leg_in in zip(pools, scales, legs_in):
+        if leg_in <= 0:
+            continue
+        client = report["client"]
+        finder = RouteFinder.get(client)
+        legs.append({
+            "client": client,
+            "network": client.network.name,
+            "path": pool["path"],
+            "amount_in": leg_in,
+            "amount_out": finder.quoter.quote(leg_in, pool["path"])[-1],
+            "gas_cost": pool["gas_cost"],
+            "decimals": report["decimals"]
+        })
+        amount_out += legs[-1]["amount_out"] * scale
+        gas_cost += pool["gas_cost"] * scale
+        logger.info(f"[{client.network.name}] Доля {leg_in / amount_in:.1%}: маршрут из {len(pool['path']) - 1} пар, "
+                    f"≈ {client.from_wei_main(legs[-1]['amount_out'], report['decimals'])} USDC")
+
+    return {
+        "legs": legs,
+        "amount_out": amount_out,
+        "gas_cost": gas_cost,
+        "reports": reports
+    }
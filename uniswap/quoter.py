@@ -0,0 +1,225 @@
+from eth_utils import keccak, to_bytes, to_checksum_address
+from typing import Optional
+from web3 import AsyncWeb3
+from client.multicall import MulticallReader
+from uniswap.router import get_router_contract, get_amount_out
+from utils.encoders import get_cached_contract, GET_RESERVES
+from utils.logger import logger
+from utils.resources import load_abi
+import asyncio
+import time
+
+FEE_DENOMINATOR = 10_000
+DEFAULT_FEE_BPS = 30  # 0.3% как в UniswapV2Library
+
+
+def sort_tokens(token_a: str, token_b: str) -> tuple[str, str]:
+    """Сортирует адреса токенов так же, как UniswapV2Library.sortTokens."""
+    if token_a.lower() == token_b.lower():
+        raise ValueError("Одинаковые адреса токенов в паре")
+    token_a, token_b = to_checksum_address(token_a), to_checksum_address(token_b)
+    return (token_a, token_b) if int(token_a, 16) < int(token_b, 16) else (token_b, token_a)
+
+
+def compute_pair_address(factory: str, token_a: str, token_b: str, init_code_hash: str) -> str:
+    """Вычисляет адрес пары через CREATE2 без обращения к RPC."""
+    token0, token1 = sort_tokens(token_a, token_b)
+    salt = keccak(to_bytes(hexstr=token0) + to_bytes(hexstr=token1))
+    raw = keccak(b"\xff" + to_bytes(hexstr=factory) + salt + to_bytes(hexstr=init_code_hash))
+    return to_checksum_address(raw[12:])
+
+
+def get_amount_out_v2(amount_in: int, reserve_in: int, reserve_out: int, fee_bps: int = DEFAULT_FEE_BPS) -> int:
+    """Точный аналог UniswapV2Library.getAmountOut на целых числах."""
+    if amount_in <= 0:
+        raise ValueError("Недостаточная входная сумма")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("Недостаточная ликвидность в пуле")
+    amount_in_with_fee = amount_in * (FEE_DENOMINATOR - fee_bps)
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * FEE_DENOMINATOR + amount_in_with_fee
+    return numerator // denominator
+
+
+def route_curve(hops: list[tuple[int, int]], fee_bps: int = DEFAULT_FEE_BPS) -> tuple[float, float]:
+    """
+    Сворачивает маршрут из пар V2 в одну эквивалентную кривую out = R·x / (K + x).
+    Композиция таких дробно-линейных функций остаётся того же вида, поэтому маршрут
+    любой длины описывается парой (R, K); спотовая цена равна R / K.
+    """
+    gamma = (FEE_DENOMINATOR - fee_bps) / FEE_DENOMINATOR
+    r, k = float(hops[0][1]), hops[0][0] / gamma
+    for reserve_in, reserve_out in hops[1:]:
+        r_hop, k_hop = float(reserve_out), reserve_in / gamma
+        r, k = r_hop * r / (k_hop + r), k * k_hop / (k_hop + r)
+    return r, k
+
+
+def apply_slippage(amount_out: int, slippage_bps: int) -> int:
+    """Минимальная сумма на выходе с учётом проскальзывания в базисных пунктах."""
+    return amount_out * (FEE_DENOMINATOR - slippage_bps) // FEE_DENOMINATOR
+
+
+class V2Quoter:
+    """
+    Локальный расчёт котировок UniswapV2 по закэшированным резервам пар.
+    Резервы запрашиваются один раз через getReserves, дальше все котировки считаются без RPC.
+    """
+
+    def __init__(self, w3: AsyncWeb3, router_address: str, factory_address: Optional[str] = None,
+                 init_code_hash: Optional[str] = None, fee_bps: int = DEFAULT_FEE_BPS):
+        self.w3 = w3
+        self.router_address = to_checksum_address(router_address)
+        self.factory_address = to_checksum_address(factory_address) if factory_address else None
+        self.init_code_hash = init_code_hash
+        self.fee_bps = fee_bps
+        self.pair_addresses: dict[tuple[str, str], str] = {}
+        self.pairs: dict[str, dict] = {}
+        # Пары, которых нет на DEX: повторно не запрашиваются
+        self.missing: set[tuple[str, str]] = set()
+
+    @classmethod
+    def from_network(cls, w3: AsyncWeb3, net: dict) -> "V2Quoter":
+        """Создаёт квотер из записи constants/networks_data.json."""
+        return cls(
+            w3,
+            router_address=net["router_address"],
+            factory_address=net.get("factory_address"),
+            init_code_hash=net.get("init_code_hash"),
+            fee_bps=net.get("fee_bps", DEFAULT_FEE_BPS)
+        )
+
+    async def get_factory(self) -> str:
+        if not self.factory_address:
+            router = await get_router_contract(self.w3, self.router_address)
+            self.factory_address = to_checksum_address(await router.functions.factory().call())
+        return self.factory_address
+
+    async def _get_pair_from_factory(self, token0: str, token1: str) -> str:
+        factory = get_cached_contract(self.w3, await self.get_factory(), load_abi("uniswap_factory_v2"))
+        pair = await factory.functions.getPair(token0, token1).call()
+        if int(pair, 16) == 0:
+            raise ValueError(f"Пара {token0}/{token1} не существует")
+        return to_checksum_address(pair)
+
+    async def get_pair_address(self, token_a: str, token_b: str) -> str:
+        """Адрес пары: CREATE2 офлайн, если известен init code hash, иначе factory.getPair."""
+        key = sort_tokens(token_a, token_b)
+        if key not in self.pair_addresses:
+            if self.init_code_hash:
+                self.pair_addresses[key] = compute_pair_address(await self.get_factory(), *key, self.init_code_hash)
+            else:
+                self.pair_addresses[key] = await self._get_pair_from_factory(*key)
+        return self.pair_addresses[key]
+
+    async def _fetch_pair(self, token_a: str, token_b: str) -> dict:
+        key = sort_tokens(token_a, token_b)
+        pair_address = await self.get_pair_address(*key)
+        try:
+            contract = get_cached_contract(self.w3, pair_address, load_abi("uniswap_pair_v2"))
+            reserve0, reserve1, _ = await contract.functions.getReserves().call()
+        except Exception as e:
+            if not self.init_code_hash:
+                raise
+            # Вычисленный адрес не отвечает — проверяем через фабрику
+            logger.warning(f"Пара {pair_address} не отвечает ({e}), запрашиваем адрес у фабрики")
+            pair_address = await self._get_pair_from_factory(*key)
+            self.pair_addresses[key] = pair_address
+            contract = get_cached_contract(self.w3, pair_address, load_abi("uniswap_pair_v2"))
+            reserve0, reserve1, _ = await contract.functions.getReserves().call()
+
+        self.pairs[pair_address] = {
+            "token0": key[0],
+            "token1": key[1],
+            "reserve0": reserve0,
+            "reserve1": reserve1,
+            "updated_at": time.monotonic()
+        }
+        return self.pairs[pair_address]
+
+    async def fetch_reserves(self, path: list[str]) -> None:
+        """Параллельно загружает резервы всех пар маршрута."""
+        if len(path) < 2:
+            raise ValueError("Маршрут должен содержать минимум два токена")
+        await asyncio.gather(*(self._fetch_pair(path[i], path[i + 1]) for i in range(len(path) - 1)))
+
+    async def _try_pair_address(self, key: tuple[str, str]) -> Optional[str]:
+        try:
+            return await self.get_pair_address(*key)
+        except ValueError:
+            self.missing.add(key)
+            return None
+
+    async def refresh_pairs(self, token_pairs: list[tuple[str, str]], max_age: float,
+                            reader: MulticallReader) -> None:
+        """
+        Обновляет резервы пар, которых нет в кэше или которые старше max_age, одним multicall.
+        Пары без контракта запоминаются как отсутствующие.
+        """
+        now = time.monotonic()
+        stale = []
+        for key in {sort_tokens(a, b) for a, b in token_pairs}:
+            if key in self.missing:
+                continue
+            pair = self.pairs.get(self.pair_addresses.get(key))
+            if pair is None or now - pair["updated_at"] > max_age:
+                stale.append(key)
+        if not stale:
+            return
+
+        addresses = await asyncio.gather(*(self._try_pair_address(key) for key in stale))
+        found = [(key, address) for key, address in zip(stale, addresses) if address]
+        results = await reader.aggregate([(address, GET_RESERVES) for _, address in found])
+        updated_at = time.monotonic()
+        for (key, address), data in zip(found, results):
+            # По адресу без кода вызов успешен, но ответ пустой
+            if data is None or len(data) < 64:
+                self.missing.add(key)
+                continue
+            self.pairs[address] = {
+                "token0": key[0],
+                "token1": key[1],
+                "reserve0": int.from_bytes(data[:32], "big"),
+                "reserve1": int.from_bytes(data[32:64], "big"),
+                "updated_at": updated_at
+            }
+
+    def get_reserves(self, token_in: str, token_out: str) -> tuple[int, int]:
+        key = sort_tokens(token_in, token_out)
+        pair_address = self.pair_addresses.get(key)
+        if pair_address not in self.pairs:
+            raise KeyError(f"Резервы пары {key[0]}/{key[1]} не загружены")
+        pair = self.pairs[pair_address]
+        if to_checksum_address(token_in) == pair["token0"]:
+            return pair["reserve0"], pair["reserve1"]
+        return pair["reserve1"], pair["reserve0"]
+
+    def quote(self, amount_in: int, path: list[str]) -> list[int]:
+        """Аналог getAmountsOut: суммы на каждом шаге маршрута."""
+        amounts = [amount_in]
+        for i in range(len(path) - 1):
+            reserve_in, reserve_out = self.get_reserves(path[i], path[i + 1])
+            amounts.append(get_amount_out_v2(amounts[-1], reserve_in, reserve_out, self.fee_bps))
+        return amounts
+
+    def curve(self, path: list[str]) -> tuple[float, float]:
+        """Эквивалентная кривая маршрута по закэшированным резервам (см. route_curve)."""
+        return route_curve([self.get_reserves(path[i], path[i + 1]) for i in range(len(path) - 1)], self.fee_bps)
+
+    def quote_ladder(self, amounts_in: list[int], path: list[str], slippage_bps: int = 0) -> list[int]:
+        """Котировки для набора входных сумм за один вызов, опционально с учётом проскальзывания."""
+        hops = [self.get_reserves(path[i], path[i + 1]) for i in range(len(path) - 1)]
+        results = []
+        for amount in amounts_in:
+            for reserve_in, reserve_out in hops:
+                amount = get_amount_out_v2(amount, reserve_in, reserve_out, self.fee_bps)
+            results.append(apply_slippage(amount, slippage_bps) if slippage_bps else amount)
+        return results
+
+    async def verify(self, amount_in: int, path: list[str]) -> bool:
+        """Сверяет локальную котировку с getAmountsOut роутера."""
+        local, onchain = self.quote(amount_in, path)[-1], await get_amount_out(
+            self.w3, self.router_address, amount_in, path)
+        if local != onchain:
+            logger.warning(f"Локальная котировка {local} не совпадает с getAmountsOut {onchain}")
+        return local == onchain
@@ -0,0 +1,129 @@
+from eth_utils import to_checksum_address
+from typing import Optional
+from client.client import Client
+from client.metadata_cache import MetadataCache
+from client.multicall import MulticallReader
+from client.receipt_tracker import BLOCK_TIMES, DEFAULT_BLOCK_TIME
+from uniswap.quoter import V2Quoter
+from uniswap.router import get_amount_out
+from utils.logger import logger
+from utils.resources import load_networks
+
+# Максимум пар (прыжков) в маршруте
+MAX_HOPS = 3
+
+
+class RouteFinder:
+    """
+    Поиск лучшего маршрута V2 в сети по графу известных пар.
+    Вершины графа — входной и выходной токены и промежуточные токены сети (route_tokens),
+    резервы всех пар кандидатов обновляются одним multicall и только если устарели,
+    сами котировки считаются локально.
+    """
+
+    _instances: dict[int, "RouteFinder"] = {}
+
+    def __init__(self, quoter: V2Quoter, reader: MulticallReader, tokens: list[str],
+                 max_hops: int = MAX_HOPS, max_age: float = DEFAULT_BLOCK_TIME, chain_id: Optional[int] = None):
+        self.quoter = quoter
+        self.reader = reader
+        self.tokens = [to_checksum_address(token) for token in tokens]
+        self.max_hops = max_hops
+        self.max_age = max_age
+        self.paths: dict[tuple[str, str], list[list[str]]] = {}
+        self.chain_id = chain_id
+
+        # Фабрика и адреса пар из постоянного кэша: на тёплом старте их не нужно ни запрашивать, ни вычислять
+        if chain_id is not None:
+            metadata = MetadataCache.get()
+            self.quoter.factory_address = self.quoter.factory_address or metadata.factory(chain_id, quoter.router_address)
+            self.quoter.pair_addresses.update(metadata.pairs(chain_id, quoter.router_address))
+
+    @classmethod
+    def get(cls, client: Client) -> "RouteFinder":
+        """Один граф пар на сеть, общий для всех кошельков."""
+        if client.chain_id not in cls._instances:
+            net = load_networks()[client.network.name]
+            cls._instances[client.chain_id] = cls(
+                V2Quoter.from_network(client.w3, net),
+                MulticallReader(client.w3),
+                net.get("route_tokens", []),
+                max_age=BLOCK_TIMES.get(client.chain_id, DEFAULT_BLOCK_TIME),
+                chain_id=client.chain_id
+            )
+        return cls._instances[client.chain_id]
+
+    def candidate_paths(self, token_in: str, token_out: str) -> list[list[str]]:
+        """Все простые пути от token_in к token_out не длиннее max_hops пар."""
+        token_in, token_out = to_checksum_address(token_in), to_checksum_address(token_out)
+        key = (token_in, token_out)
+        if key not in self.paths:
+            middle = [t for t in dict.fromkeys(self.tokens) if t not in key]
+            paths = []
+
+            def extend(path: list[str]) -> None:
+                if len(path) <= self.max_hops:
+                    paths.append(path + [token_out])
+                if len(path) < self.max_hops:
+                    for token in middle:
+                        if token not in path:
+                            extend(path + [token])
+
+            extend([token_in])
+            self.paths[key] = paths
+        return self.paths[key]
+
+    async def refresh(self, paths: list[list[str]]) -> None:
+        """Обновляет устаревшие резервы всех пар из переданных маршрутов."""
+        hops = {(path[i], path[i + 1]) for path in paths for i in range(len(path) - 1)}
+        await self.quoter.refresh_pairs(list(hops), self.max_age, self.reader)
+        if self.chain_id is not None:
+            # Запоминаются только адреса подтверждённых пар, несуществующие каждый запуск проверяются заново
+            MetadataCache.get().store_router(
+                self.chain_id, self.quoter.router_address, self.quoter.factory_address,
+                {key: address for key, address in self.quoter.pair_addresses.items() if address in self.quoter.pairs})
+
+    def available_paths(self, paths: list[list[str]]) -> list[list[str]]:
+        """Маршруты, у которых все пары существуют и резервы загружены."""
+        available = []
+        for path in paths:
+            try:
+                if all(min(self.quoter.get_reserves(path[i], path[i + 1])) > 0 for i in range(len(path) - 1)):
+                    available.append(path)
+            except KeyError:
+                continue
+        return available
+
+    async def best_route(self, amount_in: int, token_in: str, token_out: str) -> tuple[list[str], int]:
+        """Маршрут с максимальной суммой на выходе и сама сумма."""
+        paths = self.candidate_paths(token_in, token_out)
+        await self.refresh(paths)
+
+        best_path, best_out = None, 0
+        for path in paths:
+            try:
+                amount_out = self.quoter.quote(amount_in, path)[-1]
+            except (KeyError, ValueError):
+                # В маршруте есть отсутствующая пара или пустой пул
+                continue
+            if amount_out > best_out:
+                best_path, best_out = path, amount_out
+        if best_path is None:
+            raise ValueError("Не найден ни один маршрут с ликвидностью")
+        return best_path, best_out
+
+
+async def find_swap_route(client: Client, amount_in_wei: int) -> tuple[list[str], int]:
+    """
+    Лучший маршрут wrapped → USDC для кошелька; если граф пар недоступен,
+    котировка прямой пары через getAmountsOut роутера.
+    """
+    direct = [client.from_address, client.to_address]
+    try:
+        path, amount_out = await RouteFinder.get(client).best_route(amount_in_wei, *direct)
+        if len(path) > 2:
+            logger.info(f"[{client.network.name}] Маршрут из {len(path) - 1} пар выгоднее прямого")
+        return path, amount_out
+    except Exception as e:
+        logger.warning(f"[{client.network.name}] Поиск маршрута не удался ({e}), используем прямую пару")
+        return direct, await get_amount_out(client.w3, client.router_address, amount_in_wei, direct)
@@ -1,18 +1,17 @@
 from web3 import AsyncWeb3
 from web3.contract import AsyncContract
-import json
-import os
-
-# Загружаем ABI один раз
-with open(os.path.join("abi", "uniswap_router_v2.json"), "r", encoding="utf-8") as f:
-    UNISWAP_ROUTER_ABI = json.load(f)
+from utils.encoders import get_cached_contract, encode_get_amounts_out, decode_amounts
+from utils.resources import load_abi
 
 
 async def get_router_contract(w3: AsyncWeb3, router_address: str) -> AsyncContract:
-    return w3.eth.contract(address=w3.to_checksum_address(router_address), abi=UNISWAP_ROUTER_ABI)
+    return get_cached_contract(w3, router_address, load_abi("uniswap_router_v2"))
 
 
 async def get_amount_out(w3: AsyncWeb3, router_address: str, amount_in_wei: int, path: list[str]) -> int:
-    contract = await get_router_contract(w3, router_address)
-    amounts = await contract.functions.getAmountsOut(amount_in_wei, path).call()
+    result = await w3.eth.call({
+        "to": w3.to_checksum_address(router_address),
+        "data": encode_get_amounts_out(amount_in_wei, path)
+    })
+    amounts = decode_amounts(result)
     return amounts[-1]  # Последний токен в цепочке — результат
@@ -0,0 +1,313 @@
+from uniswap.route_finder import find_swap_route
+from uniswap.swapper import swap_eth_to_usdc, build_swap_tx
+from client.client import Client, DEFAULT_GAS_LIMIT
+from client.gas_cache import swap_gas_key
+from client.multicall import MulticallReader
+from utils.wrappers import wrap_call
+from utils.logger import logger
+from typing import Optional
+import asyncio
+import time
+
+# topic события Transfer(address,address,uint256)
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+# Сколько ждать wrap в конвейерном режиме, прежде чем заменить его транзакцией с большей комиссией
+PIPELINE_WRAP_TIMEOUT = 60
+
+
+def _parse_amount_out(receipt, token_address: str, wallet: str) -> int:
+    """Сумма токена, пришедшая на кошелёк, по логам Transfer из receipt."""
+    wallet_topic = "0x" + wallet[2:].lower().rjust(64, "0")
+    amount = 0
+    for log in receipt.get("logs", []):
+        topics = [t.hex() if isinstance(t, bytes) else t for t in log["topics"]]
+        topics = [t if t.startswith("0x") else "0x" + t for t in topics]
+        if (log["address"].lower() == token_address.lower() and len(topics) == 3
+                and topics[0] == TRANSFER_TOPIC and topics[2].lower() == wallet_topic):
+            data = log["data"]
+            amount += int(data.hex() if isinstance(data, bytes) else data, 16)
+    return amount
+
+
+async def run_swap_flow(client: Client, route: Optional[tuple[list[str], int]] = None,
+                        pipelined: bool = False, balances: Optional[dict] = None) -> dict:
+    """
+    Выполняет полный цикл wrap → котировка → свап → подтверждение для одного кошелька.
+    route — уже выбранный (маршрут, ожидаемая сумма), например нога из get_best_allocation.
+    pipelined — если нужен wrap, не ждать его подтверждения, а отправить свап следом (см. _run_pipelined).
+    balances — {"native", "wrapped"} в wei из общей предпроверки run_batch, чтобы не читать их отдельно.
+    Возвращает запись с результатом: хэши транзакций, сумма на выходе, газ и тайминги этапов.
+    """
+    network = client.network.name
+    record = {
+        "wallet": client.address,
+        "network": network,
+        "success": False,
+        "wrap_tx": None,
+        "tx_hash": None,
+        "path": None,
+        "quote": None,
+        "amount_out": None,
+        "gas_used": None,
+        "timings": {},
+        "error": None
+    }
+    started = time.perf_counter()
+
+    try:
+        # Decimals токенов свапа: на тёплом старте из кэша метаданных, без RPC
+        await client.load_token_metadata()
+
+        # Проверка на наличие wrapped native
+        stage = time.perf_counter()
+        w_balance = balances["wrapped"] if balances else await client.get_erc20_balance()
+        w_balance = client.from_wei_main(w_balance, 18)
+
+        if w_balance < client.amount and pipelined:
+            await _run_pipelined(client, record, route)
+            return record
+
+        if w_balance < client.amount:
+            logger.info(f"[{network}] {client.address}: ⛓  Врапаем нативный токен в wrapped...\n")
+            try:
+                balance = balances["native"] if balances else await client.get_native_balance()
+                amount_in_wei = client.amount.wei
+                wrap = wrap_call(client.network.name, amount_in_wei, client.address)
+                gas_cost = await client.get_tx_fee(client.expected_gas(wrap["to"], wrap["data"]))
+
+                if balance < amount_in_wei + gas_cost:
+                    record["error"] = f"Недостаточно средств: баланс {client.from_wei_main(balance, 18)}"
+                    logger.error(f"[{network}] {record['error']}")
+                    return record
+
+                record["wrap_tx"] = await client.wrap_native()
+                await client.wait_tx(record["wrap_tx"], client.explorer_url)
+            except Exception as e:
+                record["error"] = f"Ошибка при врапе токена: {e}"
+                logger.error(record["error"])
+                return record
+        record["timings"]["wrap"] = time.perf_counter() - stage
+
+        logger.info(f"[{network}] {client.address}: Подготовка свапа...\n")
+        amount_in_wei = client.amount.wei
+
+        stage = time.perf_counter()
+        try:
+            path, record["quote"] = route or await find_swap_route(client, amount_in_wei)
+            record["path"] = path
+            usdc = client.from_wei_main(record["quote"], await client.token_decimals(client.to_address))
+            logger.info(f"[{network}] Котировка: {client.amount} ETH ≈ {usdc} USDC")
+        except Exception as e:
+            record["error"] = f"Не удалось получить котировку: {e}"
+            logger.error(record["error"])
+            return record
+        record["timings"]["quote"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        tx_hash = await swap_eth_to_usdc(client, path, record["quote"])
+        record["timings"]["swap"] = time.perf_counter() - stage
+        if not tx_hash:
+            record["error"] = "Swap не был отправлен"
+            return record
+
+        record["tx_hash"] = tx_hash
+        receipt = await client.w3.eth.get_transaction_receipt(tx_hash)
+        record["success"] = receipt.get("status") == 1
+        record["gas_used"] = receipt.get("gasUsed")
+        record["amount_out"] = _parse_amount_out(receipt, client.to_address, client.address)
+        if not record["success"]:
+            record["error"] = "Транзакция свапа не выполнена"
+    except Exception as e:
+        record["error"] = f"Ошибка при выполнении свапа: {e}"
+        logger.error(f"[{network}] {record['error']}")
+    finally:
+        record["timings"]["total"] = time.perf_counter() - started
+
+    return record
+
+
+def _record_swap_receipt(client: Client, record: dict, tx_hash: str, receipt: dict) -> None:
+    """Заполняет запись по receipt-у свапа в формате JSON-RPC."""
+    record["tx_hash"] = tx_hash
+    record["success"] = int(receipt.get("status") or "0x0", 16) == 1
+    record["gas_used"] = int(receipt["gasUsed"], 16) if receipt.get("gasUsed") else None
+    record["amount_out"] = _parse_amount_out(receipt, client.to_address, client.address)
+    if not record["success"]:
+        record["error"] = "Транзакция свапа не выполнена"
+
+
+async def _run_pipelined(client: Client, record: dict, route: Optional[tuple[list[str], int]]) -> None:
+    """
+    Конвейерный wrap → свап: обе транзакции подписываются с последовательными локальными nonce
+    и уходят в сеть друг за другом, котировка запрашивается, пока wrap в полёте.
+    Нода включит свап только после wrap (nonce n + 1 после n), поэтому оба обычно попадают в один блок.
+    Если wrap откатился, свап отменяется заменой на пустой перевод с тем же nonce;
+    если wrap не подтвердился за PIPELINE_WRAP_TIMEOUT, он заменяется копией с большей комиссией.
+    """
+    network = client.network.name
+    amount_in_wei = client.amount.wei
+    stage = time.perf_counter()
+
+    snapshot = await client.get_snapshot()
+    client.nonce_manager.seed(snapshot["nonce"])
+    quote_task = None if route else asyncio.create_task(find_swap_route(client, amount_in_wei))
+    try:
+        # Нужно: сумма врапа, value свапа и газ обеих транзакций (по статистике receipt-ов)
+        wrap_tx = await client.build_wrap_tx(amount_in_wei)
+        swap_gas = client.gas_cache.expected(swap_gas_key(client.router_address, len(route[0]) if route else 2),
+                                             DEFAULT_GAS_LIMIT)
+        required = 2 * amount_in_wei + client.get_tx_fee_from_snapshot(
+            snapshot, client.expected_gas(wrap_tx["to"], wrap_tx["data"]) + swap_gas)
+        if snapshot["native_balance"] < required:
+            await client.nonce_manager.release(wrap_tx["nonce"])
+            record["error"] = f"Недостаточно средств: баланс {client.from_wei_main(snapshot['native_balance'], 18)}"
+            logger.error(f"[{network}] {record['error']}")
+            return
+
+        logger.info(f"[{network}] {client.address}: ⛓  Конвейер: wrap и свап без ожидания подтверждения\n")
+        record["wrap_tx"] = await client.sign_and_send_tx(wrap_tx)
+        if not record["wrap_tx"]:
+            record["error"] = "Wrap не был отправлен"
+            return
+        record["timings"]["wrap"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        try:
+            path, record["quote"] = route or await quote_task
+        except Exception as e:
+            # Без свапа wrap всё равно выполнится: WETH останется на кошельке
+            record["error"] = f"Не удалось получить котировку: {e}"
+            logger.error(record["error"])
+            return
+        record["path"] = path
+        record["timings"]["quote"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        swap_tx = await build_swap_tx(client, path, record["quote"], snapshot)
+        swap_hash = await client.sign_and_send_tx(swap_tx)
+        if not swap_hash:
+            record["error"] = "Swap не был отправлен"
+            return
+        logger.info(f"[{network}] Wrap {record['wrap_tx']} и свап {swap_hash} отправлены")
+
+        wrap_hashes = [record["wrap_tx"]]
+        _, wrap_receipt = await client.wait_first(wrap_hashes, PIPELINE_WRAP_TIMEOUT)
+        if wrap_receipt is None:
+            # Wrap застрял (например, из-за комиссии) и держит свап: поднимаем комиссию
+            replacement = await client.replace_tx(wrap_tx)
+            if replacement:
+                wrap_hashes.append(replacement)
+            _, wrap_receipt = await client.wait_first(wrap_hashes, PIPELINE_WRAP_TIMEOUT)
+        if wrap_receipt is None:
+            client.nonce_manager.invalidate()
+            record["error"] = "Wrap не подтвердился, свап не выполнен"
+            logger.error(f"[{network}] {record['error']}")
+            return
+
+        swap_hashes = [swap_hash]
+        if int(wrap_receipt.get("status") or "0x0", 16) != 1:
+            logger.warning(f"[{network}] Wrap откатился, отменяем свап")
+            cancel = await client.replace_tx(swap_tx, cancel=True)
+            if cancel:
+                swap_hashes.append(cancel)
+
+        mined_hash, receipt = await client.wait_first(swap_hashes)
+        record["timings"]["swap"] = time.perf_counter() - stage
+        if receipt is None:
+            client.nonce_manager.invalidate()
+            record["error"] = "Свап не подтвердился"
+        elif mined_hash != swap_hash:
+            record["error"] = "Wrap откатился, свап отменён"
+        else:
+            _record_swap_receipt(client, record, swap_hash, receipt)
+    finally:
+        if quote_task is not None and not quote_task.done():
+            quote_task.cancel()
+
+
+async def prefetch_balances(clients: list[Client]) -> dict[Client, dict]:
+    """
+    Нативные и wrapped балансы всех кошельков через Multicall3: несколько вызовов на сеть
+    вместо двух запросов на кошелёк. Кошельки, для которых баланс не получен, в результат
+    не попадают и читают балансы сами в run_swap_flow.
+    """
+    by_network: dict[str, list[Client]] = {}
+    for client in clients:
+        by_network.setdefault(client.network.name, []).append(client)
+
+    async def fetch(network: str, network_clients: list[Client]) -> dict[Client, dict]:
+        wrapped = network_clients[0].from_address
+        try:
+            state = await MulticallReader(network_clients[0].w3).get_wallets_state(
+                [client.address for client in network_clients], [wrapped], native=True)
+        except Exception as e:
+            logger.warning(f"[{network}] Предпроверка балансов через Multicall3 не выполнена: {e}")
+            return {}
+        balances = {}
+        for client in network_clients:
+            native, token = state[(client.address, None)]["balance"], state[(client.address, wrapped)]["balance"]
+            if native is not None and token is not None:
+                balances[client] = {"native": native, "wrapped": token}
+        logger.info(f"[{network}] Предпроверка балансов: {len(balances)} из {len(network_clients)} кошельков")
+        return balances
+
+    results = await asyncio.gather(*(fetch(network, items) for network, items in by_network.items()))
+    return {client: balance for result in results for client, balance in result.items()}
+
+
+async def run_batch(clients: list[Client], max_concurrency: int = 3, pipelined: bool = False) -> list[dict]:
+    """
+    Запускает run_swap_flow для всех кошельков параллельно,
+    не более max_concurrency одновременных кошельков в каждой сети.
+    Балансы всех кошельков читаются заранее пакетно (см. prefetch_balances).
+    """
+    semaphores: dict[str, asyncio.Semaphore] = {}
+    balances = await prefetch_balances(clients)
+
+    async def run_limited(client: Client) -> dict:
+        semaphore = semaphores.setdefault(client.network.name, asyncio.Semaphore(max_concurrency))
+        async with semaphore:
+            return await run_swap_flow(client, pipelined=pipelined, balances=balances.get(client))
+
+    return list(await asyncio.gather(*(run_limited(client) for client in clients)))
+
+
+async def run_allocation(allocation: dict, pipelined: bool = False) -> list[dict]:
+    """
+    Исполняет разбиение ордера из get_best_allocation: сети параллельно,
+    ноги внутри одной сети по очереди (общий кошелёк и nonce).
+    """
+    by_client: dict[Client, list[dict]] = {}
+    for leg in allocation["legs"]:
+        by_client.setdefault(leg["client"], []).append(leg)
+
+    async def run_chain(client: Client, legs: list[dict]) -> list[dict]:
+        records = []
+        for leg in legs:
+            client.amount = client.from_wei_main(leg["amount_in"], 18)
+            records.append(await run_swap_flow(client, (leg["path"], leg["amount_out"]), pipelined))
+        return records
+
+    results = await asyncio.gather(*(run_chain(client, legs) for client, legs in by_client.items()))
+    return [record for records in results for record in records]
+
+
+def log_summary(records: list[dict]) -> None:
+    """Выводит итог по всем кошелькам."""
+    succeeded = [r for r in records if r["success"]]
+    logger.info(f"Итог: успешно {len(succeeded)} из {len(records)} кошельков")
+
+    for r in records:
+        timings = ", ".join(f"{stage} {seconds:.1f} с" for stage, seconds in r["timings"].items())
+        if r["success"]:
+            logger.info(f"✅ [{r['network']}] {r['wallet']}: tx {r['tx_hash']}, "
+                        f"получено {r['amount_out']}, газ {r['gas_used']} ({timings})")
+        else:
+            logger.warning(f"❌ [{r['network']}] {r['wallet']}: {r['error']} ({timings})")
+
+    if succeeded:
+        total_out = sum(r["amount_out"] or 0 for r in succeeded)
+        total_gas = sum(r["gas_used"] or 0 for r in succeeded)
+        avg_time = sum(r["timings"]["total"] for r in succeeded) / len(succeeded)
+        logger.info(f"Всего получено {total_out} (минимальных единиц USDC), газ {total_gas}, "
+                    f"среднее время {avg_time:.1f} с")
@@ -1,5 +1,29 @@
 from utils.logger import logger
 from client.client import Client
+from uniswap.quoter import apply_slippage
+from utils.encoders import encode_swap_exact_eth_for_tokens
+from web3.types import TxParams
+
+# Срок действия свапа относительно времени последнего блока, секунды
+DEADLINE_SECONDS = 1200
+# Допуск проскальзывания, базисные пункты
+SLIPPAGE_BPS = 100
+
+
+def encode_swap(client: Client, path: list[str], usdc_out_min: int, snapshot: dict) -> str:
+    """Calldata swapExactETHForTokens с допуском проскальзывания и сроком от времени блока из снимка."""
+    return encode_swap_exact_eth_for_tokens(
+        apply_slippage(usdc_out_min, SLIPPAGE_BPS),  # minOut с учетом проскальзывания, без float
+        path,
+        client.address,
+        snapshot["timestamp"] + DEADLINE_SECONDS
+    )
+
+
+async def build_swap_tx(client: Client, path: list[str], usdc_out_min: int, snapshot: dict) -> TxParams:
+    """Готовая к подписи транзакция свапа со следующим nonce кошелька."""
+    return await client.build_tx(client.router_address, encode_swap(client, path, usdc_out_min, snapshot),
+                                 value=client.amount, snapshot=snapshot)
 
 
 async def swap_eth_to_usdc(client: Client, path: list[str], usdc_out_min: int) -> str:
@@ -9,11 +33,16 @@ async def swap_eth_to_usdc(client: Client, path: list[str], usdc_out_min: int) -
     try:
         logger.info(f"[{client.network.name}] Старт свапа {client.amount} ETH -> USDC")
 
-        # Проверка баланса
-        erc20_balance = await client.get_erc20_balance()
-        amount_in_wei = client.to_wei_main(client.amount, 18)
-        gas_cost = await client.get_tx_fee()
-        native_balance = await client.get_native_balance()
+        # Проверка баланса: балансы, nonce, комиссии и время блока одним пакетным запросом
+        snapshot = await client.get_snapshot()
+        erc20_balance = snapshot["erc20_balance"]
+        amount_in_wei = client.amount.wei
+        native_balance = snapshot["native_balance"]
+
+        # Сборка swapExactETHForTokens
+        tx_data = encode_swap(client, path, usdc_out_min, snapshot)
+        # Газ по статистике прошлых свапов с той же длиной пути
+        gas_cost = client.get_tx_fee_from_snapshot(snapshot, client.expected_gas(client.router_address, tx_data))
 
         # 1. Хватает ли WETH (или WBNB/WMATIC)?
         if erc20_balance < amount_in_wei:
@@ -29,25 +58,7 @@ async def swap_eth_to_usdc(client: Client, path: list[str], usdc_out_min: int) -
                 f" {client.from_wei_main(native_balance, 18)} < {client.from_wei_main(gas_cost, 18)}")
             return ""
 
-        # Сборка swapExactETHForTokens
-        contract = await client.get_contract(client.router_address, abi=client.uniswap_router_abi)
-        deadline = (await client.w3.eth.get_block("latest"))["timestamp"] + 1200
-
-        tx_data = contract.encodeABI(
-            fn_name="swapExactETHForTokens",
-            args=[
-                int(usdc_out_min * 0.99),  # minOut с учетом проскальзывания
-                path,
-                client.address,
-                deadline
-            ]
-        )
-
-        tx = await client.prepare_tx(value=client.amount)
-        tx.update({
-            "to": client.router_address,
-            "data": tx_data
-        })
+        tx = await client.build_tx(client.router_address, tx_data, value=client.amount, snapshot=snapshot)
 
         tx_hash = await client.sign_and_send_tx(tx)
         logger.info(f"[{client.network.name}] TX отправлен: {client.explorer_url}tx/{tx_hash}")
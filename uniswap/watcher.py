@@ -0,0 +1,202 @@
+from eth_utils import keccak
+from typing import AsyncIterator, Optional
+from client.batch import JsonRpcBatch, JsonRpcError
+from client.client import Client
+from client.proxy_pool import ROTATING
+from client.receipt_tracker import BLOCK_TIMES, DEFAULT_BLOCK_TIME, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL
+from uniswap.route_finder import RouteFinder
+from uniswap.quoter import sort_tokens
+from utils.logger import logger
+import asyncio
+import time
+
+SYNC_TOPIC = "0x" + keccak(text="Sync(uint112,uint112)").hex()
+
+# Если отстали больше чем на столько блоков, проще перечитать резервы multicall-ом, чем тянуть логи
+MAX_LOG_RANGE = 2_000
+DEFAULT_THRESHOLD_BPS = 10
+
+
+class QuoteWatcher:
+    """
+    Непрерывное отслеживание котировок в одной сети.
+    Опрашивает номер блока с интервалом под время блока; на новых блоках одним eth_getLogs
+    забирает события Sync всех отслеживаемых пар, обновляет закэшированные резервы
+    и пересчитывает котировки локально. Событие выдаётся, когда котировка сдвинулась
+    больше чем на threshold_bps от последней выданной.
+    """
+
+    def __init__(self, client: Client, threshold_bps: int = DEFAULT_THRESHOLD_BPS):
+        self.client = client
+        self.network = client.network.name
+        self.finder = RouteFinder.get(client)
+        self.quoter = self.finder.quoter
+        self.proxy = ROTATING if client.proxy_pool is not None else client.proxy
+        self.threshold_bps = threshold_bps
+        self.block_time = BLOCK_TIMES.get(client.chain_id, DEFAULT_BLOCK_TIME)
+        self.subscriptions: list[dict] = []
+        self.last_block: Optional[int] = None
+        self.last_block_at: Optional[float] = None
+
+    def add(self, token_in: str, token_out: str, amount_in: int) -> None:
+        """Добавляет котировку token_in → token_out на amount_in по лучшему из маршрутов RouteFinder."""
+        self.subscriptions.append({
+            "token_in": token_in,
+            "token_out": token_out,
+            "amount_in": amount_in,
+            "paths": self.finder.candidate_paths(token_in, token_out),
+            "last": None
+        })
+
+    @property
+    def poll_interval(self) -> float:
+        return min(max(self.block_time / 2, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    async def _call(self, method: str, params: list) -> object:
+        batch = JsonRpcBatch(self.client.rpc_url, self.proxy)
+        batch.add(method, params)
+        result = (await batch.execute())[0]
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    def _pair_addresses(self) -> dict[str, tuple[str, str]]:
+        """Загруженные пары отслеживаемых маршрутов: адрес в нижнем регистре → ключ пары."""
+        pairs = {}
+        for subscription in self.subscriptions:
+            for path in subscription["paths"]:
+                for i in range(len(path) - 1):
+                    key = sort_tokens(path[i], path[i + 1])
+                    address = self.quoter.pair_addresses.get(key)
+                    if address in self.quoter.pairs:
+                        pairs[address.lower()] = key
+        return pairs
+
+    async def _refresh_all(self) -> None:
+        await self.finder.refresh([path for s in self.subscriptions for path in s["paths"]])
+
+    def _apply_sync_logs(self, logs: list[dict], pairs: dict[str, tuple[str, str]]) -> None:
+        """
+        Sync несёт абсолютные резервы, поэтому достаточно применить логи по порядку.
+        Пары без событий в диапазоне тоже актуальны на этот блок — их кэш помечается свежим.
+        """
+        logs = [log for log in logs if not log.get("removed") and log["address"].lower() in pairs]
+        logs.sort(key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+        for log in logs:
+            data = bytes.fromhex(log["data"][2:])
+            pair = self.quoter.pairs[self.quoter.pair_addresses[pairs[log["address"].lower()]]]
+            pair["reserve0"] = int.from_bytes(data[:32], "big")
+            pair["reserve1"] = int.from_bytes(data[32:64], "big")
+
+        updated_at = time.monotonic()
+        for key in pairs.values():
+            self.quoter.pairs[self.quoter.pair_addresses[key]]["updated_at"] = updated_at
+
+    def _quotes(self, block_number: Optional[int]) -> list[dict]:
+        events = []
+        for subscription in self.subscriptions:
+            best_path, best_out = None, 0
+            for path in self.finder.available_paths(subscription["paths"]):
+                amount_out = self.quoter.quote(subscription["amount_in"], path)[-1]
+                if amount_out > best_out:
+                    best_path, best_out = path, amount_out
+            if best_path is None:
+                continue
+
+            last = subscription["last"]
+            change_bps = (best_out - last) * 10_000 / last if last else None
+            if last is not None and abs(change_bps) < self.threshold_bps:
+                continue
+            subscription["last"] = best_out
+            events.append({
+                "network": self.network,
+                "block": block_number,
+                "token_in": subscription["token_in"],
+                "token_out": subscription["token_out"],
+                "amount_in": subscription["amount_in"],
+                "amount_out": best_out,
+                "path": best_path,
+                "change_bps": change_bps
+            })
+        return events
+
+    def _update_block_time(self, block_number: int) -> None:
+        now = time.monotonic()
+        if self.last_block is not None and block_number > self.last_block:
+            observed = (now - self.last_block_at) / (block_number - self.last_block)
+            self.block_time = self.block_time * 0.8 + observed * 0.2
+        self.last_block, self.last_block_at = block_number, now
+
+    async def _poll(self) -> Optional[list[dict]]:
+        """Один шаг: None, если новых блоков нет, иначе события изменившихся котировок."""
+        head = int(await self._call("eth_blockNumber", []), 16)
+        if self.last_block is not None and head <= self.last_block:
+            return None
+
+        pairs = self._pair_addresses()
+        if self.last_block is None or head - self.last_block > MAX_LOG_RANGE or not pairs:
+            await self._refresh_all()
+        else:
+            logs = await self._call("eth_getLogs", [{
+                "fromBlock": hex(self.last_block + 1),
+                "toBlock": hex(head),
+                "address": [self.quoter.pair_addresses[key] for key in pairs.values()],
+                "topics": [SYNC_TOPIC]
+            }])
+            self._apply_sync_logs(logs, pairs)
+        self._update_block_time(head)
+        return self._quotes(head)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """Бесконечный поток событий котировок; первое событие по каждой подписке — стартовая котировка."""
+        while True:
+            try:
+                events = await self._poll()
+                for event in events or []:
+                    yield event
+            except Exception as e:
+                logger.warning(f"[{self.network}] Ошибка в цикле отслеживания котировок: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+async def watch_quotes(watchers: list[QuoteWatcher]) -> AsyncIterator[dict]:
+    """Объединяет потоки котировок нескольких сетей в один асинхронный итератор."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(watcher: QuoteWatcher) -> None:
+        async for event in watcher.stream():
+            await queue.put(event)
+
+    tasks = [asyncio.create_task(pump(watcher)) for watcher in watchers]
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_watch(clients: list[Client], threshold_bps: int = DEFAULT_THRESHOLD_BPS) -> None:
+    """Режим наблюдения: котировка client.amount wrapped → USDC в каждой сети, вывод изменений в лог."""
+    # Без decimals USDC котировку сети не с чем сравнить: такая сеть не наблюдается
+    results = await asyncio.gather(*(client.token_decimals(client.to_address) for client in clients),
+                                   return_exceptions=True)
+    watchers, decimals = [], {}
+    for client, result in zip(clients, results):
+        if isinstance(result, Exception):
+            logger.error(f"[{client.network.name}] Сеть исключена из наблюдения: {result}")
+            continue
+        decimals[client.network.name] = result
+        watcher = QuoteWatcher(client, threshold_bps)
+        watcher.add(client.from_address, client.to_address, client.amount.wei)
+        watchers.append(watcher)
+    if not watchers:
+        return
+
+    by_network = {client.network.name: client for client in clients}
+    async for event in watch_quotes(watchers):
+        client = by_network[event["network"]]
+        change = f" ({event['change_bps']:+.1f} б.п.)" if event["change_bps"] is not None else ""
+        logger.info(f"[{event['network']}] блок {event['block']}: {client.from_wei_main(event['amount_in'], 18)} "
+                    f"→ {client.from_wei_main(event['amount_out'], decimals[event['network']])} USDC{change}, "
+                    f"маршрут из {len(event['path']) - 1} пар")
@@ -0,0 +1,211 @@
+from decimal import Decimal
+from typing import Iterable, Union
+
+# Степени десяти для распространённых decimals вычисляются один раз
+_POWERS = tuple(10 ** i for i in range(78))
+
+
+def _power(decimals: int) -> int:
+    return _POWERS[decimals] if 0 <= decimals < len(_POWERS) else 10 ** decimals
+
+
+def _is_exponent(text: str) -> bool:
+    unsigned = text[1:] if text[:1] in ("+", "-") else text
+    return unsigned.isascii() and unsigned.isdigit()
+
+
+def _to_base_units(text: str, decimals: int) -> int:
+    """
+    Точный перевод десятичной строки («1.5», «-0.25», «1e-05») в минимальные единицы.
+    Если знаков после запятой больше, чем decimals, и они не нулевые — ошибка, а не округление.
+    """
+    text = text.strip()
+    mantissa, separator, exponent = text.lower().partition("e")
+    negative = mantissa.startswith("-")
+    whole, _, fraction = (mantissa[1:] if mantissa[:1] in ("+", "-") else mantissa).partition(".")
+    digits = whole + fraction
+    # Только ASCII-цифры: int() принял бы «_», знаки внутри и цифры других письменностей
+    if not digits.isascii() or not digits.isdigit() or (separator and not _is_exponent(exponent)):
+        raise ValueError(f"Невалидное количество: {text!r}")
+    # Быстрый путь для обычной записи: одно преобразование int без деления
+    if not separator and len(fraction) <= decimals:
+        value = int(f"{digits}{'0' * (decimals - len(fraction))}")
+        return -value if negative else value
+    shift = decimals + (int(exponent) if separator else 0) - len(fraction)
+    if shift >= 0:
+        value = int(digits) * _power(shift)
+    else:
+        value, rest = divmod(int(digits), _power(-shift))
+        if rest:
+            raise ValueError(f"Количество {text} не помещается в {decimals} знаков после запятой")
+    return -value if negative else value
+
+
+class Amount:
+    """
+    Неизменяемое количество токена: целое число минимальных единиц (wei) и decimals.
+    Арифметика и сравнения точные и только между количествами с одинаковыми decimals;
+    разбор из строки/float не теряет wei, форматирование без float и web3.
+    """
+
+    __slots__ = ("wei", "decimals")
+
+    def __init__(self, wei: int, decimals: int = 18):
+        object.__setattr__(self, "wei", int(wei))
+        object.__setattr__(self, "decimals", decimals)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Amount неизменяем")
+
+    def __reduce__(self):
+        return Amount, (self.wei, self.decimals)
+
+    @classmethod
+    def parse(cls, value: Union["Amount", str, int, float, Decimal], decimals: int = 18) -> "Amount":
+        """
+        Количество в целых токенах («0.001», 1, 0.5) → Amount. float берётся по кратчайшему
+        десятичному представлению (repr), поэтому 0.1 превращается ровно в 10 ** 17 wei.
+        """
+        if isinstance(value, Amount):
+            if value.decimals == decimals:
+                return value
+            value = str(value)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            return cls(value * _power(decimals), decimals)
+        elif isinstance(value, (float, Decimal)):
+            value = repr(value) if isinstance(value, float) else str(value)
+        elif not isinstance(value, str):
+            raise TypeError(f"Количество должно быть строкой или числом, но имеет тип {type(value)}")
+        return cls(_to_base_units(value, decimals), decimals)
+
+    @staticmethod
+    def parse_many(values: Iterable[Union[str, int, float, Decimal]], decimals: int = 18) -> list[int]:
+        """Пакетный перевод количеств в целых токенах в минимальные единицы."""
+        scale = _power(decimals)
+        result = []
+        for value in values:
+            if type(value) is str:
+                result.append(_to_base_units(value, decimals))
+            elif isinstance(value, int) and not isinstance(value, bool):
+                result.append(value * scale)
+            else:
+                result.append(Amount.parse(value, decimals).wei)
+        return result
+
+    @staticmethod
+    def format_many(wei_values: Iterable[int], decimals: int = 18) -> list[str]:
+        """Пакетное форматирование минимальных единиц (в том числе массивов numpy) в десятичные строки."""
+        return [_format(int(wei), decimals) for wei in wei_values]
+
+    # --- арифметика и сравнения -------------------------------------------
+
+    def _check(self, other: "Amount") -> None:
+        if other.decimals != self.decimals:
+            raise ValueError(f"Количества с разными decimals: {self.decimals} и {other.decimals}")
+
+    def __add__(self, other):
+        if isinstance(other, Amount):
+            self._check(other)
+            return Amount(self.wei + other.wei, self.decimals)
+        # sum() начинает с 0
+        if other == 0 and isinstance(other, int):
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        self._check(other)
+        return Amount(self.wei - other.wei, self.decimals)
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Amount(self.wei * other, self.decimals)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __floordiv__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Amount(self.wei // other, self.decimals)
+        return NotImplemented
+
+    def scale(self, numerator: int, denominator: int) -> "Amount":
+        """Умножение на дробь numerator / denominator с округлением вниз, без float."""
+        return Amount(self.wei * numerator // denominator, self.decimals)
+
+    def __neg__(self):
+        return Amount(-self.wei, self.decimals)
+
+    def __abs__(self):
+        return Amount(abs(self.wei), self.decimals)
+
+    def __bool__(self):
+        return self.wei != 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        return self.wei == other.wei and self.decimals == other.decimals
+
+    def __hash__(self):
+        return hash((self.wei, self.decimals))
+
+    def __lt__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        self._check(other)
+        return self.wei < other.wei
+
+    def __le__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        self._check(other)
+        return self.wei <= other.wei
+
+    def __gt__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        self._check(other)
+        return self.wei > other.wei
+
+    def __ge__(self, other):
+        if not isinstance(other, Amount):
+            return NotImplemented
+        self._check(other)
+        return self.wei >= other.wei
+
+    # --- преобразования ----------------------------------------------------
+
+    def __int__(self):
+        return self.wei
+
+    def __float__(self):
+        # Только для отображения и оценок: точные расчёты идут по wei
+        return self.wei / _power(self.decimals)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.wei).scaleb(-self.decimals)
+
+    def __str__(self):
+        return _format(self.wei, self.decimals)
+
+    def __format__(self, spec: str) -> str:
+        if not spec:
+            return str(self)
+        return format(self.to_decimal(), spec)
+
+    def __repr__(self):
+        return f"Amount('{self}', {self.decimals})"
+
+
+def _format(wei: int, decimals: int) -> str:
+    """Десятичная строка без лишних нулей: 1500000000000000000 при 18 знаках → «1.5»."""
+    digits = str(abs(wei)).rjust(decimals + 1, "0")
+    sign = "-" if wei < 0 else ""
+    if not decimals:
+        return f"{sign}{digits}"
+    fraction = digits[-decimals:].rstrip("0")
+    return f"{sign}{digits[:-decimals]}.{fraction}" if fraction else f"{sign}{digits[:-decimals]}"
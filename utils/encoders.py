@@ -0,0 +1,92 @@
+from eth_utils import function_signature_to_4byte_selector
+from web3 import AsyncWeb3
+from web3.contract import AsyncContract
+
+# Селекторы функций вычисляются один раз при импорте
+SWAP_EXACT_ETH_FOR_TOKENS = function_signature_to_4byte_selector(
+    "swapExactETHForTokens(uint256,address[],address,uint256)")
+GET_AMOUNTS_OUT = function_signature_to_4byte_selector("getAmountsOut(uint256,address[])")
+APPROVE = function_signature_to_4byte_selector("approve(address,uint256)")
+ALLOWANCE = function_signature_to_4byte_selector("allowance(address,address)")
+BALANCE_OF = function_signature_to_4byte_selector("balanceOf(address)")
+DECIMALS = function_signature_to_4byte_selector("decimals()")
+SYMBOL = function_signature_to_4byte_selector("symbol()")
+DEPOSIT = function_signature_to_4byte_selector("deposit()")
+WITHDRAW = function_signature_to_4byte_selector("withdraw(uint256)")
+GET_RESERVES = function_signature_to_4byte_selector("getReserves()")
+GET_ETH_BALANCE = function_signature_to_4byte_selector("getEthBalance(address)")
+
+_contracts: dict[tuple[int, str, int], AsyncContract] = {}
+
+
+def get_cached_contract(w3: AsyncWeb3, address: str, abi: list) -> AsyncContract:
+    """
+    Возвращает объект контракта из кэша по ключу (сеть, адрес, ABI).
+    AsyncWeb3 общий на сеть, а ABI — константы модулей, поэтому ключом служат их id.
+    """
+    key = (id(w3), address.lower(), id(abi))
+    contract = _contracts.get(key)
+    if contract is None:
+        contract = w3.eth.contract(address=w3.to_checksum_address(address), abi=abi)
+        _contracts[key] = contract
+    return contract
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _address(address: str) -> bytes:
+    return bytes.fromhex(address[2:].rjust(64, "0"))
+
+
+def _address_array(addresses: list[str]) -> bytes:
+    return _word(len(addresses)) + b"".join(_address(a) for a in addresses)
+
+
+def encode_swap_exact_eth_for_tokens(amount_out_min: int, path: list[str], to: str, deadline: int) -> str:
+    # Динамический path идёт после четырёх слов заголовка
+    data = (SWAP_EXACT_ETH_FOR_TOKENS + _word(amount_out_min) + _word(0x80) + _address(to)
+            + _word(deadline) + _address_array(path))
+    return "0x" + data.hex()
+
+
+def encode_get_amounts_out(amount_in: int, path: list[str]) -> str:
+    return "0x" + (GET_AMOUNTS_OUT + _word(amount_in) + _word(0x40) + _address_array(path)).hex()
+
+
+def decode_amounts(data: bytes) -> list[int]:
+    """Декодирует uint256[] из ответа getAmountsOut."""
+    data = bytes(data)
+    offset = int.from_bytes(data[:32], "big")
+    length = int.from_bytes(data[offset:offset + 32], "big")
+    start = offset + 32
+    return [int.from_bytes(data[start + 32 * i:start + 32 * (i + 1)], "big") for i in range(length)]
+
+
+def decode_uint(data: bytes) -> int:
+    return int.from_bytes(bytes(data)[:32], "big")
+
+
+def encode_approve(spender: str, amount: int) -> str:
+    return "0x" + (APPROVE + _address(spender) + _word(amount)).hex()
+
+
+def encode_allowance(owner: str, spender: str) -> str:
+    return "0x" + (ALLOWANCE + _address(owner) + _address(spender)).hex()
+
+
+def encode_balance_of(owner: str) -> str:
+    return "0x" + (BALANCE_OF + _address(owner)).hex()
+
+
+def encode_get_eth_balance(owner: str) -> str:
+    return "0x" + (GET_ETH_BALANCE + _address(owner)).hex()
+
+
+def encode_deposit() -> str:
+    return "0x" + DEPOSIT.hex()
+
+
+def encode_withdraw(amount: int) -> str:
+    return "0x" + (WITHDRAW + _word(amount)).hex()
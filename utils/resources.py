@@ -0,0 +1,24 @@
+from functools import lru_cache
+from pathlib import Path
+import json
+
+# Корень репозитория: файлы данных ищутся относительно кода, а не текущей директории
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def resolve_path(*parts: str) -> Path:
+    return ROOT_DIR.joinpath(*parts)
+
+
+@lru_cache(maxsize=None)
+def load_abi(name: str) -> list:
+    """Загружает ABI из папки abi при первом обращении и дальше отдаёт из памяти."""
+    with open(resolve_path("abi", f"{name}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_networks() -> dict:
+    """Загружает constants/networks_data.json при первом обращении."""
+    with open(resolve_path("constants", "networks_data.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,5 +1,7 @@
 from eth_typing import ChecksumAddress
+from typing import Optional
 from web3 import AsyncWeb3
+from utils.encoders import encode_deposit, encode_withdraw
 
 WRAPPED_NATIVE_ADDRESSES = {
     "Optimism": "0x4200000000000000000000000000000000000006",  # WETH
@@ -30,34 +32,50 @@ WETH_ABI = [
 ]
 
 
-async def wrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress):
-    """Оборачивает нативный токен в WETH/WBNB/..."""
-    token_address = WRAPPED_NATIVE_ADDRESSES[network.upper()]
-    token_address = AsyncWeb3.to_checksum_address(token_address)
-    contract = w3.eth.contract(address=token_address, abi=WETH_ABI)
-    gas_estimate = await contract.functions.deposit().estimate_gas({
+def wrap_call(network: str, amount_wei: int, wallet_address: ChecksumAddress) -> dict:
+    """Вызов deposit() wrapped-токена без nonce и комиссий — для симуляции и ключа кэша газа."""
+    return {
         "from": wallet_address,
+        "to": AsyncWeb3.to_checksum_address(WRAPPED_NATIVE_ADDRESSES[network.upper()]),
         "value": amount_wei,
-    })
-    tx = await contract.functions.deposit().build_transaction({
-        "from": wallet_address,
-        "value": amount_wei,
-        "nonce": await w3.eth.get_transaction_count(wallet_address),
-        "gas": int(gas_estimate * 1.2),
-        "gasPrice": await w3.eth.gas_price
-    })
+        "data": encode_deposit()
+    }
+
+
+async def wrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress,
+                            nonce: Optional[int] = None, fee_fields: Optional[dict] = None,
+                            gas: Optional[int] = None, chain_id: Optional[int] = None):
+    """Оборачивает нативный токен в WETH/WBNB/...; без gas лимит оценивается через estimate_gas."""
+    if nonce is None:
+        nonce = await w3.eth.get_transaction_count(wallet_address)
+    tx = {
+        "chainId": chain_id or await w3.eth.chain_id,
+        **wrap_call(network, amount_wei, wallet_address),
+        "nonce": nonce
+    }
+    if gas is None:
+        gas = int(await w3.eth.estimate_gas(wrap_call(network, amount_wei, wallet_address)) * 1.2)
+    tx["gas"] = gas
+    tx.update(fee_fields or {"gasPrice": await w3.eth.gas_price})
     return tx
 
 
-async def unwrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress):
+async def unwrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress,
+                              nonce: Optional[int] = None, fee_fields: Optional[dict] = None,
+                              chain_id: Optional[int] = None):
     """Разворачивает WETH/WBNB/... обратно в нативный токен"""
+    if nonce is None:
+        nonce = await w3.eth.get_transaction_count(wallet_address)
     token_address = WRAPPED_NATIVE_ADDRESSES[network.upper()]
     token_address = AsyncWeb3.to_checksum_address(token_address)
-    contract = w3.eth.contract(address=token_address, abi=WETH_ABI)
-    tx = await contract.functions.withdraw(amount_wei).build_transaction({
+    tx = {
+        "chainId": chain_id or await w3.eth.chain_id,
         "from": wallet_address,
-        "nonce": await w3.eth.get_transaction_count(wallet_address),
-        "gas": 100_000,
-        "gasPrice": await w3.eth.gas_price
-    })
+        "to": token_address,
+        "value": 0,
+        "data": encode_withdraw(amount_wei),
+        "nonce": nonce,
+        "gas": 100_000
+    }
+    tx.update(fee_fields or {"gasPrice": await w3.eth.gas_price})
     return tx